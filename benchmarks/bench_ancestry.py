@@ -0,0 +1,127 @@
+"""
+Benchmark for the ancestry queries of ClassGraphTree on large class hierarchies.
+
+Times building the ancestry index and answering descendant, ancestor,
+is_descendant and defining_node queries for random nodes (of a random depth,
+so that deep and shallow nodes are queried alike), compared with
+walking the parents of the node table for every query (the original
+find_closest_source of the code comparison widget), for synthetic hierarchies
+of increasing size (inheritance_explorer._testing.make_hierarchy):
+
+    $ python benchmarks/bench_ancestry.py
+    $ python benchmarks/bench_ancestry.py --scales 10000 100000 --queries 1000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from inheritance_explorer import ClassGraphTree
+from inheritance_explorer._testing import make_hierarchy
+
+
+def walk_ancestors(table, node_id):
+    # all the ancestors of a node, walking every parent
+    found = set()
+    stack = [node_id]
+    while stack:
+        for parent_id in table.parents(stack.pop()):
+            if parent_id not in found:
+                found.add(parent_id)
+                stack.append(parent_id)
+    return sorted(found)
+
+
+def walk_descendants(table, children, node_id):
+    # all the descendants of a node, walking every child
+    found = set()
+    stack = [node_id]
+    while stack:
+        for child_id in children.get(stack.pop(), ()):
+            if child_id not in found:
+                found.add(child_id)
+                stack.append(child_id)
+    return sorted(found)
+
+
+def walk_defining_node(cgt, node_id):
+    # the original find_closest_source walk up the first parents
+    while node_id not in cgt._override_src:
+        node_id = int(cgt._node_list.parent_id[node_id - 1])
+        if node_id == 0:
+            return None
+    return node_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scales", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--branching", type=int, default=4)
+    parser.add_argument("--diamond_rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for n_classes in args.scales:
+        base = make_hierarchy(
+            n_classes,
+            depth=args.depth,
+            branching=args.branching,
+            diamond_rate=args.diamond_rate,
+        )
+        cgt = ClassGraphTree(
+            base, "method", max_recursion_level=args.depth, compute_similarity="never"
+        )
+        table = cgt._node_list
+        n_nodes = len(table)
+        by_depth = table.indices_by_depth()
+        queries = [
+            [int(rng.choice(by_depth[rng.integers(len(by_depth))])) + 1 for _ in "xy"]
+            for _ in range(args.queries)
+        ]
+        children = {}
+        for node_id, _, _, parent_ids in table.rows():
+            for parent_id in parent_ids:
+                children.setdefault(parent_id, []).append(node_id)
+
+        t0 = time.perf_counter()
+        cgt._ancestry_index()
+        print(f"{n_nodes} classes:")
+        print(f"{'build index':>24}: {time.perf_counter() - t0:.3f} s")
+
+        paths = {
+            "ancestors": (
+                lambda x, y: walk_ancestors(table, x),
+                lambda x, y: cgt.ancestors(x),
+            ),
+            "descendants": (
+                lambda x, y: walk_descendants(table, children, x),
+                lambda x, y: cgt.descendants(x),
+            ),
+            "is_descendant": (
+                lambda x, y: y in walk_ancestors(table, x),
+                lambda x, y: cgt.is_descendant(x, y),
+            ),
+            "defining_node": (
+                lambda x, y: walk_defining_node(cgt, x),
+                lambda x, y: cgt.defining_node(x),
+            ),
+        }
+        for label, (walk, indexed) in paths.items():
+            timings = []
+            for func in (walk, indexed):
+                t0 = time.perf_counter()
+                results = [func(x, y) for x, y in queries]
+                timings.append(time.perf_counter() - t0)
+            assert results == [walk(x, y) for x, y in queries]
+            walk_us, indexed_us = (1e6 * dt / len(queries) for dt in timings)
+            print(
+                f"{label:>24}: walk {walk_us:.1f} us, indexed {indexed_us:.1f} us "
+                f"per query ({walk_us / indexed_us:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark for the interactive (vis.js) graph of large class hierarchies.
+
+Times building the pyvis Network through networkx and Network.from_nx (the
+original build_interactive_graph), building it with build_interactive_graph
+and writing the HTML page with write_interactive_graph (with all the classes,
+and with the first --lod_levels levels and a chunk per collapsed subtree), for
+synthetic hierarchies of increasing size (inheritance_explorer._testing.make_hierarchy):
+
+    $ python benchmarks/bench_interactive_graph.py
+    $ python benchmarks/bench_interactive_graph.py --scales 1000 10000 100000
+
+The from_nx path is quadratic (pyvis checks for existing nodes and edges with
+a linear search), so it is skipped above --max_from_nx_classes.
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+from inheritance_explorer import ClassGraphTree
+from inheritance_explorer._testing import make_hierarchy
+from inheritance_explorer.inheritance_explorer import _validate_color
+
+
+def from_nx_network(cgt):
+    # the original build_interactive_graph, without similarity edges
+    import networkx as nx
+    from pyvis.network import Network
+
+    node_color = _validate_color(None, (0.7, 0.7, 0.7))
+    override_color = _validate_color(None, (0.5, 0.5, 1.0))
+    graph = nx.Graph(directed=True)
+    for node_id, name, color, parent_ids in cgt._node_list.rows():
+        child_id = str(node_id)
+        clr_val = node_color if color == "#000000" else override_color
+        parent_names = [cgt._node_list.name(pid) for pid in parent_ids]
+        parent_info = f"({', '.join(parent_names)})" if parent_names else ""
+        graph.add_node(child_id, title=f"{name}{parent_info}", color=clr_val)
+        for parent_id in parent_ids:
+            graph.add_edge(
+                child_id,
+                str(parent_id),
+                color=node_color,
+                physics=True,
+                arrows={"from": {"enabled": True}},
+            )
+    network = Network(notebook=True, bgcolor="#ffffff", font_color="#000000")
+    network.from_nx(graph)
+    return network
+
+
+def _measure(func):
+    # the wall time and the peak traced memory of a call
+    t0 = time.perf_counter()
+    func()
+    dt = time.perf_counter() - t0
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return dt, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--max_from_nx_classes", type=int, default=10000)
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--branching", type=int, default=4)
+    parser.add_argument("--diamond_rate", type=float, default=0.05)
+    parser.add_argument("--lod_levels", type=int, default=3)
+    args = parser.parse_args()
+
+    for n_classes in args.scales:
+        base = make_hierarchy(
+            n_classes,
+            depth=args.depth,
+            branching=args.branching,
+            diamond_rate=args.diamond_rate,
+        )
+        cgt = ClassGraphTree(
+            base, "method", max_recursion_level=args.depth, compute_similarity="never"
+        )
+        paths = {
+            "build_interactive_graph": lambda: cgt.build_interactive_graph(
+                include_similarity=False
+            ),
+            "write_interactive_graph": lambda: cgt.write_interactive_graph(
+                os.devnull, include_similarity=False
+            ),
+            "write_interactive_graph lod": lambda: cgt.write_interactive_graph(
+                os.devnull, include_similarity=False, lod_levels=args.lod_levels
+            ),
+        }
+        if n_classes <= args.max_from_nx_classes:
+            paths = {"from_nx": lambda: from_nx_network(cgt), **paths}
+
+        print(f"{len(cgt._node_list)} classes:")
+        timings = {}
+        for label, func in paths.items():
+            dt, peak = _measure(func)
+            timings[label] = dt
+            print(f"{label:>28}: {dt:.3f} s, peak memory {peak / 1e6:.1f} MB")
+        if "from_nx" in timings:
+            speedup = timings["from_nx"] / timings["build_interactive_graph"]
+            print(f"{'speedup':>28}: {speedup:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark for the MinHash/LSH candidate pre-filter.
+
+Compares MinHashSimilarity against the exhaustive PycodeSimilarity on
+synthetic method overrides, reporting run times, the fraction of pairs that
+are compared and the recall of the pairs above the similarity cutoff:
+
+    $ python benchmarks/bench_minhash_recall.py --n_sources 500
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from inheritance_explorer._testing import make_sources
+from inheritance_explorer.similarity import MinHashSimilarity, PycodeSimilarity
+
+
+def _above_cutoff(matrix, cutoff):
+    above = np.triu(matrix >= cutoff, k=1)
+    return set(zip(*np.nonzero(above)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n_sources", type=int, default=300)
+    parser.add_argument("--method", type=str, default="permute")
+    parser.add_argument("--cutoff", type=float, default=0.75)
+    parser.add_argument("--n_bands", type=int, nargs="+", default=[16, 32, 64])
+    parser.add_argument("--shingle_size", type=int, default=8)
+    args = parser.parse_args()
+
+    sources = make_sources(args.n_sources)
+    n_pairs = args.n_sources * (args.n_sources - 1) // 2
+
+    t0 = time.perf_counter()
+    _, exact, _ = PycodeSimilarity(method=args.method).run(sources)
+    t_exact = time.perf_counter() - t0
+    exact_pairs = _above_cutoff(exact, args.cutoff)
+    print(f"{args.n_sources} sources, {len(exact_pairs)} pairs above cutoff")
+    print(f"exhaustive: {t_exact:.3f} s")
+
+    print(f"{'n_bands':>8} {'time (s)':>9} {'compared':>9} {'recall':>7}")
+    for n_bands in args.n_bands:
+        sim = MinHashSimilarity(
+            method=args.method, n_bands=n_bands, shingle_size=args.shingle_size
+        )
+        t0 = time.perf_counter()
+        _, approx, _ = sim.run(sources)
+        dt = time.perf_counter() - t0
+        n_candidates = len(sim.candidate_pairs(list(sources.values())))
+        found = _above_cutoff(approx, args.cutoff)
+        recall = len(found & exact_pairs) / max(len(exact_pairs), 1)
+        compared = n_candidates / n_pairs
+        print(f"{n_bands:>8} {dt:>9.3f} {compared:>9.3f} {recall:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark for detecting which classes override the tracked function.
+
+Times the original detector, which compares the "file:line" source locations
+of the functions of each class and its parent found with inspect, against
+ClassGraphTree._node_overrides_func, which checks the class __dict__ and
+compares the functions that the class and its parent resolve to, over every
+(class, first parent) edge of synthetic hierarchies of increasing size
+(inheritance_explorer._testing.make_hierarchy):
+
+    $ python benchmarks/bench_override_detection.py
+    $ python benchmarks/bench_override_detection.py --scales 10000 100000
+
+The location caches of the original detector are cleared before each run.
+"""
+
+import argparse
+import time
+
+from inheritance_explorer import ClassGraphTree
+from inheritance_explorer._testing import make_hierarchy
+
+
+def location_overrides(cgt, child, parent):
+    # the original detector, for classes with a single parent
+    return cgt._get_source_info(child) != cgt._get_source_info(parent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--branching", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for n_classes in args.scales:
+        base = make_hierarchy(n_classes, depth=args.depth, branching=args.branching)
+        cgt = ClassGraphTree(
+            base, "method", max_recursion_level=args.depth, compute_similarity="never"
+        )
+        table = cgt._node_list
+        classes = table.classes
+        edges = [
+            (classes[index], classes[parent_id - 1])
+            for index, parent_id in enumerate(table.parent_id.tolist())
+            if parent_id
+        ]
+
+        def _inspect():
+            cgt._source_location_cache.clear()
+            cgt._source_file_cache.clear()
+            return [location_overrides(cgt, child, parent) for child, parent in edges]
+
+        def _identity():
+            return [cgt._node_overrides_func(child, parent) for child, parent in edges]
+
+        assert _inspect() == _identity()
+        print(f"{len(edges)} edges, {sum(_identity())} overrides:")
+        timings = {}
+        for label, func in (("inspect", _inspect), ("identity", _identity)):
+            dt = float("inf")
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                func()
+                dt = min(dt, time.perf_counter() - t0)
+            timings[label] = dt
+            print(f"{label:>12}: {dt:.4f} s, {1e6 * dt / len(edges):.2f} us per edge")
+        print(f"{'speedup':>12}: {timings['inspect'] / timings['identity']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark for scanning a package's source files in parallel.
+
+Writes a synthetic package of n_files modules to a temporary directory, each
+with a few classes that subclass classes of earlier modules, and reports the
+throughput (files/sec) of scan_package for each number of workers:
+
+    $ python benchmarks/bench_package_scan.py --n_files 10000 --n_workers 1 2 4 8
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from inheritance_explorer.static import scan_package
+
+
+def write_package(path: Path, n_files: int, classes_per_file: int, seed: int = 0):
+    # n_files modules in subpackages of 100 modules each. The first class of
+    # each module subclasses a class imported from an earlier module.
+    rng = np.random.default_rng(seed)
+    pkg = path / "benchpkg"
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("")
+    for ifile in range(n_files):
+        subpkg = pkg / f"sub{ifile // 100}"
+        if not subpkg.exists():
+            subpkg.mkdir()
+            (subpkg / "__init__.py").write_text("")
+        lines = ["import os", "from collections import OrderedDict", ""]
+        base = "object"
+        if ifile > 0:
+            parent = rng.integers(max(ifile - 200, 0), ifile)
+            base = f"Class{parent}_0"
+            lines += [f"from benchpkg.sub{parent // 100}.mod{parent} import {base}", ""]
+        for icls in range(classes_per_file):
+            lines.append(f"class Class{ifile}_{icls}({base}):")
+            lines.append("    def method(self, a):")
+            for istmt in range(rng.integers(2, 8)):
+                lines.append(f"        a = a * {istmt} + len(os.sep)")
+            lines.append("        return OrderedDict(a=a)")
+            lines.append("")
+            base = f"Class{ifile}_{icls}"
+        (subpkg / f"mod{ifile}.py").write_text("\n".join(lines))
+    return pkg
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n_files", type=int, default=10000)
+    parser.add_argument("--classes_per_file", type=int, default=5)
+    parser.add_argument(
+        "--n_workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()]
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pkg = write_package(Path(tmpdir), args.n_files, args.classes_per_file)
+        n_files = args.n_files + args.n_files // 100 + 1
+        print(f"{n_files} files, {os.cpu_count()} cpus")
+        for n_workers in args.n_workers:
+            t0 = time.perf_counter()
+            index = scan_package(str(pkg), n_workers=n_workers)
+            dt = time.perf_counter() - t0
+            assert not index.errors
+            print(
+                f"n_workers={n_workers}: {dt:.2f} s, {n_files / dt:.0f} files/s,"
+                f" {len(index.classes)} classes"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark for the process-pool similarity matrix.
+
+Times PycodeSimilarity(method="permute") on a set of synthetic method
+overrides for an increasing number of workers, up to the core count:
+
+    $ python benchmarks/bench_parallel_similarity.py --n_sources 300
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from inheritance_explorer._testing import make_sources
+from inheritance_explorer.similarity import PycodeSimilarity
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n_sources", type=int, default=200)
+    parser.add_argument("--max_workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    sources = make_sources(args.n_sources)
+    n_workers_list = [1]
+    while n_workers_list[-1] * 2 <= args.max_workers:
+        n_workers_list.append(n_workers_list[-1] * 2)
+    if n_workers_list[-1] != args.max_workers:
+        n_workers_list.append(args.max_workers)
+
+    print(f"{args.n_sources} sources, {os.cpu_count()} cores")
+    print(f"{'n_workers':>10} {'time (s)':>10} {'speedup':>10}")
+    t_serial = None
+    reference = None
+    for n_workers in n_workers_list:
+        sim = PycodeSimilarity(method="permute", n_workers=n_workers)
+        t0 = time.perf_counter()
+        _, matrix, _ = sim.run(sources)
+        dt = time.perf_counter() - t0
+        if t_serial is None:
+            t_serial = dt
+            reference = matrix
+        assert np.array_equal(matrix, reference)
+        print(f"{n_workers:>10} {dt:>10.3f} {t_serial / dt:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Scaling benchmarks for synthetic class hierarchies.
+
+Times building a ClassGraphTree, computing its similarity matrix, building
+the pydot graph, writing the DOT source with write_dot, building the pyvis
+graph, writing the vis.js HTML page with write_interactive_graph and loading
+a snapshot (ClassGraphTree.from_snapshot) for synthetic hierarchies of
+increasing size (inheritance_explorer._testing.make_hierarchy), and compares
+the best time of each against a stored baseline:
+
+    $ python benchmarks/bench_scaling.py
+    $ python benchmarks/bench_scaling.py --scales 100 1000 10000 100000
+
+Use --save to store the current timings as the new baseline. The exit code
+is 1 if any timing is more than --tolerance times its baseline. Timings are
+only comparable on the same machine.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from inheritance_explorer import ClassGraphTree
+from inheritance_explorer._testing import make_hierarchy
+
+_baseline_file = Path(__file__).parent / "baselines" / "bench_scaling.json"
+
+
+def _best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(scales, max_similarity_classes, repeat, hierarchy_kwargs):
+    timings = {}
+    for n_classes in scales:
+        base = make_hierarchy(n_classes, **hierarchy_kwargs)
+        max_level = hierarchy_kwargs["depth"]
+
+        def _build():
+            return ClassGraphTree(
+                base,
+                "method",
+                max_recursion_level=max_level,
+                compute_similarity="never",
+            )
+
+        timings[f"build/{n_classes}"] = _best_time(_build, repeat)
+        cgt = _build()
+        if n_classes <= max_similarity_classes:
+            timings[f"similarity/{n_classes}"] = _best_time(
+                cgt._build_similarity, repeat
+            )
+        timings[f"dot/{n_classes}"] = _best_time(
+            lambda: cgt.graph(include_similarity=False), repeat
+        )
+        timings[f"write_dot/{n_classes}"] = _best_time(
+            lambda: cgt.write_dot(io.StringIO(), include_similarity=False), repeat
+        )
+        timings[f"pyvis/{n_classes}"] = _best_time(
+            lambda: cgt.build_interactive_graph(include_similarity=False), repeat
+        )
+        timings[f"visjs/{n_classes}"] = _best_time(
+            lambda: cgt.write_interactive_graph(
+                io.StringIO(), include_similarity=False
+            ),
+            repeat,
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            snapshot = os.path.join(tmpdir, "tree.npz")
+            cgt.to_snapshot(snapshot)
+            timings[f"snapshot/{n_classes}"] = _best_time(
+                lambda: ClassGraphTree.from_snapshot(snapshot), repeat
+            )
+        for name, dt in timings.items():
+            if name.endswith(f"/{n_classes}"):
+                print(f"{name:>20}: {dt:.4f} s", flush=True)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scales", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--max_similarity_classes", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--branching", type=int, default=4)
+    parser.add_argument("--diamond_rate", type=float, default=0.05)
+    parser.add_argument("--override_rate", type=float, default=0.3)
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    parser.add_argument("--baseline", type=str, default=str(_baseline_file))
+    parser.add_argument("--save", action="store_true")
+    args = parser.parse_args()
+
+    hierarchy_kwargs = {
+        "depth": args.depth,
+        "branching": args.branching,
+        "diamond_rate": args.diamond_rate,
+        "override_rate": args.override_rate,
+    }
+    timings = run(
+        args.scales, args.max_similarity_classes, args.repeat, hierarchy_kwargs
+    )
+
+    if args.save:
+        baseline = {
+            "machine": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+            },
+            "hierarchy": hierarchy_kwargs,
+            "timings": timings,
+        }
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as fi:
+            json.dump(baseline, fi, indent=2)
+            fi.write("\n")
+        print(f"saved the baseline to {args.baseline}")
+        return 0
+
+    if not os.path.isfile(args.baseline):
+        print(f"no baseline at {args.baseline}, run with --save to store one")
+        return 0
+    with open(args.baseline) as fi:
+        baseline = json.load(fi)
+    if baseline["hierarchy"] != hierarchy_kwargs:
+        print("the baseline used different hierarchy options, not comparing")
+        return 0
+
+    print(f"\ncompared to the baseline ({baseline['machine']['platform']}):")
+    regressions = []
+    for name, dt in timings.items():
+        if name not in baseline["timings"]:
+            continue
+        ratio = dt / baseline["timings"][name]
+        flag = ""
+        if ratio > args.tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:>20}: {ratio:.2f}x{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Benchmark for scoring the similarity of identical override sources once.
+
+Times the similarity matrix of every override source, computed by the
+similarity container directly, against ClassGraphTree._similarity_of, which
+only compares the first source of each group of identical sources (up to
+whitespace, comments and docstrings) and expands the matrix of the groups,
+for synthetic hierarchies of increasing size
+(inheritance_explorer._testing.make_hierarchy):
+
+    $ python benchmarks/bench_source_dedup.py
+    $ python benchmarks/bench_source_dedup.py --scales 2000 --method pairwise
+
+Each run uses a new similarity container, so no fingerprints are reused.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from inheritance_explorer import ClassGraphTree
+from inheritance_explorer._testing import make_hierarchy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scales", type=int, nargs="+", default=[500, 1000])
+    parser.add_argument("--method", default="permute")
+    parser.add_argument("--override-rate", type=float, default=0.3)
+    args = parser.parse_args()
+
+    for n_classes in args.scales:
+        base = make_hierarchy(n_classes, override_rate=args.override_rate)
+        cgt = ClassGraphTree(
+            base,
+            "method",
+            similarity_method=args.method,
+            compute_similarity="never",
+        )
+        override_src = cgt._override_src
+        groups = cgt.identical_overrides()
+        n_unique = len(override_src) - sum(len(group) - 1 for group in groups)
+        largest = len(groups[0]) if groups else 1
+        print(
+            f"{len(override_src)} overrides, {n_unique} unique, "
+            f"largest group {largest}:"
+        )
+
+        def _full():
+            _, matrix, _ = cgt._get_similarity_container().run(override_src)
+            return matrix
+
+        def _dedup():
+            results, _ = cgt._similarity_of(
+                cgt._get_similarity_container(), override_src
+            )
+            return results["matrix"]
+
+        timings = {}
+        matrices = {}
+        for label, func in (("full", _full), ("dedup", _dedup)):
+            t0 = time.perf_counter()
+            matrices[label] = func()
+            timings[label] = time.perf_counter() - t0
+            print(f"{label:>12}: {timings[label]:.2f} s")
+        assert np.array_equal(matrices["full"], matrices["dedup"])
+        print(f"{'speedup':>12}: {timings['full'] / timings['dedup']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
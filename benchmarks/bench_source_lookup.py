@@ -0,0 +1,84 @@
+"""
+Benchmark for the memoized source-location lookup used during traversal.
+
+Writes a module with a synthetic class hierarchy to a temporary directory,
+imports it and times building a ClassGraphTree with the cached lookup and
+with the original inspect-based lookup:
+
+    $ python benchmarks/bench_source_lookup.py --n_classes 10000
+"""
+
+import argparse
+import importlib
+import inspect
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from inheritance_explorer import ClassGraphTree
+
+
+class _InspectClassGraphTree(ClassGraphTree):
+    # the original lookup: reads the source for every call
+    def _get_source_location(self, f) -> str:
+        return f"{inspect.getsourcefile(f)}:{inspect.getsourcelines(f)[1]}"
+
+
+def write_hierarchy(path: Path, n_classes: int, override_rate: float, seed: int = 0):
+    # a random tree of classes, where each class overrides method with
+    # probability override_rate
+    rng = np.random.default_rng(seed)
+    lines = [
+        "class Class0:",
+        "    def method(self, a):",
+        "        return a",
+        "",
+    ]
+    for icls in range(1, n_classes):
+        parent = rng.integers(max(icls - 50, 0), icls)
+        lines.append(f"class Class{icls}(Class{parent}):")
+        if rng.random() < override_rate:
+            lines.append("    def method(self, a):")
+            lines.append(f"        b = a * {icls}")
+            lines.append("        return b")
+        else:
+            lines.append("    pass")
+        lines.append("")
+    path.write_text("\n".join(lines))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n_classes", type=int, default=10000)
+    parser.add_argument("--override_rate", type=float, default=0.3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        write_hierarchy(
+            Path(tmpdir) / "_bench_hierarchy.py", args.n_classes, args.override_rate
+        )
+        sys.path.insert(0, tmpdir)
+        module = importlib.import_module("_bench_hierarchy")
+        base = module.Class0
+
+        timings = {}
+        for label, tree_class in (
+            ("inspect", _InspectClassGraphTree),
+            ("cached", ClassGraphTree),
+        ):
+            t0 = time.perf_counter()
+            cgt = tree_class(base, "method", compute_similarity="never")
+            timings[label] = time.perf_counter() - t0
+            n_nodes = len(cgt._node_list)
+
+    print(f"{n_nodes} classes, override rate {args.override_rate}")
+    for label, dt in timings.items():
+        print(f"{label:>8}: {dt:.3f} s")
+    print(f" speedup: {timings['inspect'] / timings['cached']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
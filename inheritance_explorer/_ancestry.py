@@ -0,0 +1,172 @@
+"""Ancestry queries on the nodes of a ClassGraphTree."""
+
+from typing import Iterable
+
+import numpy as np
+import numpy.typing as npt
+
+from inheritance_explorer._node_table import _NodeTable
+
+
+class _AncestryIndex:
+    """
+    Ancestry index of a _NodeTable, built once in a pass per depth level
+
+    The first parent of each node defines a spanning tree of the hierarchy.
+    An Euler tour of that tree numbers the nodes in depth-first order, so
+    the tree descendants of a node are the subtree_size - 1 nodes that follow
+    it in the tour (entry time tin, exit time tin + subtree_size). Nodes with
+    additional parents (multiple inheritance) add edges outside of the tree:
+    has_extra_ancestry marks the nodes that have an additional parent above
+    them, which are the only nodes whose ancestors are not all along their
+    first parents.
+
+    Parameters
+    ----------
+    table: _NodeTable
+        the nodes
+    override_ids: Iterable[int]
+        the ids of the nodes that define the tracked function
+    """
+
+    def __init__(self, table: _NodeTable, override_ids: Iterable[int]):
+        self._table = table
+        n_nodes = len(table)
+        parent_index = table.parent_id.astype(np.intp) - 1
+        by_depth = table.indices_by_depth()
+
+        # the number of nodes in the tree below (and including) each node
+        subtree_size = np.ones(n_nodes, dtype=np.int64)
+        for indices in reversed(by_depth[1:]):
+            np.add.at(subtree_size, parent_index[indices], subtree_size[indices])
+
+        # the entry time of each node: after its parent and the subtrees of
+        # its earlier siblings (in node id order)
+        tin = np.zeros(n_nodes, dtype=np.int64)
+        for indices in by_depth[1:]:
+            # the nodes of a level grouped by parent, each group in id order
+            indices = indices[np.argsort(parent_index[indices], kind="stable")]
+            parents = parent_index[indices]
+            sizes = subtree_size[indices]
+            offsets = np.cumsum(sizes) - sizes
+            group_starts = np.flatnonzero(np.r_[True, parents[1:] != parents[:-1]])
+            group_offsets = np.repeat(
+                offsets[group_starts], np.diff(np.r_[group_starts, parents.size])
+            )
+            tin[indices] = tin[parents] + 1 + offsets - group_offsets
+
+        # the node indices in Euler tour order
+        tour = np.empty(n_nodes, dtype=np.int64)
+        tour[tin] = np.arange(n_nodes)
+
+        # the nearest node along the first parents (including the node) that
+        # defines the tracked function, 0 for none
+        defining_node = np.zeros(n_nodes, dtype=np.int64)
+        # whether any ancestor of a node was reached through an additional
+        # parent
+        has_extra = np.zeros(n_nodes, dtype=bool)
+        extra_indices = [node_id - 1 for node_id in table.extra_parent_ids]
+        has_extra[extra_indices] = True
+        node_ids = np.arange(1, n_nodes + 1)
+        overrides = np.zeros(n_nodes, dtype=bool)
+        overrides[np.fromiter(override_ids, dtype=np.intp) - 1] = True
+        for level, indices in enumerate(by_depth):
+            inherited = 0 if level == 0 else defining_node[parent_index[indices]]
+            defining_node[indices] = np.where(
+                overrides[indices], node_ids[indices], inherited
+            )
+            if level > 0:
+                has_extra[indices] |= has_extra[parent_index[indices]]
+
+        # the nodes that are an additional parent of another node, sorted by
+        # entry time, and the children they are an additional parent of
+        extra_children: dict[int, list[int]] = {}
+        for node_id, parent_ids in table.extra_parent_ids.items():
+            for parent_id in parent_ids:
+                extra_children.setdefault(parent_id - 1, []).append(node_id - 1)
+        extra_sources = np.array(sorted(extra_children), dtype=np.int64)
+        extra_sources = extra_sources[np.argsort(tin[extra_sources])]
+
+        self._parent_id: list[int] = table.parent_id.tolist()
+        self.subtree_size = subtree_size
+        self.tin = tin
+        self.tour = tour
+        self.defining_node = defining_node
+        self.has_extra_ancestry = has_extra
+        self._extra_children = extra_children
+        self._extra_sources = extra_sources
+        self._extra_sources_tin = tin[extra_sources]
+
+    def _in_subtree(self, index: int, root: int) -> bool:
+        # if node index is in the tree below (or is) node index root
+        start = self.tin[root]
+        return bool(start <= self.tin[index] < start + self.subtree_size[root])
+
+    def is_descendant(self, index: int, ancestor: int) -> bool:
+        """if node index is a descendant of node index ancestor"""
+        if index == ancestor:
+            return False
+        if self._in_subtree(index, ancestor):
+            return True
+        # walk up through the additional parents only: above a node without
+        # extra ancestry, every ancestor is in its first-parent chain, which
+        # _in_subtree has already checked
+        stack = [index]
+        seen = {index}
+        while stack:
+            current = stack.pop()
+            if not self.has_extra_ancestry[current]:
+                continue
+            for parent_id in self._table.parents(current + 1):
+                parent = parent_id - 1
+                if self._in_subtree(parent, ancestor):
+                    return True
+                if parent not in seen:
+                    seen.add(parent)
+                    stack.append(parent)
+        return False
+
+    def ancestors(self, index: int) -> list[int]:
+        """the sorted node indices of all the ancestors of node index"""
+        found = set()
+        stack = [index]
+        while stack:
+            current = stack.pop()
+            if not self.has_extra_ancestry[current]:
+                # only the first parents are left above this node
+                parent_id = self._parent_id[current]
+                while parent_id and parent_id - 1 not in found:
+                    found.add(parent_id - 1)
+                    parent_id = self._parent_id[parent_id - 1]
+                continue
+            for parent_id in self._table.parents(current + 1):
+                if parent_id - 1 not in found:
+                    found.add(parent_id - 1)
+                    stack.append(parent_id - 1)
+        return sorted(found)
+
+    def descendants(self, index: int) -> npt.NDArray[np.int64]:
+        """the sorted node indices of all the descendants of node index"""
+        start = self.tin[index]
+        stop = start + self.subtree_size[index]
+        first, last = np.searchsorted(self._extra_sources_tin, [start, stop])
+        if first == last:
+            # only first-parent descendants
+            return np.sort(self.tour[start + 1 : stop])
+
+        # add the subtrees below the additional parents in each subtree found,
+        # skipping the subtrees that are inside one already found
+        covered = np.zeros(self.tin.size, dtype=bool)
+        covered[self.tour[start:stop]] = True
+        sources = self._extra_sources[first:last].tolist()
+        while sources:
+            for child in self._extra_children[sources.pop()]:
+                if covered[child]:
+                    continue
+                start = self.tin[child]
+                stop = start + self.subtree_size[child]
+                covered[self.tour[start:stop]] = True
+                first, last = np.searchsorted(self._extra_sources_tin, [start, stop])
+                sources.extend(self._extra_sources[first:last].tolist())
+        covered[index] = False
+        return np.flatnonzero(covered)
@@ -0,0 +1,350 @@
+"""Columnar storage of the nodes of a ClassGraphTree."""
+
+import collections.abc
+from typing import Any, Iterator, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+
+class _ChildNode:
+    """
+    A view of a single node of a _NodeTable
+
+    Views are created on access and hold no data of their own, so the
+    attributes of a node always reflect the table.
+    """
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: "_NodeTable", index: int):
+        self._table = table
+        self._index = index
+
+    @property
+    def child(self) -> Any:
+        """the class of the node, None for restored trees"""
+        return self._table.classes[self._index]
+
+    @property
+    def child_name(self) -> str:
+        return self._table.names[int(self._table._name_code[self._index])]
+
+    @property
+    def _child_id(self) -> int:
+        return self._index + 1
+
+    @property
+    def child_id(self) -> str:
+        return str(self._index + 1)
+
+    @property
+    def _parent_id(self) -> Optional[int]:
+        parent_id = int(self._table._parent_id[self._index])
+        return parent_id if parent_id else None
+
+    @property
+    def parent_id(self) -> str | None:
+        parent_id = self._parent_id
+        if parent_id:
+            return str(parent_id)
+        return None
+
+    @property
+    def parent(self) -> Any:
+        parent_id = self._parent_id
+        if parent_id is None:
+            return None
+        return self._table.classes[parent_id - 1]
+
+    @property
+    def parent_name(self) -> str | None:
+        parent_id = self._parent_id
+        if parent_id is None:
+            return None
+        return self._table.name(parent_id)
+
+    @property
+    def _extra_parent_ids(self) -> list[int]:
+        return list(self._table.extra_parent_ids.get(self._index + 1, ()))
+
+    @property
+    def extra_parents(self) -> list[Any]:
+        """any additional parents, for classes with multiple inheritance"""
+        return [self._table.classes[pid - 1] for pid in self._extra_parent_ids]
+
+    @property
+    def parent_ids(self) -> list[str]:
+        """the ids of all the parent nodes, starting with parent_id"""
+        return [str(pid) for pid in self._table.parents(self._index + 1)]
+
+    @property
+    def color(self) -> str:
+        return self._table.colors[int(self._table._color_code[self._index])]
+
+    @property
+    def depth(self) -> int:
+        """the number of edges to the base class along the first parents"""
+        return int(self._table._depth[self._index])
+
+    def add_parent(self, parent: Any, parent_id: int) -> None:
+        """add an additional parent node"""
+        self._table.add_parent(self._index + 1, parent_id)
+
+
+class _NodeTable:
+    """
+    The nodes of a ClassGraphTree, stored column by column
+
+    Node ids start at 1 and a node is stored at index node_id - 1. The parent
+    id (0 for the base class), depth and color code of each node are numpy
+    arrays, the class names and colors are interned, and the additional
+    parents of classes with multiple inheritance are only stored for the
+    nodes that have them. Indexing or iterating the table returns _ChildNode
+    views, so it can be used as a list of nodes.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self._size = 0
+        self._parent_id = np.zeros(capacity, dtype=np.int32)
+        self._depth = np.zeros(capacity, dtype=np.int32)
+        self._color_code = np.zeros(capacity, dtype=np.uint8)
+        self._name_code = np.zeros(capacity, dtype=np.int32)
+        # the class of each node, or None for restored trees
+        self.classes: list[Any] = []
+        # the interned class names and colors, indexed by the codes
+        self.names: list[str] = []
+        self.colors: list[str] = []
+        self._color_codes: dict[str, int] = {}
+        # the parents after the first, for classes with multiple inheritance
+        self.extra_parent_ids: dict[int, list[int]] = {}
+        # map of class name to node id, the last node with each name. It is
+        # also the index of the interned names.
+        self._name_index: Optional[dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> _ChildNode:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("node index out of range")
+        return _ChildNode(self, index)
+
+    def __iter__(self) -> Iterator[_ChildNode]:
+        for index in range(self._size):
+            yield _ChildNode(self, index)
+
+    @property
+    def name_index(self) -> dict[str, int]:
+        """map of class name to the id of the last node with that name"""
+        if self._name_index is None:
+            # restored tables build the index on first use. Every interned
+            # name has a node.
+            _, last_index = np.unique(self.name_code[::-1], return_index=True)
+            last_ids = self._size - last_index
+            self._name_index = dict(zip(self.names, last_ids.tolist()))
+        return self._name_index
+
+    @property
+    def parent_id(self) -> npt.NDArray[np.int32]:
+        """the id of the first parent of each node, 0 for the base class"""
+        return self._parent_id[: self._size]
+
+    @property
+    def depth(self) -> npt.NDArray[np.int32]:
+        """the number of edges from each node to the base class, following the
+        first parent of each node"""
+        return self._depth[: self._size]
+
+    @property
+    def color_code(self) -> npt.NDArray[np.uint8]:
+        """the index of the color of each node in colors"""
+        return self._color_code[: self._size]
+
+    @property
+    def name_code(self) -> npt.NDArray[np.int32]:
+        """the index of the class name of each node in names"""
+        return self._name_code[: self._size]
+
+    def _intern_name(self, name: str) -> int:
+        node_id = self.name_index.get(name)
+        if node_id is not None:
+            return int(self._name_code[node_id - 1])
+        self.names.append(name)
+        return len(self.names) - 1
+
+    def _intern_color(self, color: str) -> int:
+        code = self._color_codes.get(color)
+        if code is None:
+            if len(self.colors) == np.iinfo(self._color_code.dtype).max + 1:
+                raise ValueError("too many distinct node colors")
+            code = self._color_codes[color] = len(self.colors)
+            self.colors.append(color)
+        return code
+
+    def _grow(self) -> None:
+        capacity = max(2 * self._parent_id.size, 64)
+        for column in ("_parent_id", "_depth", "_color_code", "_name_code"):
+            old = getattr(self, column)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[: self._size] = old[: self._size]
+            setattr(self, column, new)
+
+    def append(
+        self,
+        child: Any,
+        name: str,
+        parent_id: Optional[int] = None,
+        depth: int = 0,
+        color: str = "#000000",
+    ) -> int:
+        """
+        add a node, returning its id
+
+        Parameters
+        ----------
+        child:
+            the class of the node, or None
+        name: str
+            the class name
+        parent_id: int
+            (optional) the id of the first parent, None for the base class
+        depth: int
+            (optional) the depth of the node. Default 0.
+        color: str
+            (optional) the outline color of the node. Default "#000000".
+        """
+        if self._size == self._parent_id.size:
+            self._grow()
+        index = self._size
+        self._parent_id[index] = parent_id or 0
+        self._depth[index] = depth
+        self._color_code[index] = self._intern_color(color)
+        self._name_code[index] = self._intern_name(name)
+        self.classes.append(child)
+        self._size += 1
+        self.name_index[name] = index + 1
+        return index + 1
+
+    def add_parent(self, node_id: int, parent_id: int) -> None:
+        """add an additional parent to a node"""
+        self.extra_parent_ids.setdefault(node_id, []).append(parent_id)
+
+    def set_colors(
+        self, mask: npt.NDArray[np.bool_], color: str, other_color: str
+    ) -> None:
+        """set the color of the nodes in mask to color, and of every other
+        node to other_color"""
+        codes = np.where(
+            mask, self._intern_color(color), self._intern_color(other_color)
+        )
+        if not self._color_code.flags.writeable:
+            # a read-only memory map of a snapshot
+            self._color_code = np.array(self._color_code)
+        self._color_code[: self._size] = codes
+
+    def name(self, node_id: int) -> str:
+        """the class name of a node"""
+        return self.names[int(self._name_code[node_id - 1])]
+
+    def parents(self, node_id: int) -> list[int]:
+        """the ids of all the parents of a node, starting with the first"""
+        parent_id = int(self._parent_id[node_id - 1])
+        if not parent_id:
+            return []
+        return [parent_id] + self.extra_parent_ids.get(node_id, [])
+
+    def row(self, node_id: int) -> tuple[int, str, str, list[int]]:
+        """the (node id, class name, color, parent ids) of a node, as in rows"""
+        index = node_id - 1
+        return (
+            node_id,
+            self.names[int(self._name_code[index])],
+            self.colors[int(self._color_code[index])],
+            self.parents(node_id),
+        )
+
+    def rows(self) -> Iterator[tuple[int, str, str, list[int]]]:
+        """iterate over the (node id, class name, color, parent ids) of every
+        node, without creating node views"""
+        names, colors = self.names, self.colors
+        extra_parent_ids = self.extra_parent_ids
+        columns = zip(
+            self.parent_id.tolist(), self.name_code.tolist(), self.color_code.tolist()
+        )
+        for index, (parent_id, name_code, color_code) in enumerate(columns):
+            node_id = index + 1
+            parent_ids = []
+            if parent_id:
+                parent_ids = [parent_id] + extra_parent_ids.get(node_id, [])
+            yield node_id, names[name_code], colors[color_code], parent_ids
+
+    def indices_by_depth(self) -> list[npt.NDArray[np.intp]]:
+        """the node indices (node id - 1) at each depth, in node id order. The
+        first parent of every node is at the previous depth."""
+        depth = self.depth
+        order = np.argsort(depth, kind="stable")
+        bounds = np.searchsorted(depth[order], np.arange(1, depth.max(initial=0) + 1))
+        return np.split(order, bounds)
+
+    def node_names(self) -> npt.NDArray[np.str_]:
+        """the class name of every node"""
+        return np.array(self.names)[self.name_code]
+
+    def _get_state(self) -> dict[str, Any]:
+        # the table without any class references
+        return {
+            "parent_id": self.parent_id.copy(),
+            "depth": self.depth.copy(),
+            "color_code": self.color_code.copy(),
+            "name_code": self.name_code.copy(),
+            "names": list(self.names),
+            "colors": list(self.colors),
+            "extra_parent_ids": {k: list(v) for k, v in self.extra_parent_ids.items()},
+        }
+
+    @classmethod
+    def _from_state(cls, state: dict[str, Any]) -> "_NodeTable":
+        # a table restored from _get_state, its class references are None
+        table = cls.__new__(cls)
+        table._size = state["parent_id"].size
+        table._parent_id = state["parent_id"]
+        table._depth = state["depth"]
+        table._color_code = state["color_code"]
+        table._name_code = state["name_code"]
+        table.classes = [None] * table._size
+        table.names = state["names"]
+        table.colors = state["colors"]
+        table._color_codes = {color: code for code, color in enumerate(table.colors)}
+        table.extra_parent_ids = state["extra_parent_ids"]
+        table._name_index = None
+        return table
+
+
+class _NodeNames(collections.abc.Mapping[int, str]):
+    # a read-only map of node id to class name, backed by a _NodeTable
+    __slots__ = ("_table",)
+
+    def __init__(self, table: _NodeTable):
+        self._table = table
+
+    def __getitem__(self, node_id: int) -> str:
+        if node_id not in self:
+            raise KeyError(node_id)
+        return self._table.name(int(node_id))
+
+    def __contains__(self, node_id: object) -> bool:
+        if not isinstance(node_id, (int, np.integer)):
+            return False
+        return 0 < int(node_id) <= len(self._table)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(1, len(self._table) + 1))
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
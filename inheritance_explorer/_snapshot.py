@@ -0,0 +1,96 @@
+"""Memory-mapped .npz snapshots of built ClassGraphTree results."""
+
+import json
+import struct
+import zipfile
+from typing import Any, Literal
+
+import numpy as np
+import numpy.typing as npt
+
+# bump when the stored arrays change, older snapshots are then rejected
+_SNAPSHOT_FORMAT = 2
+
+# the fixed part of the local file header of a zip member
+_zip_local_header = struct.Struct("<4s5H3I2H")
+
+
+def _pack_strings(
+    strings: list[str],
+) -> tuple[npt.NDArray[np.uint8], npt.NDArray[np.int64]]:
+    # a table of strings as their UTF-8 bytes separated by null bytes (which
+    # class names, file names and python source can not contain) and the
+    # offset of each string: string i is blob[offsets[i]:offsets[i + 1] - 1]
+    text = "\0".join(strings)
+    if text.count("\0") != max(len(strings) - 1, 0):
+        raise ValueError("snapshot strings can not contain null characters")
+    blob = np.frombuffer(text.encode(), dtype=np.uint8)
+    if not strings:
+        return blob, np.zeros(1, dtype=np.int64)
+    offsets = np.concatenate(
+        [[0], np.flatnonzero(blob == 0) + 1, [blob.size + 1]]
+    ).astype(np.int64)
+    return blob, offsets
+
+
+def _unpack_strings(
+    blob: npt.NDArray[np.uint8], offsets: npt.NDArray[np.int64]
+) -> list[str]:
+    if offsets.size == 1:
+        return []
+    return blob.tobytes().decode().split("\0")
+
+
+def _save_arrays(filename: str, arrays: dict[str, Any], meta: dict[str, Any]) -> None:
+    # an uncompressed .npz of the arrays, with the JSON of meta as "meta"
+    meta = {"format": _SNAPSHOT_FORMAT, **meta}
+    meta_bytes = np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8)
+    with open(filename, "wb") as fi:
+        np.savez(fi, meta=meta_bytes, **arrays)
+
+
+def _load_member(
+    fi: Any, info: zipfile.ZipInfo, filename: str, mmap: bool
+) -> npt.NDArray[Any]:
+    # an .npy member of an uncompressed zip file, memory-mapped in place
+    fi.seek(info.header_offset)
+    header = _zip_local_header.unpack(fi.read(_zip_local_header.size))
+    name_length, extra_length = header[-2:]
+    fi.seek(name_length + extra_length, 1)
+    version = np.lib.format.read_magic(fi)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fi)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fi)
+    order: Literal["C", "F"] = "F" if fortran_order else "C"
+    array: npt.NDArray[Any]
+    if not mmap or 0 in shape:
+        count = int(np.prod(shape))
+        array = np.fromfile(fi, dtype=dtype, count=count)
+        return array.reshape(tuple(shape), order=order)
+    array = np.memmap(
+        filename, dtype=dtype, mode="r", offset=fi.tell(), shape=shape, order=order
+    )
+    return array
+
+
+def _load_arrays(
+    filename: str, mmap: bool = True
+) -> tuple[dict[str, npt.NDArray[Any]], dict[str, Any]]:
+    # the arrays and meta of _save_arrays. With mmap, the arrays are read-only
+    # memory maps of the file rather than copies.
+    arrays = {}
+    with zipfile.ZipFile(filename) as archive, open(filename, "rb") as fi:
+        for info in archive.infolist():
+            name = info.filename.removesuffix(".npy")
+            if info.compress_type == zipfile.ZIP_STORED:
+                arrays[name] = _load_member(fi, info, filename, mmap)
+            else:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member)
+    meta = json.loads(arrays.pop("meta").tobytes())
+    if meta.get("format") != _SNAPSHOT_FORMAT:
+        raise ValueError(
+            f"{filename} is not a snapshot of this version of inheritance_explorer"
+        )
+    return arrays, meta
@@ -1,3 +1,12 @@
+import collections
+import hashlib
+import linecache
+import textwrap
+from typing import Any, Optional, OrderedDict
+
+import numpy as np
+
+
 class ClassForTesting:
     misc_attr: int = 1
 
@@ -20,3 +29,192 @@ class ClassForTesting4(ClassForTesting2):
         b = a * 10
         c = b + 10
         return c
+
+
+# statement templates for the synthetic method bodies
+_statements = [
+    "a = a * {v}",
+    "b = b + a - {v}",
+    "if a > {v}:\n        a = b",
+    "for i in range({v}):\n        b += i",
+    "c = [x * {v} for x in range(a)]",
+    "a = max(a, b, {v})",
+    "b = self.helper(a, {v})",
+    "while a < {v}:\n        a += 1",
+    "d = {{k: a for k in range({v})}}",
+    "try:\n        a = a // b\n    except ZeroDivisionError:\n        a = {v}",
+    "with self.lock:\n        b = a",
+    "e = (a, b, {v})",
+    "a, b = b, a",
+    "assert a != {v}",
+    "b = [str(x) for x in self.items if x]",
+    "a = sum(self.values[{v}:])",
+    "b = not a",
+    "a = b if b else {v}",
+]
+
+
+def make_sources(
+    n_sources: int, n_families: Optional[int] = None, seed: int = 0
+) -> OrderedDict[int, str]:
+    """
+    method bodies arranged in families of near-duplicates
+
+    Each family has a random base body, and each source is a copy of its
+    family's base body with a small number of statements replaced.
+
+    Parameters
+    ----------
+    n_sources: int
+        the number of sources
+    n_families: int
+        (optional) the number of families, default is n_sources // 10
+    seed: int
+        (optional) the random seed, default 0
+
+    Returns
+    -------
+    OrderedDict[int, str]
+        the source of each function, "def func(self, a, b): ...", keyed by
+        1, 2, ..., n_sources
+    """
+    rng = np.random.default_rng(seed)
+    if n_families is None:
+        n_families = max(n_sources // 10, 1)
+
+    def _statement() -> str:
+        return "    " + _statements[rng.integers(len(_statements))].format(
+            v=rng.integers(100)
+        )
+
+    bases = [
+        [_statement() for _ in range(rng.integers(4, 16))] for _ in range(n_families)
+    ]
+    sources: OrderedDict[int, str] = collections.OrderedDict()
+    for isrc in range(n_sources):
+        body = list(bases[rng.integers(n_families)])
+        for _ in range(rng.integers(0, 3)):
+            body[rng.integers(len(body))] = _statement()
+        src = "def func(self, a, b):\n" + "\n".join(body) + "\n    return a + b\n"
+        sources[isrc + 1] = src
+    return sources
+
+
+def make_hierarchy(
+    n_classes: int = 100,
+    depth: int = 10,
+    branching: int = 3,
+    diamond_rate: float = 0.0,
+    override_rate: float = 0.3,
+    n_families: Optional[int] = None,
+    funcname: str = "method",
+    classes_per_file: int = 1000,
+    seed: int = 0,
+) -> Any:
+    """
+    a synthetic class hierarchy, for tests and benchmarks
+
+    Classes are added breadth first, each with up to branching children,
+    until depth is reached. Further classes are then added below randomly
+    chosen classes above the maximum depth. The source of the classes is
+    compiled in chunks that are added to linecache, as if they were files,
+    so that inspect can find the source of their functions.
+
+    Parameters
+    ----------
+    n_classes: int
+        (optional) the number of classes, default 100
+    depth: int
+        (optional) the maximum number of levels below the base class,
+        default 10
+    branching: int
+        (optional) the number of children of each class until depth is
+        reached, default 3
+    diamond_rate: float
+        (optional) the fraction of classes with a second parent, chosen from
+        the earlier classes. Second parents that would give an inconsistent
+        method resolution order are skipped. Default 0.
+    override_rate: float
+        (optional) the fraction of classes that override funcname, which is
+        always defined by the base class. Default 0.3.
+    n_families: int
+        (optional) the number of families of near-duplicate overrides, see
+        make_sources. Default is a tenth of the number of overrides.
+    funcname: str
+        (optional) the name of the overridden function, default "method"
+    classes_per_file: int
+        (optional) the number of classes in each chunk of source, default
+        1000. inspect is slow to extract functions from very long files.
+    seed: int
+        (optional) the random seed, default 0
+
+    Returns
+    -------
+    type
+        the base class, "Class0"
+    """
+    rng = np.random.default_rng(seed)
+    levels = [0]
+    bases: list[tuple[int, ...]] = [()]
+    # classes that only exist to check the method resolution order of
+    # diamonds before writing the source
+    mro_check: list[type] = [type("Class0", (), {})]
+    n_children = [0]
+    frontier = collections.deque([0] if depth > 0 else [])
+    open_parents = [0] if depth > 0 else []
+    for icls in range(1, n_classes):
+        if frontier:
+            parent = frontier[0]
+        else:
+            parent = open_parents[rng.integers(len(open_parents))]
+        cls_bases: tuple[int, ...] = (parent,)
+        if rng.random() < diamond_rate:
+            second = open_parents[rng.integers(len(open_parents))]
+            for candidate in ((parent, second), (second, parent)):
+                if second == parent:
+                    break
+                try:
+                    type("check", tuple(mro_check[i] for i in candidate), {})
+                except TypeError:
+                    continue
+                cls_bases = candidate
+                break
+        bases.append(cls_bases)
+        mro_check.append(
+            type(f"Class{icls}", tuple(mro_check[i] for i in cls_bases), {})
+        )
+        levels.append(max(levels[i] for i in cls_bases) + 1)
+        n_children.append(0)
+        n_children[parent] += 1
+        if frontier and n_children[parent] >= branching:
+            frontier.popleft()
+        if levels[icls] < depth:
+            frontier.append(icls)
+            open_parents.append(icls)
+
+    overrides = [0] + [
+        icls for icls in range(1, n_classes) if rng.random() < override_rate
+    ]
+    sources = iter(make_sources(len(overrides), n_families, seed=seed).values())
+    override_src = {}
+    for icls in overrides:
+        src = next(sources).replace("def func(", f"def {funcname}(", 1)
+        override_src[icls] = textwrap.indent(src, "    ")
+
+    namespace: dict[str, Any] = {"__name__": "synthetic_hierarchy"}
+    for ifile in range(0, n_classes, classes_per_file):
+        lines = []
+        for icls in range(ifile, min(ifile + classes_per_file, n_classes)):
+            base_names = ", ".join(f"Class{i}" for i in bases[icls])
+            lines.append(f"class Class{icls}({base_names}):")
+            lines.append(override_src.get(icls, "    pass\n"))
+        src = "\n".join(lines)
+
+        # the source is kept in linecache, without a modification time so
+        # that linecache.checkcache keeps it. Bases are always in an earlier
+        # chunk or earlier in the same chunk.
+        digest = hashlib.sha1(src.encode()).hexdigest()[:16]
+        filename = f"<synthetic hierarchy {digest}>"
+        linecache.cache[filename] = (len(src), None, src.splitlines(True), filename)
+        exec(compile(src, filename, "exec"), namespace)
+    return namespace["Class0"]
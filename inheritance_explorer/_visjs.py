@@ -0,0 +1,252 @@
+"""Self-contained vis.js HTML and JSON output of interactive graphs."""
+
+import html
+import json
+import os
+from typing import Any, Iterable, Optional, TextIO
+
+# the root id, nodes and edges of a collapsed subtree of a level-of-detail graph
+_Chunk = tuple[int, Iterable[dict[str, Any]], Iterable[dict[str, Any]]]
+
+# the vis-network release bundled with pyvis, and its CDN links
+_vis_version = "9.1.2"
+_vis_cdn = f"https://cdnjs.cloudflare.com/ajax/libs/vis-network/{_vis_version}/dist"
+_vis_remote_resources = f"""\
+<link rel="stylesheet" href="{_vis_cdn}/dist/vis-network.min.css" \
+integrity="sha512-WgxfT5LWjfszlPHXRmBWHkV2eceiWTOBvrKCNbdgDYTHrT2AeLCGbF4sZlZw3UMN3WtL0tGUoIAKsu8mllg/XA==" \
+crossorigin="anonymous" referrerpolicy="no-referrer" />
+<script src="{_vis_cdn}/vis-network.min.js" \
+integrity="sha512-LnvoEWDFrqGHlHmDD2101OrLcbsfkrzoSpvtSQtxK3RMnRV0eOkhhBN2dXHKRrUU8p2DGRTk35n4O8nWSVe1mQ==" \
+crossorigin="anonymous" referrerpolicy="no-referrer"></script>
+"""
+
+_html_head = """\
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+{resources}
+<style type="text/css">
+#mynetwork {{
+    width: {width};
+    height: {height};
+    background-color: {bgcolor};
+    border: 1px solid lightgray;
+    position: relative;
+}}
+</style>
+</head>
+<body>
+<h1 style="text-align: center">{heading}</h1>
+<div id="mynetwork"></div>
+<script type="text/javascript">
+"""
+
+_html_network = """
+var container = document.getElementById("mynetwork");
+var network = new vis.Network(container, {nodes: nodes, edges: edges}, options);
+"""
+
+# level-of-detail graphs: the edges of a chunk wait in pendingEdges until both
+# of their nodes are shown, and clicking a collapsed node ("+<node id>")
+# replaces it with the chunk of its subtree
+_lod_script = """
+var pendingEdges = [];
+function addEdges(newEdges) {
+    var ready = [];
+    var waiting = [];
+    pendingEdges.concat(newEdges).forEach(function (edge) {
+        if (nodes.get(edge.from) !== null && nodes.get(edge.to) !== null) {
+            ready.push(edge);
+        } else {
+            waiting.push(edge);
+        }
+    });
+    pendingEdges = waiting;
+    edges.add(ready);
+}
+function loadChunk(root, callback) {
+    if (chunkUrl === null) {
+        var element = document.getElementById("chunk-" + root);
+        callback(JSON.parse(element.textContent));
+    } else {
+        fetch(chunkUrl + root + ".json")
+            .then(function (response) { return response.json(); })
+            .then(callback);
+    }
+}
+addEdges(topEdges);
+network.on("click", function (params) {
+    if (params.nodes.length !== 1) {
+        return;
+    }
+    var nodeId = String(params.nodes[0]);
+    if (nodeId.charAt(0) !== "+") {
+        return;
+    }
+    loadChunk(nodeId.slice(1), function (chunk) {
+        if (nodes.get(nodeId) === null) {
+            return;  // already expanded
+        }
+        nodes.remove(nodeId);
+        edges.remove(nodeId);
+        nodes.add(chunk.nodes);
+        addEdges(chunk.edges);
+    });
+});
+"""
+
+_html_tail = """\
+</body>
+</html>
+"""
+
+_cdn_resources_options = ("in_line", "remote")
+
+
+def _vis_resources(cdn_resources: str) -> str:
+    # the script and style tags that load vis-network
+    if cdn_resources not in _cdn_resources_options:
+        raise ValueError(
+            f"unexpected value, {cdn_resources=}, must be one of "
+            f"{_cdn_resources_options}"
+        )
+    if cdn_resources == "remote":
+        return _vis_remote_resources
+
+    import pyvis
+
+    lib_dir = os.path.join(
+        os.path.dirname(pyvis.__file__), "templates", "lib", f"vis-{_vis_version}"
+    )
+    with open(os.path.join(lib_dir, "vis-network.css")) as fi:
+        css = fi.read()
+    with open(os.path.join(lib_dir, "vis-network.min.js")) as fi:
+        js = fi.read()
+    return f"<style>{css}</style>\n<script>{js}</script>\n"
+
+
+def _default_options(layout: Optional[bool] = None) -> dict[str, Any]:
+    # the vis.js options of a pyvis Network
+    from pyvis.options import Options
+
+    options: dict[str, Any] = json.loads(Options(layout).to_json())
+    return options
+
+
+def _merge_options(options: dict[str, Any], updates: dict[str, Any]) -> None:
+    # recursively update nested vis.js options in place
+    for key, value in updates.items():
+        if isinstance(value, dict) and isinstance(options.get(key), dict):
+            _merge_options(options[key], value)
+        else:
+            options[key] = value
+
+
+def _script_json(value: Any) -> str:
+    # JSON that is safe to include in a <script> element
+    return json.dumps(value).replace("</", "<\\/")
+
+
+def _write_array(output: TextIO, elements: Iterable[Any]) -> None:
+    # write a JSON array one element at a time, in blocks of lines
+    lines = ["["]
+    separator = "\n"
+    for element in elements:
+        lines.append(separator + _script_json(element))
+        separator = ",\n"
+        if len(lines) >= 10000:
+            output.writelines(lines)
+            lines.clear()
+    lines.append("\n]")
+    output.writelines(lines)
+
+
+def _write_chunk(
+    output: TextIO, nodes: Iterable[dict[str, Any]], edges: Iterable[dict[str, Any]]
+) -> None:
+    # write the nodes and edges of a chunk as a JSON object
+    output.write('{"nodes": ')
+    _write_array(output, nodes)
+    output.write(',\n"edges": ')
+    _write_array(output, edges)
+    output.write("}")
+
+
+def _write_visjs(
+    output: TextIO,
+    nodes: Iterable[dict[str, Any]],
+    edges: Iterable[dict[str, Any]],
+    options: dict[str, Any],
+    output_format: str = "html",
+    height: str = "600px",
+    width: str = "100%",
+    bgcolor: str = "#ffffff",
+    heading: str = "",
+    cdn_resources: str = "in_line",
+    chunks: Optional[Iterable[_Chunk]] = None,
+    chunk_dir: Optional[str] = None,
+    chunk_url: str = "",
+) -> None:
+    # write the vis.js nodes, edges and options as a JSON object or as a
+    # self-contained HTML page. For level-of-detail graphs, chunks are the
+    # (root id, nodes, edges) of each collapsed subtree, which are written
+    # to chunk_dir (and downloaded from chunk_url) or included in the output.
+    if output_format not in ("html", "json"):
+        raise ValueError(
+            f"unexpected value, {output_format=}, must be one of 'html' or 'json'"
+        )
+    if chunks is not None and chunk_dir is not None:
+        for root, chunk_nodes, chunk_edges in chunks:
+            with open(os.path.join(chunk_dir, f"{root}.json"), "w") as fi:
+                _write_chunk(fi, chunk_nodes, chunk_edges)
+        chunks = ()
+
+    if output_format == "json":
+        output.write('{"nodes": ')
+        _write_array(output, nodes)
+        output.write(',\n"edges": ')
+        _write_array(output, edges)
+        output.write(f',\n"options": {_script_json(options)}')
+        if chunks is not None and chunk_dir is None:
+            output.write(',\n"chunks": {')
+            separator = "\n"
+            for root, chunk_nodes, chunk_edges in chunks:
+                output.write(f'{separator}"{root}": ')
+                _write_chunk(output, chunk_nodes, chunk_edges)
+                separator = ",\n"
+            output.write("\n}")
+        output.write("}\n")
+        return
+
+    output.write(
+        _html_head.format(
+            title=html.escape(heading or "inheritance_explorer"),
+            resources=_vis_resources(cdn_resources),
+            width=html.escape(width),
+            height=html.escape(height),
+            bgcolor=html.escape(bgcolor),
+            heading=html.escape(heading),
+        )
+    )
+    output.write("var nodes = new vis.DataSet(")
+    _write_array(output, nodes)
+    if chunks is None:
+        output.write(");\nvar edges = new vis.DataSet(")
+        _write_array(output, edges)
+        output.write(");")
+    else:
+        output.write(");\nvar edges = new vis.DataSet([]);\nvar topEdges = ")
+        _write_array(output, edges)
+        output.write(f";\nvar chunkUrl = {_script_json(chunk_url or None)};")
+    output.write(f"\nvar options = {_script_json(options)};")
+    output.write(_html_network)
+    if chunks is not None:
+        output.write(_lod_script)
+    output.write("</script>\n")
+    for root, chunk_nodes, chunk_edges in chunks or ():
+        output.write(f'<script type="application/json" id="chunk-{root}">')
+        _write_chunk(output, chunk_nodes, chunk_edges)
+        output.write("</script>\n")
+    output.write(_html_tail)
@@ -8,17 +8,11 @@ from inheritance_explorer import ClassGraphTree
 
 
 def find_closest_source(cgt: ClassGraphTree, node_id: int):
-    # recursive backwards walk to find a node that overrides the source
-    if node_id in cgt._override_src:
-        # it overrides, get the source
-        return node_id, cgt.get_source_code(node_id)
-    else:
-        # check parent
-        current_node = cgt._node_list[node_id - 1]
-        if current_node.parent_id is None:
-            return None, None
-        else:
-            return find_closest_source(cgt, int(current_node.parent_id))
+    # the node that defines the source used by a node, and its source
+    src_id = cgt.defining_node(node_id)
+    if src_id is None:
+        return None, None
+    return src_id, cgt.get_source_code(src_id)
 
 
 # it does not, get base class source
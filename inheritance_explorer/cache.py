@@ -0,0 +1,194 @@
+"""On-disk cache of built ClassGraphTree results."""
+
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+from typing import Any, Optional
+
+from inheritance_explorer import __version__
+from inheritance_explorer.inheritance_explorer import ClassGraphTree
+from inheritance_explorer.static import StaticClass
+
+# bump when the stored state changes to invalidate existing entries
+_CACHE_FORMAT = 3
+
+
+def _default_cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.environ.get(
+        "INHERITANCE_EXPLORER_CACHE_DIR",
+        os.path.join(cache_home, "inheritance_explorer"),
+    )
+
+
+def _file_stamp(filename: str) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class TreeCache:
+    """
+    A directory of built ClassGraphTree results
+
+    Each entry holds the node list, override sources, source locations and
+    similarity results of a tree, along with the modification time and size
+    of every source file that defines one of its classes. An entry is only
+    used if none of those files have changed. Classes that are added to the
+    hierarchy from new source files do not invalidate an entry, so include
+    the modules that define them in the key (as the CLI does with
+    --import_list). Entries are pickle files, so only use a cache directory
+    that you trust.
+
+    Parameters
+    ----------
+    cache_dir: str
+        (optional) the cache directory. Defaults to the
+        INHERITANCE_EXPLORER_CACHE_DIR environment variable if set, otherwise
+        $XDG_CACHE_HOME/inheritance_explorer (~/.cache/inheritance_explorer).
+    max_size: int
+        (optional) the maximum total size of the cache in bytes. The least
+        recently used entries are removed when it is exceeded. Default is
+        256 MB.
+    """
+
+    _suffix = ".pkl"
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size: int = 256 * 2**20):
+        if cache_dir is None:
+            cache_dir = _default_cache_dir()
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    @staticmethod
+    def key(module_class: str, **options: Any) -> str:
+        """
+        the cache key for a tree
+
+        Parameters
+        ----------
+        module_class: str
+            the qualified name of the base class, e.g. "matplotlib.axes.Axes"
+        options:
+            the ClassGraphTree keyword arguments, and anything else that
+            changes the tree (e.g. additional modules to import)
+
+        Returns
+        -------
+        str
+            the hex digest of the key
+        """
+        key = json.dumps(
+            [_CACHE_FORMAT, __version__, module_class, options],
+            sort_keys=True,
+            default=repr,
+        )
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self._suffix)
+
+    def load(self, key: str) -> ClassGraphTree | None:
+        """
+        load a tree from the cache
+
+        Parameters
+        ----------
+        key: str
+            the key from TreeCache.key
+
+        Returns
+        -------
+        ClassGraphTree | None
+            the cached tree, or None if there is no entry or any of its source
+            files have changed. The class references of a cached tree (e.g.
+            ClassGraphTree.baseclass) are None.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fi:
+                entry = pickle.load(fi)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        for filename, stamp in entry["source_files"].items():
+            if _file_stamp(filename) != stamp:
+                self._remove(path)
+                return None
+
+        # mark the entry as recently used for the eviction
+        os.utime(path)
+        return ClassGraphTree._from_state(entry["state"])
+
+    def store(self, key: str, cgt: ClassGraphTree) -> None:
+        """
+        store a tree in the cache, evicting old entries if needed
+
+        Parameters
+        ----------
+        key: str
+            the key from TreeCache.key
+        cgt: ClassGraphTree
+            the tree to store. Its similarity results are computed first unless
+            it was initialized with compute_similarity="never".
+        """
+        source_files: dict[str, tuple[int, int] | None] = {}
+        for child in cgt._node_list.classes:
+            if isinstance(child, StaticClass):
+                filename = child.filename
+            else:
+                module = sys.modules.get(getattr(child, "__module__", ""))
+                filename = getattr(module, "__file__", None)
+            if filename is not None and filename not in source_files:
+                source_files[filename] = _file_stamp(filename)
+        entry = {"source_files": source_files, "state": cgt._get_state()}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # write to a temporary file first so that readers never see a partial
+        # entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fi:
+            pickle.dump(entry, fi, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))
+        self.evict()
+
+    def _entries(self) -> list[os.DirEntry[str]]:
+        if not os.path.isdir(self.cache_dir):
+            return []
+        return [
+            e
+            for e in os.scandir(self.cache_dir)
+            if e.is_file() and e.name.endswith(self._suffix)
+        ]
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @property
+    def size(self) -> int:
+        """the total size of the cache entries in bytes"""
+        return sum(e.stat().st_size for e in self._entries())
+
+    def evict(self) -> None:
+        """remove the least recently used entries until size <= max_size"""
+        entries = [(e.stat(), e.path) for e in self._entries()]
+        total = sum(stat.st_size for stat, _ in entries)
+        for stat, path in sorted(entries, key=lambda e: e[0].st_mtime_ns):
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= stat.st_size
+
+    def clear(self) -> None:
+        """remove all of the cache entries"""
+        for e in self._entries():
+            self._remove(e.path)
@@ -2,12 +2,19 @@
 for instructions and options.
 """
 
+import concurrent.futures
 import importlib
+import json
 import os
+import sys
+from typing import Any, Optional
 
 import click
 
+from inheritance_explorer.cache import TreeCache
 from inheritance_explorer.inheritance_explorer import ClassGraphTree
+from inheritance_explorer.similarity import SourceFingerprint
+from inheritance_explorer.stats import BuildStats
 
 
 @click.command()
@@ -22,7 +29,43 @@ from inheritance_explorer.inheritance_explorer import ClassGraphTree
     "--import_list", default=None, help="comma-separated list of modules to import"
 )
 @click.option("--funcname", default=None, help="function name to track")
-def map_class(module_class, output_file, output_format, import_list, funcname):
+@click.option(
+    "--cache_dir",
+    default=None,
+    help="directory of cached results (default is ~/.cache/inheritance_explorer)",
+)
+@click.option(
+    "--no-cache",
+    "--no_cache",
+    "no_cache",
+    is_flag=True,
+    default=False,
+    help="do not read or write cached results",
+)
+@click.option(
+    "--profile",
+    default=None,
+    is_flag=False,
+    flag_value="-",
+    help="print the wall time of each phase as JSON, or write it to a file",
+)
+@click.option(
+    "--profile_functions",
+    is_flag=True,
+    default=False,
+    help="also run cProfile and include the slowest functions with --profile",
+)
+def map_class(
+    module_class,
+    output_file,
+    output_format,
+    import_list,
+    funcname,
+    cache_dir,
+    no_cache,
+    profile,
+    profile_functions,
+):
     """
     map a class and save the graph to a file. requires graphviz installation.
 
@@ -31,9 +74,267 @@ def map_class(module_class, output_file, output_format, import_list, funcname):
     For example, matplotlib.axes.Axes with map from Axes, which can
     be imported from matplotlib.axes
 
-    OUTPUT_FILE : the output file for saving the graph
+    OUTPUT_FILE : the output file for saving the graph. DOT files (.dot, .gv
+    or .raw, or --output_format dot, gv or raw) are written directly, without
+    graphviz. Use - to write DOT to stdout, e.g. to pipe into graphviz:
+
+    \b
+        $ inheritance_explorer matplotlib.artist.Artist - | dot -Tsvg -o artist.svg
+
+    Results are cached and re-used while the source files of the mapped
+    classes are unchanged, unless --no-cache is set.
+    """
+
+    if import_list is not None:
+        import_list = [m.strip() for m in import_list.split(",")]
+
+    stats = BuildStats(profile=profile_functions)
+    cache = None if no_cache else TreeCache(cache_dir)
+    cgt = _load_or_build_tree(cache, module_class, import_list, funcname, stats)
+
+    # and save it
+    fmt = _output_format(output_file, output_format)
+    if output_file == "-" or fmt in _dot_formats:
+        _write_dot(cgt, output_file)
+    else:
+        dot_graph = cgt.graph()
+        with stats.phase("render"):
+            dot_graph.write(output_file, format=fmt)
+
+    # keep stdout for the graph when piping it
+    _write_profile(stats, profile, err=output_file == "-")
+    return 0
+
+
+@click.command()
+@click.argument("manifest", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--cache_dir",
+    default=None,
+    help="directory of cached results (default is ~/.cache/inheritance_explorer)",
+)
+@click.option(
+    "--no-cache",
+    "--no_cache",
+    "no_cache",
+    is_flag=True,
+    default=False,
+    help="do not read or write cached results",
+)
+@click.option(
+    "--n_render",
+    default=1,
+    type=int,
+    help="number of graphs to render concurrently (default 1)",
+)
+@click.option(
+    "--profile",
+    default=None,
+    is_flag=False,
+    flag_value="-",
+    help="print the wall time of each phase as JSON, or write it to a file",
+)
+@click.option(
+    "--profile_functions",
+    is_flag=True,
+    default=False,
+    help="also run cProfile and include the slowest functions with --profile",
+)
+def map_batch(manifest, cache_dir, no_cache, n_render, profile, profile_functions):
+    """
+    map many classes in a single process and save each graph to a file.
+    requires graphviz installation.
+
+    MANIFEST : a .toml or .json file with a list of graphs to build, e.g.
+
+    \b
+        [defaults]
+        funcname = "draw"
+        [[graphs]]
+        module_class = "matplotlib.artist.Artist"
+        output_file = "artist.svg"
+        [[graphs]]
+        module_class = "matplotlib.lines.Line2D"
+        output_file = "line2d.png"
+        import_list = ["mpl_toolkits.mplot3d"]
+
+    Each graph takes module_class and output_file, and optionally funcname,
+    import_list and output_format, as in map_class (DOT files are written
+    directly, without graphviz). The optional defaults
+    apply to every graph, and relative output files are relative to the
+    directory of the manifest.
+
+    Modules are imported once, the parsed sources of the similarity
+    comparisons are shared between graphs and results are cached as in
+    map_class. Graphs that fail are reported and skipped.
     """
+    graphs = _read_manifest(manifest)
+    stats = BuildStats(profile=profile_functions)
+    cache = None if no_cache else TreeCache(cache_dir)
+    fingerprints: dict[str, SourceFingerprint] = {}
+
+    # trees are built in this thread, since importing is not thread-safe, and
+    # each is rendered (by a graphviz subprocess) while the next is built
+    failed: list[tuple[dict[str, Any], BaseException]] = []
+    with concurrent.futures.ThreadPoolExecutor(max(n_render, 1)) as pool:
+        rendering = {}
+        for graph in graphs:
+            try:
+                cgt = _load_or_build_tree(
+                    cache,
+                    graph["module_class"],
+                    graph["import_list"],
+                    graph["funcname"],
+                    stats,
+                    similarity_container_kwargs={"fingerprints": fingerprints},
+                )
+                fmt = _output_format(graph["output_file"], graph["output_format"])
+                if fmt in _dot_formats:
+                    _write_dot(cgt, graph["output_file"])
+                    continue
+                pydot_graph = cgt.graph()
+            except Exception as err:
+                failed.append((graph, err))
+                continue
+            future = pool.submit(
+                _render, stats, pydot_graph, graph["output_file"], format=fmt
+            )
+            rendering[future] = graph
+        for future in concurrent.futures.as_completed(rendering):
+            exc = future.exception()
+            if exc is not None:
+                failed.append((rendering[future], exc))
+
+    for graph, exc in failed:
+        msg = f"{graph['module_class']} -> {graph['output_file']} failed: {exc!r}"
+        click.echo(msg, err=True)
+    _write_profile(stats, profile)
+    if failed:
+        raise click.ClickException(f"{len(failed)} of {len(graphs)} graphs failed")
+    return 0
+
+
+def _render(stats: BuildStats, dot_graph: Any, output_file: str, format: str) -> None:
+    with stats.phase("render"):
+        dot_graph.write(output_file, format=format)
+
+
+# the output formats that are written by ClassGraphTree.write_dot. "raw" is
+# the DOT source in pydot, while graphviz's "dot" and "gv" would add layout
+# positions.
+_dot_formats = ("dot", "gv", "raw")
+
+
+def _write_dot(cgt: ClassGraphTree, output_file: str) -> None:
+    # write the DOT source of a tree to a file, or to stdout for "-"
+    if output_file == "-":
+        cgt.write_dot(sys.stdout)
+    else:
+        cgt.write_dot(output_file)
+
+
+def _write_profile(
+    stats: BuildStats, profile: Optional[str], err: bool = False
+) -> None:
+    # print the stats (for "-", to stderr if err) or write them to a file
+    if profile == "-":
+        click.echo(stats.to_json(), err=err)
+    elif profile is not None:
+        stats.to_json(profile)
+
+
+_manifest_keys = (
+    "module_class",
+    "output_file",
+    "funcname",
+    "import_list",
+    "output_format",
+)
+
+
+def _get_toml_loader() -> Any:
+    if sys.version_info >= (3, 11):
+        import tomllib
 
+        return tomllib
+    try:
+        import tomli
+    except ImportError as err:
+        msg = "TOML manifests require tomli on python<3.11, install it with pip install tomli"
+        raise ImportError(msg) from err
+    return tomli
+
+
+def _read_manifest(manifest: str) -> list[dict[str, Any]]:
+    # the graphs of a manifest file, with the defaults applied and output
+    # files made relative to the manifest
+    if manifest.endswith(".json"):
+        with open(manifest) as fi:
+            contents = json.load(fi)
+    elif manifest.endswith(".toml"):
+        with open(manifest, "rb") as fi:
+            contents = _get_toml_loader().load(fi)
+    else:
+        raise ValueError(
+            f"unexpected value, {manifest=}, must be a .toml or .json file"
+        )
+
+    defaults = contents.get("defaults", {})
+    graphs = []
+    manifest_dir = os.path.dirname(os.path.abspath(manifest))
+    for entry in contents.get("graphs", []):
+        graph: dict[str, Any] = {key: None for key in _manifest_keys}
+        graph.update(defaults)
+        graph.update(entry)
+        unexpected = set(graph) - set(_manifest_keys)
+        if unexpected:
+            raise ValueError(f"unexpected value, {unexpected=} in {manifest}")
+        if graph["module_class"] is None or graph["output_file"] is None:
+            raise ValueError(
+                f"module_class and output_file are required, found {entry}"
+            )
+        if isinstance(graph["import_list"], str):
+            graph["import_list"] = [m.strip() for m in graph["import_list"].split(",")]
+        graph["output_file"] = os.path.join(manifest_dir, graph["output_file"])
+        graphs.append(graph)
+    return graphs
+
+
+def _output_format(output_file: str, output_format: Optional[str]) -> str:
+    # the output format, or the file extension of output_file, or svg
+    if output_format is not None:
+        return output_format
+    _, file_extension = os.path.splitext(output_file)
+    if file_extension == "":
+        return "svg"
+    return file_extension.replace(".", "")
+
+
+def _load_or_build_tree(
+    cache: Optional[TreeCache],
+    module_class: str,
+    import_list: Optional[list[str]],
+    funcname: Optional[str],
+    stats: BuildStats,
+    **kwargs: Any,
+) -> ClassGraphTree:
+    # a tree from the cache, or a new tree that is then stored in the cache.
+    # Either way, the tree records its phases in stats.
+    key = TreeCache.key(module_class, funcname=funcname, import_list=import_list)
+    cgt = None
+    if cache is not None:
+        with stats.phase("cache"):
+            cgt = cache.load(key)
+    if cgt is None:
+        cgt = _build_tree(module_class, import_list, funcname, stats=stats, **kwargs)
+        if cache is not None:
+            cache.store(key, cgt)
+    else:
+        cgt.stats = stats
+    return cgt
+
+
+def _build_tree(module_class, import_list, funcname, **kwargs) -> ClassGraphTree:
     # import the class of interest
     mod_cls = module_class.split(".")
     if len(mod_cls) > 2:
@@ -48,7 +349,6 @@ def map_class(module_class, output_file, output_format, import_list, funcname):
 
     # import any other modules that we want in scope
     if import_list is not None:
-        import_list = [m.strip() for m in import_list.split(",")]
         modules = [importlib.import_module(mod) for mod in import_list]  # noqa: F841
 
     if funcname is not None:
@@ -56,14 +356,4 @@ def map_class(module_class, output_file, output_format, import_list, funcname):
             raise AttributeError(f"{funcname} is not an attribute of {cls}")
 
     # now build the graph
-    cgt = ClassGraphTree(cls, funcname=funcname)
-
-    # and save it
-    _, file_extension = os.path.splitext(output_file)
-    fmt = file_extension.replace(".", "")
-    if output_format is None and file_extension == "":
-        fmt = "svg"
-
-    cgt.graph().write(output_file, format=fmt)
-
-    return 0
+    return ClassGraphTree(cls, funcname=funcname, **kwargs)
@@ -1,54 +1,64 @@
 import collections
+import concurrent.futures
 import inspect
+import itertools
+import os
 import textwrap
-from typing import Any, Optional, OrderedDict
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterator,
+    Optional,
+    OrderedDict,
+    TextIO,
+)
 
-import matplotlib.pyplot as plt
-import networkx as nx
 import numpy as np
 import numpy.typing as npt
-import pydot
-from matplotlib.axes import Axes
-from matplotlib.colors import rgb2hex
-from pyvis.network import Network
 
-from inheritance_explorer.similarity import PycodeSimilarity
-
-
-class _ChildNode:
-    def __init__(
-        self,
-        child: Any,
-        child_id: int,
-        parent: Optional[Any] = None,
-        parent_id: Optional[int] = None,
-        color: Optional[str] = "#000000",
-    ):
-        self.child = child
-        self.child_name: str = str(child.__name__)
-        self._child_id = child_id
-        self.parent = parent
-
-        self._parent_id = parent_id
-        self.parent_name = None
-        if parent:
-            self.parent_name = parent.__name__
-
-        self.color = color
-        self._extra_info = "comment string"
-
-    @property
-    def child_id(self) -> str:
-        return str(self._child_id)
-
-    @property
-    def parent_id(self) -> str | None:
-        if self._parent_id:
-            return str(self._parent_id)
-        return None
-
-
-_similarity_container_types = PycodeSimilarity
+from inheritance_explorer._ancestry import _AncestryIndex
+from inheritance_explorer._node_table import _NodeNames, _NodeTable
+from inheritance_explorer._snapshot import (
+    _load_arrays,
+    _pack_strings,
+    _save_arrays,
+    _unpack_strings,
+)
+from inheritance_explorer._visjs import (
+    _Chunk,
+    _default_options,
+    _merge_options,
+    _write_visjs,
+)
+from inheritance_explorer.similarity import (
+    MinHashSimilarity,
+    PycodeSimilarity,
+    _get_scipy_sparse,
+    _source_digest,
+)
+from inheritance_explorer.static import StaticClass
+from inheritance_explorer.stats import BuildStats, _timed_phase
+
+# the plotting and graph packages are slow to import, and are only imported
+# by the methods that use them
+if TYPE_CHECKING:
+    import pydot
+    from matplotlib.axes import Axes
+    from pyvis.network import Network
+
+
+_similarity_container_types = PycodeSimilarity | MinHashSimilarity
+
+
+def _get_similarity_class(
+    similarity_container_class: str,
+) -> type[PycodeSimilarity] | type[MinHashSimilarity]:
+    if similarity_container_class == "PycodeSimilarity":
+        return PycodeSimilarity
+    elif similarity_container_class == "MinHashSimilarity":
+        return MinHashSimilarity
+    raise ValueError(f"unexpected value, {similarity_container_class=}")
 
 
 class ClassGraphTree:
@@ -59,9 +69,13 @@ class ClassGraphTree:
     ----------
 
     baseclass
-        the starting base class to begin mapping from
+        the starting base class to begin mapping from, either a class or a
+        StaticClass from inheritance_explorer.static.scan_package to map a
+        package without importing it
     funcname: str
-        (optional) the name of a function to watch for overrides
+        (optional) the name of a function to watch for overrides. With
+        funcnames, the function that is shown first, default is the first of
+        funcnames.
     default_color: str
         (optional) the default outline color of nodes, in any graphviz string
     func_override_color: str
@@ -73,9 +87,59 @@ class ClassGraphTree:
         set to 500.
     classes_to_exclude : List[str]
         (optional) a list of class names to exclude from the mapping.
+    traversal: str
+        (optional) how to map classes reached through more than one parent.
+        "dag" (the default) adds a single node for each class, with an edge
+        to each of its parents. "tree" adds a new node (and copies of all its
+        children) every time a class is reached.
+    similarity_method: str
+        (optional) the method used to build the similarity matrix, "permute"
+        (the default) or "pairwise". See PycodeSimilarity.
+    similarity_container_class: str
+        (optional) the similarity container used to build the similarity
+        matrix, "PycodeSimilarity" (the default, compares all pairs) or
+        "MinHashSimilarity" (only compares pairs that are likely to be
+        similar, for large numbers of overrides). With its default settings,
+        MinHashSimilarity misses some similar pairs (about 17% of the pairs
+        above a 0.75 cutoff in benchmarks/bench_minhash_recall.py). Increase
+        n_bands or decrease shingle_size with similarity_container_kwargs for
+        a higher recall at the cost of more comparisons.
+    similarity_container_kwargs: dict
+        (optional) additional keyword arguments for the similarity container,
+        e.g., {"n_bands": 64, "shingle_size": 4} for MinHashSimilarity.
+    n_workers: int
+        (optional) the number of processes to use when computing the
+        similarity matrix. Default is None, which computes it serially.
+    sparse_similarity: bool
+        (optional) if True, only the similarities above similarity_cutoff are
+        stored, in a scipy.sparse.csr_matrix (requires scipy). The matrix is
+        thresholded row by row as it is built, without ever holding the full
+        dense matrix. Default False.
+    similarity_dtype: str
+        (optional) the floating point dtype of the stored similarity matrix,
+        e.g. "float32" to halve its memory. Default is "float64".
+    compute_similarity: str
+        (optional) when to compute the similarity results. One of "lazy"
+        (the default, computed on first access of similarity_results or
+        similarity_sets), "eager" (computed on initialization), "background"
+        (computed in a background thread started on initialization) or
+        "never" (similarity_sets is empty and similarity_results is
+        unavailable).
+    stats: BuildStats
+        (optional) the BuildStats to record the wall time of each phase of
+        the build in, e.g. BuildStats(profile=True) to also run cProfile.
+        Default is a new BuildStats, available as the stats attribute.
+    funcnames: List[str]
+        (optional) the names of several functions to watch for overrides in a
+        single traversal. The overrides, sources and similarity results of
+        every function are collected, and select_funcname selects the
+        function that the graphs, similarity results and code comparison
+        widget show.
 
     """
 
+    _compute_similarity_options = ("lazy", "eager", "background", "never")
+
     def __init__(
         self,
         baseclass: Any,
@@ -85,99 +149,534 @@ class ClassGraphTree:
         similarity_cutoff: float = 0.75,
         max_recursion_level: int = 500,
         classes_to_exclude: Optional[list[str]] = None,
+        traversal: str = "dag",
+        similarity_method: str = "permute",
+        similarity_container_class: str = "PycodeSimilarity",
+        n_workers: Optional[int] = None,
+        compute_similarity: str = "lazy",
+        sparse_similarity: bool = False,
+        similarity_dtype: str = "float64",
+        similarity_container_kwargs: Optional[dict[str, Any]] = None,
+        stats: Optional[BuildStats] = None,
+        funcnames: Optional[list[str]] = None,
     ):
 
+        if stats is None:
+            stats = BuildStats()
+        self.stats = stats
         self.baseclass = baseclass
         self.basename: str = baseclass.__name__
+        if funcnames is None:
+            funcnames = [] if funcname is None else [funcname]
+        funcnames = list(dict.fromkeys(funcnames))
+        if funcname is None and len(funcnames) > 0:
+            funcname = funcnames[0]
+        elif funcname is not None and funcname not in funcnames:
+            raise ValueError(
+                f"unexpected value, {funcname=}, must be one of {funcnames}"
+            )
         self.funcname = funcname
+        self.funcnames = funcnames
         self._tracking_function = self.funcname is not None
+        # the overrides, sources and similarity results of each function
+        keys: list[Optional[str]] = [*funcnames] if funcnames else [None]
+        self._func_results: dict[Optional[str], dict[str, Any]] = {
+            name: _empty_func_results() for name in keys
+        }
         self.max_recursion_level = max_recursion_level
         self._nodenum: int = 0
-        self._node_list: list[_ChildNode] = []  # a list of unique ChildNodes
-        self._node_map: dict[int, str] = {}  # map of global node index to node name
-        self._override_src: OrderedDict[int, str] = collections.OrderedDict()
-        self._override_src_files: dict[int, str] = {}
+        # the nodes, indexed by node id - 1, and a map of node id to name
+        self._node_list = _NodeTable()
+        self._node_map = _NodeNames(self._node_list)
+        # the ancestry index of the nodes, built on first use
+        self._ancestry: _AncestryIndex | None = None
+        # caches for _get_source_location
+        self._source_location_cache: dict[Any, str] = {}
+        self._source_file_cache: dict[str, str | None] = {}
+        # cache of the normalized digest of each override source
+        self._source_digest_cache: dict[str, str] = {}
         self._current_node = 1  # the current global node, must start at 1
         self._default_color = default_color
         self._override_color = func_override_color
         self._graphviz_args_kwargs: dict[str, Any] = {}
         self.similarity_container: _similarity_container_types | None = None
-        self.similarity_results: dict[str, npt.NDArray[Any]]
+        self._similarity_future: concurrent.futures.Future[None] | None = None
         self.similarity_cutoff = similarity_cutoff
+        if similarity_method not in ("permute", "pairwise"):
+            raise ValueError(
+                f"unexpected value, {similarity_method=}, must be one of "
+                "'permute' or 'pairwise'"
+            )
+        self.similarity_method = similarity_method
+        self._similarity_class = _get_similarity_class(similarity_container_class)
+        self.similarity_container_class = similarity_container_class
+        if similarity_container_kwargs is None:
+            similarity_container_kwargs = {}
+        self.similarity_container_kwargs = similarity_container_kwargs
+        self.n_workers = n_workers
+        self.sparse_similarity = sparse_similarity
+        try:
+            self.similarity_dtype = np.dtype(similarity_dtype)
+        except TypeError:
+            raise ValueError(f"unexpected value, {similarity_dtype=}")
+        if not np.issubdtype(self.similarity_dtype, np.floating):
+            raise ValueError(
+                f"unexpected value, {similarity_dtype=}, must be a floating "
+                "point dtype"
+            )
+        if compute_similarity not in self._compute_similarity_options:
+            raise ValueError(
+                f"unexpected value, {compute_similarity=}, must be one of "
+                f"{self._compute_similarity_options}"
+            )
+        self.compute_similarity = compute_similarity
         if classes_to_exclude is None:
             classes_to_exclude = []
         self.classes_to_exclude = classes_to_exclude
+        if traversal not in ("dag", "tree"):
+            raise ValueError(
+                f"unexpected value, {traversal=}, must be one of 'dag' or 'tree'"
+            )
+        self.traversal = traversal
         self._build()
-        self._node_map_r: dict[str, int] = {
-            v: k for k, v in self._node_map.items()
-        }  # name to index
 
-    def _get_source_info(self, obj) -> Optional[str]:
-        if self.funcname is None:
+        if compute_similarity == "eager":
+            self._build_similarity()
+        elif compute_similarity == "background":
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+            self._similarity_future = executor.submit(self._build_similarity)
+            executor.shutdown(wait=False)
+
+    @property
+    def _node_map_r(self) -> dict[str, int]:
+        # map of class name to node id
+        return self._node_list.name_index
+
+    @property
+    def _selected(self) -> dict[str, Any]:
+        # the results of the selected function, in _func_results
+        return self._func_results[self.funcname]
+
+    @property
+    def _override_src(self) -> OrderedDict[int, str]:
+        override_src: OrderedDict[int, str] = self._selected["override_src"]
+        return override_src
+
+    @_override_src.setter
+    def _override_src(self, value: OrderedDict[int, str]) -> None:
+        self._selected["override_src"] = value
+
+    @property
+    def _override_src_files(self) -> dict[int, str]:
+        override_src_files: dict[int, str] = self._selected["override_src_files"]
+        return override_src_files
+
+    @_override_src_files.setter
+    def _override_src_files(self, value: dict[int, str]) -> None:
+        self._selected["override_src_files"] = value
+
+    @property
+    def _similarity_results(self) -> dict[str, Any] | None:
+        similarity_results: dict[str, Any] | None = self._selected["similarity_results"]
+        return similarity_results
+
+    @_similarity_results.setter
+    def _similarity_results(self, value: dict[str, Any] | None) -> None:
+        self._selected["similarity_results"] = value
+
+    @property
+    def _similarity_sets(self) -> dict[int, set[int]] | None:
+        similarity_sets: dict[int, set[int]] | None = self._selected["similarity_sets"]
+        return similarity_sets
+
+    @_similarity_sets.setter
+    def _similarity_sets(self, value: dict[int, set[int]] | None) -> None:
+        self._selected["similarity_sets"] = value
+
+    def select_funcname(self, funcname: str) -> None:
+        """
+        select the tracked function that the graphs, similarity results and
+        code comparison widget show
+
+        Parameters
+        ----------
+        funcname: str
+            one of funcnames
+        """
+        if funcname not in self.funcnames:
+            raise ValueError(
+                f"unexpected value, {funcname=}, must be one of {self.funcnames}"
+            )
+        if self._similarity_future is not None:
+            self._similarity_future.result()
+        self.funcname = funcname
+        overrides = np.zeros(len(self._node_list), dtype=bool)
+        overrides[
+            np.array(self._func_results[funcname]["override_ids"], dtype=int) - 1
+        ] = True
+        self._node_list.set_colors(overrides, self._override_color, self._default_color)
+        self._ancestry = None
+
+    @property
+    def similarity_results(self) -> dict[str, Any]:
+        """
+        the full similarity matrix of the classes that override funcname.
+
+        A dictionary with the "matrix", the node ids of the matrix "axis" and
+        the "axis_names". The matrix is a numpy array, or a
+        scipy.sparse.csr_matrix if sparse_similarity is True. Computed on
+        first access unless the tree was initialized with
+        compute_similarity="eager" or "background".
+        """
+        self._wait_for_similarity()
+        if self._similarity_results is None:
+            raise RuntimeError(
+                "similarity results are not available with compute_similarity='never'"
+            )
+        return self._similarity_results
+
+    @property
+    def similarity_sets(self) -> dict[int, set[int]]:
+        """
+        a dictionary mapping node ids to the set of node ids with similarity
+        above similarity_cutoff. Empty if compute_similarity="never".
+        """
+        self._wait_for_similarity()
+        if self._similarity_sets is None:
+            return {}
+        return self._similarity_sets
+
+    def identical_overrides(self, funcname: Optional[str] = None) -> list[list[int]]:
+        """
+        the groups of nodes that share one implementation of a function
+
+        Sources that only differ in whitespace, comments or docstrings are
+        identical. The similarity of each group is only computed once, and is
+        the same for every node in the group.
+
+        Parameters
+        ----------
+        funcname: str
+            (optional) the tracked function, one of funcnames. Default is the
+            selected function.
+
+        Returns
+        -------
+        list[list[int]]
+            the sorted node ids of each group of two or more nodes with
+            identical sources, largest group first
+        """
+        if funcname is None:
+            funcname = self.funcname
+        if funcname not in self._func_results:
+            raise ValueError(
+                f"unexpected value, {funcname=}, must be one of {self.funcnames}"
+            )
+        override_src = self._func_results[funcname]["override_src"]
+        groups: dict[int, list[int]] = {}
+        for node_id, group in zip(override_src, self._source_groups(override_src)):
+            groups.setdefault(group, []).append(node_id)
+        shared = [sorted(ids) for ids in groups.values() if len(ids) > 1]
+        return sorted(shared, key=len, reverse=True)
+
+    def _source_groups(self, override_src: OrderedDict[int, str]) -> list[int]:
+        # the group of identical sources of each source, numbered in order of
+        # the first source of each group
+        digest_cache = self._source_digest_cache
+        group_of: dict[str, int] = {}
+        groups = []
+        for src in override_src.values():
+            if src not in digest_cache:
+                digest_cache[src] = _source_digest(src)
+            groups.append(group_of.setdefault(digest_cache[src], len(group_of)))
+        return groups
+
+    def _unique_sources(
+        self, override_src: OrderedDict[int, str]
+    ) -> tuple[npt.NDArray[np.intp], OrderedDict[int, str]]:
+        # the group of each source and the first source of each group
+        groups = np.array(self._source_groups(override_src), dtype=np.intp)
+        _, first = np.unique(groups, return_index=True)
+        node_ids = list(override_src.keys())
+        unique_src = collections.OrderedDict(
+            (node_ids[i], override_src[node_ids[i]]) for i in first.tolist()
+        )
+        return groups, unique_src
+
+    def _wait_for_similarity(self) -> None:
+        # make sure the similarity results exist, computing them if needed
+        if self._similarity_future is not None:
+            self._similarity_future.result()
+        elif self._similarity_results is None and self.compute_similarity != "never":
+            self._build_similarity()
+
+    def _get_source_info(self, obj, funcname: Optional[str] = None) -> Optional[str]:
+        # the source location of funcname (default the selected function)
+        fname = funcname or self.funcname
+        if fname is None:
             raise RuntimeError("this functionality requires function tracking.")
-        fname: str = self.funcname
+        if isinstance(obj, StaticClass):
+            found = obj.find_method(fname)
+            if found is None:
+                return None
+            return f"{found[0].filename}:{found[1]}"
         f = getattr(obj, fname)
         if isinstance(f, collections.abc.Callable):  # type: ignore[arg-type]
-            return f"{inspect.getsourcefile(f)}:{inspect.getsourcelines(f)[1]}"
+            return self._get_source_location(f)
         return None
 
-    def _node_overrides_func(self, child, parent) -> bool:
-        childsrc = self._get_source_info(child)
-        parentsrc = self._get_source_info(parent)
-        if childsrc != parentsrc:
-            return True  # it overrides!
-        return False
+    def _get_source_location(self, f) -> str:
+        # the "file:line" location of the source of a callable, as extracted
+        # by inspect.getsource (which unwraps decorated functions). Cached by
+        # function and, where possible, using the file and first line (of any
+        # decorators) of the code object rather than reading the source file.
+        # Code objects are not used as the key: identical functions on the
+        # same line of different files compare equal.
+        func = getattr(f, "__func__", f)  # the function of a bound method
+        if func not in self._source_location_cache:
+            code = getattr(inspect.unwrap(func), "__code__", None)
+            if code is None:
+                location = f"{inspect.getsourcefile(f)}:{inspect.getsourcelines(f)[1]}"
+            else:
+                filename = code.co_filename
+                if filename not in self._source_file_cache:
+                    self._source_file_cache[filename] = inspect.getsourcefile(code)
+                location = f"{self._source_file_cache[filename]}:{code.co_firstlineno}"
+            self._source_location_cache[func] = location
+        return self._source_location_cache[func]
+
+    def _node_overrides_func(
+        self, child, parent, funcname: Optional[str] = None
+    ) -> bool:
+        # if child overrides funcname (default the selected function)
+        fname = funcname or self.funcname
+        if fname is None:
+            raise RuntimeError("this functionality requires function tracking.")
+        if isinstance(child, StaticClass):
+            if self.traversal == "dag" and len(child.__bases__) > 1:
+                return fname in child.methods
+            childsrc = self._get_source_info(child, fname)
+            parentsrc = self._get_source_info(parent, fname)
+            return childsrc != parentsrc
+
+        defines_func = fname in vars(child)
+        bases = child.__bases__
+        if len(bases) > 1 and self.traversal == "dag":
+            # with multiple parents, comparing to the parent that the child
+            # was first reached from is not meaningful: it only overrides if
+            # it defines the function itself.
+            return defines_func
+        if not defines_func and len(bases) == 1:
+            # it inherits the function of its only parent
+            return False
+        # compare the functions that the child and the parent resolve to
+        child_func = _resolve_function(_mro_attribute(child, fname))
+        return child_func is not _resolve_function(_mro_attribute(parent, fname))
+
+    def _overridden_funcs(self, child, parent) -> list[str]:
+        # the tracked functions that child overrides
+        return [
+            funcname
+            for funcname in self.funcnames
+            if self._node_overrides_func(child, parent, funcname)
+        ]
 
-    def _get_new_node_color(self, child, parent) -> str:
-        if self.funcname and self._node_overrides_func(child, parent):
-            return self._override_color
-        return self._default_color
-
-    def _get_baseclass_color(self) -> str:
-        color = self._default_color
-        if self.funcname:
-            f = getattr(self.baseclass, self.funcname)
-            class_where_its_defined = f.__qualname__.split(".")[0]
-            if self.basename == class_where_its_defined:
-                # then its defined here, use the override color
-                color = self._override_color
-        return color
+    def _baseclass_overrides(self, funcname: str) -> bool:
+        # if the base class defines funcname itself
+        if isinstance(self.baseclass, StaticClass):
+            return funcname in self.baseclass.methods
+        return funcname in vars(self.baseclass)
 
     def check_subclasses(
         self, parent, parent_id: int, node_i: int, current_recursion_level: int
     ) -> int:
-        if current_recursion_level <= self.max_recursion_level:
-            for child in parent.__subclasses__():
-                if child.__name__ not in self.classes_to_exclude:
-                    color = self._get_new_node_color(child, parent)
-                    new_node = _ChildNode(
-                        child, node_i, parent=parent, parent_id=parent_id, color=color
-                    )
-                    self._node_list.append(new_node)
-                    self._node_map[node_i] = new_node.child_name
-                    if self.funcname and self._node_overrides_func(child, parent):
-                        self._store_node_func_source(child, node_i)
-                    node_i += 1
-                    node_i = self.check_subclasses(
-                        child, node_i - 1, node_i, current_recursion_level + 1
-                    )
+        # iterative depth-first traversal of parent.__subclasses__(), adding
+        # nodes in the same order as a recursive traversal.
+        if current_recursion_level > self.max_recursion_level:
+            return node_i
+        visited: dict[int, int] = {}
+        if self.traversal == "dag":
+            visited = self._visited_classes()
+        return self._traverse(
+            parent,
+            parent_id,
+            iter(parent.__subclasses__()),
+            node_i,
+            current_recursion_level,
+            visited,
+        )
+
+    def _visited_classes(self) -> dict[int, int]:
+        # map of the id() of every mapped class to its node id
+        return {
+            id(child): node_id
+            for node_id, child in enumerate(self._node_list.classes, start=1)
+        }
+
+    def _traverse(
+        self,
+        parent,
+        parent_id: int,
+        children: Iterator[Any],
+        node_i: int,
+        current_recursion_level: int,
+        visited: dict[int, int],
+    ) -> int:
+        # add the classes in children (and all of their subclasses) as
+        # children of parent, returning the next node id. Each stack entry is
+        # (class, node id, iterator over subclasses, recursion level), and the
+        # children of an entry are at depth recursion level + 1. visited maps
+        # the id() of the classes that are already mapped to their node ids
+        # (updated in place), it is always empty for the "tree" traversal.
+        stack = [(parent, parent_id, children, current_recursion_level)]
+        while stack:
+            this_parent, this_parent_id, children, level = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                continue
+            if child.__name__ in self.classes_to_exclude:
+                continue
+
+            if id(child) in visited:
+                # already mapped through another parent, only add the edge
+                self._node_list.add_parent(visited[id(child)], this_parent_id)
+                continue
+
+            overridden = self._overridden_funcs(child, this_parent)
+            color = self._default_color
+            if self.funcname in overridden:
+                color = self._override_color
+            self._node_list.append(
+                child,
+                str(child.__name__),
+                parent_id=this_parent_id,
+                depth=level + 1,
+                color=color,
+            )
+            for funcname in overridden:
+                self._func_results[funcname]["override_ids"].append(node_i)
+                self._store_node_func_source(child, node_i, funcname)
+            if self.traversal == "dag":
+                visited[id(child)] = node_i
+
+            if level + 1 <= self.max_recursion_level:
+                stack.append((child, node_i, iter(child.__subclasses__()), level + 1))
+            node_i += 1
         return node_i
 
-    def _store_node_func_source(self, clss, current_node: int):
-        # store the source code of funcname for the current class and node
+    def refresh(self) -> list[int]:
+        """
+        map any subclasses that were created since the tree was built
+
+        Walks the subclasses of every mapped class again and adds only the
+        new classes (and edges), extracting the source of new overrides of
+        each tracked function. If the similarity results have been computed,
+        only the rows and columns of the new overrides are computed and the
+        similarity matrix and similarity_sets are updated in place.
+
+        Returns
+        -------
+        list[int]
+            the node ids of the new nodes
+        """
+        if self.baseclass is None:
+            raise RuntimeError("refresh requires a tree built from live classes.")
+        # finish any background similarity calculation before adding sources
+        if self._similarity_future is not None:
+            self._similarity_future.result()
+        with self.stats.phase("traversal"):
+            nodes = self._node_list
+            n_nodes = len(nodes)
+            n_old_overrides = {
+                funcname: len(results["override_src"])
+                for funcname, results in self._func_results.items()
+            }
+
+            # the classes already mapped as children of each node
+            classes = nodes.classes
+            known_children: dict[int, set[int]] = collections.defaultdict(set)
+            for index, parent_id in enumerate(nodes.parent_id.tolist()):
+                if parent_id:
+                    known_children[parent_id].add(id(classes[index]))
+            for node_id, extra_parent_ids in nodes.extra_parent_ids.items():
+                for parent_id in extra_parent_ids:
+                    known_children[parent_id].add(id(classes[node_id - 1]))
+
+            visited: dict[int, int] = {}
+            if self.traversal == "dag":
+                visited = self._visited_classes()
+            node_i = n_nodes + 1
+            depths = nodes.depth.tolist()
+            for node_id in range(1, n_nodes + 1):
+                # the recursion level of the children of a node is its depth
+                level = depths[node_id - 1]
+                if level > self.max_recursion_level:
+                    continue
+                child = classes[node_id - 1]
+                new_children = [
+                    new_child
+                    for new_child in child.__subclasses__()
+                    if id(new_child) not in known_children[node_id]
+                ]
+                if new_children:
+                    node_i = self._traverse(
+                        child,
+                        node_id,
+                        iter(new_children),
+                        node_i,
+                        level,
+                        visited,
+                    )
+            self._current_node = node_i
+            self._ancestry = None
+
+        for funcname, results in self._func_results.items():
+            # new overrides are added at the end of override_src
+            override_ids = list(results["override_src"])
+            new_override_ids = override_ids[n_old_overrides[funcname] :]
+            if results["similarity_results"] is not None and new_override_ids:
+                self._add_similarity_rows(new_override_ids, funcname)
+            elif results["similarity_results"] is not None:
+                axis_names = self._node_list.node_names()
+                results["similarity_results"]["axis_names"] = axis_names
+        return list(range(n_nodes + 1, len(self._node_list) + 1))
+
+    def _store_node_func_source(
+        self, clss, current_node: int, funcname: Optional[str] = None
+    ):
+        # store the source code of funcname (default the selected function)
+        # for the current class and node
         #    clss:  a class
         #    current_node: the
-        if self.funcname is None:
+        fname = funcname or self.funcname
+        if fname is None:
             raise RuntimeError("this functionality requires function tracking.")
-        fname: str = self.funcname
-
-        f = getattr(clss, fname)
-        if isinstance(f, collections.abc.Callable):  # type: ignore[arg-type]
-            src = textwrap.dedent(inspect.getsource(f))
-            self._override_src_files[current_node] = (
-                f"{inspect.getsourcefile(f)}:{inspect.getsourcelines(f)[1]}"
-            )
-            self._override_src[current_node] = src
+        results = self._func_results[fname]
+
+        if isinstance(clss, StaticClass):
+            found = clss.find_method(fname)
+            if found is not None:
+                defined_in, lineno, src = found
+                results["override_src_files"][
+                    current_node
+                ] = f"{defined_in.filename}:{lineno}"
+                results["override_src"][current_node] = src
+            return
+
+        f = _resolve_function(_mro_attribute(clss, fname))
+        if callable(f):
+            with self.stats.phase("source"):
+                # inspect reads each source file once, through linecache
+                try:
+                    src = textwrap.dedent(inspect.getsource(f))
+                except (OSError, TypeError):
+                    # no source, e.g. a C function or a function created by
+                    # exec or eval
+                    return
+                location = self._get_source_location(f)
+            results["override_src_files"][current_node] = location
+            results["override_src"][current_node] = src
 
     def check_source_similarity(
         self,
@@ -193,25 +692,207 @@ class ClassGraphTree:
         else:
             ref = reference
 
-        if similarity_container_class == "PycodeSimilarity":
-            SimClass = PycodeSimilarity
-        else:
-            raise ValueError(f"unexpected value, {similarity_container_class=}")
-
+        SimClass = _get_similarity_class(similarity_container_class)
         self.similarity_container = SimClass(method=method)
         sim = self.similarity_container.run(self._override_src, reference=ref)
         return sim
 
+    # the __init__ arguments (other than baseclass) that define a built tree
+    _state_options = (
+        "funcname",
+        "funcnames",
+        "similarity_cutoff",
+        "max_recursion_level",
+        "classes_to_exclude",
+        "traversal",
+        "similarity_method",
+        "similarity_container_class",
+        "similarity_container_kwargs",
+        "n_workers",
+        "compute_similarity",
+        "sparse_similarity",
+    )
+
+    def _get_state(self) -> dict[str, Any]:
+        # a picklable copy of the built tree, without any class references.
+        # The similarity results are computed first unless
+        # compute_similarity="never".
+        self._wait_for_similarity()
+        options = {opt: getattr(self, opt) for opt in self._state_options}
+        options["default_color"] = self._default_color
+        options["func_override_color"] = self._override_color
+        options["similarity_dtype"] = self.similarity_dtype.name
+        return {
+            "basename": self.basename,
+            "options": options,
+            "nodes": self._node_list._get_state(),
+            "func_results": self._func_results,
+        }
+
+    @classmethod
+    def _from_state(cls, state: dict[str, Any]) -> "ClassGraphTree":
+        # a tree restored from _get_state without traversing any classes. The
+        # baseclass and the class references of the nodes are None.
+        options = state["options"]
+        cgt = cls.__new__(cls)
+        cgt.baseclass = None
+        cgt.basename = state["basename"]
+        cgt.funcname = options["funcname"]
+        cgt.funcnames = options["funcnames"]
+        cgt._func_results = state["func_results"]
+        cgt._tracking_function = cgt.funcname is not None
+        cgt.max_recursion_level = options["max_recursion_level"]
+        cgt._node_list = _NodeTable._from_state(state["nodes"])
+        cgt._node_map = _NodeNames(cgt._node_list)
+        cgt._ancestry = None
+        cgt._nodenum = 0
+        cgt._current_node = len(cgt._node_list)
+        cgt._source_location_cache = {}
+        cgt._source_file_cache = {}
+        cgt._source_digest_cache = {}
+        cgt._default_color = options["default_color"]
+        cgt._override_color = options["func_override_color"]
+        cgt._graphviz_args_kwargs = {}
+        cgt.stats = BuildStats()
+        cgt.similarity_container = None
+        cgt._similarity_future = None
+        cgt.similarity_cutoff = options["similarity_cutoff"]
+        cgt.similarity_method = options["similarity_method"]
+        cgt.similarity_container_class = options["similarity_container_class"]
+        cgt._similarity_class = _get_similarity_class(cgt.similarity_container_class)
+        cgt.similarity_container_kwargs = options["similarity_container_kwargs"]
+        cgt.n_workers = options["n_workers"]
+        cgt.sparse_similarity = options["sparse_similarity"]
+        cgt.similarity_dtype = np.dtype(options["similarity_dtype"])
+        cgt.compute_similarity = options["compute_similarity"]
+        cgt.classes_to_exclude = options["classes_to_exclude"]
+        cgt.traversal = options["traversal"]
+        return cgt
+
+    def to_snapshot(self, filename: str) -> None:
+        """
+        save the built tree as a snapshot that ClassGraphTree.from_snapshot
+        can load without importing or traversing any classes
+
+        A snapshot is an uncompressed .npz file with the node table (the
+        parent id, depth, color and class name of every node), the overrides
+        of each tracked function with their source and source location, the
+        similarity matrix and sets of each function, and the ClassGraphTree
+        options. The strings are stored as
+        tables of UTF-8 bytes and offsets. The similarity results are computed
+        first unless compute_similarity="never".
+
+        Parameters
+        ----------
+        filename: str
+            the snapshot file, usually with a .npz extension
+        """
+        state = self._get_state()
+        nodes = state["nodes"]
+        arrays: dict[str, Any] = {
+            column: nodes[column]
+            for column in ("parent_id", "depth", "color_code", "name_code")
+        }
+        arrays["names"], arrays["names_offsets"] = _pack_strings(nodes["names"])
+
+        # the additional parents of each node with multiple parents
+        extra_parent_ids = nodes["extra_parent_ids"]
+        arrays["extra_node_ids"] = np.array(list(extra_parent_ids), dtype=np.int32)
+        arrays["extra_offsets"] = np.cumsum(
+            [0] + [len(ids) for ids in extra_parent_ids.values()], dtype=np.int64
+        )
+        arrays["extra_parent_ids"] = np.array(
+            [pid for ids in extra_parent_ids.values() for pid in ids], dtype=np.int32
+        )
+
+        # the overrides and similarity results of each tracked function
+        similarity = [
+            _pack_func_results(arrays, f"func{index}_", results)
+            for index, results in enumerate(state["func_results"].values())
+        ]
+        meta = {
+            "basename": state["basename"],
+            "options": state["options"],
+            "colors": nodes["colors"],
+            "similarity": similarity,
+        }
+        _save_arrays(filename, arrays, meta)
+
+    @classmethod
+    def from_snapshot(cls, filename: str, mmap: bool = True) -> "ClassGraphTree":
+        """
+        load a tree saved with ClassGraphTree.to_snapshot
+
+        The class references of the tree (e.g. ClassGraphTree.baseclass) are
+        None, so it can not be refreshed, but it can be graphed and its
+        sources and similarity results are available.
+
+        Parameters
+        ----------
+        filename: str
+            the snapshot file
+        mmap: bool
+            (optional) if True (the default), the numeric arrays of the tree
+            (the node table columns and the similarity matrix) are read-only
+            memory maps of the file rather than copies, so that loading is
+            fast and processes that load the same snapshot share the memory.
+
+        Returns
+        -------
+        ClassGraphTree
+        """
+        arrays, meta = _load_arrays(filename, mmap=mmap)
+
+        extra_bounds = arrays["extra_offsets"].tolist()
+        extra_parents = arrays["extra_parent_ids"].tolist()
+        extra_parent_ids = {
+            node_id: extra_parents[start:end]
+            for node_id, start, end in zip(
+                arrays["extra_node_ids"].tolist(), extra_bounds[:-1], extra_bounds[1:]
+            )
+        }
+        nodes: dict[str, Any] = {
+            column: arrays[column]
+            for column in ("parent_id", "depth", "color_code", "name_code")
+        }
+        nodes["names"] = _unpack_strings(arrays["names"], arrays["names_offsets"])
+        nodes["colors"] = meta["colors"]
+        nodes["extra_parent_ids"] = extra_parent_ids
+
+        funcnames = meta["options"]["funcnames"] or [None]
+        func_results = {
+            funcname: _unpack_func_results(arrays, f"func{index}_", similarity)
+            for index, (funcname, similarity) in enumerate(
+                zip(funcnames, meta["similarity"])
+            )
+        }
+        cgt = cls._from_state(
+            {
+                "basename": meta["basename"],
+                "options": meta["options"],
+                "nodes": nodes,
+                "func_results": func_results,
+            }
+        )
+        axis_names = cgt._node_list.node_names()
+        for results in func_results.values():
+            if results["similarity_results"] is not None:
+                results["similarity_results"]["axis_names"] = axis_names
+        return cgt
+
+    @_timed_phase("traversal")
     def _build(self) -> None:
 
         # construct the first node
-        color = self._get_baseclass_color()
-        self._node_list.append(
-            _ChildNode(self.baseclass, self._current_node, parent=None, color=color)
-        )
-        self._node_map[self._current_node] = self._node_list[-1].child_name
-        if self.funcname:
-            self._store_node_func_source(self.baseclass, self._current_node)
+        color = self._default_color
+        for funcname in self.funcnames:
+            if self._baseclass_overrides(funcname):
+                self._func_results[funcname]["override_ids"].append(1)
+                if funcname == self.funcname:
+                    color = self._override_color
+        self._node_list.append(self.baseclass, str(self.basename), color=color)
+        for funcname in self.funcnames:
+            self._store_node_func_source(self.baseclass, self._current_node, funcname)
 
         # now check all the children
         self._current_node += 1
@@ -219,34 +900,147 @@ class ClassGraphTree:
             self.baseclass, self._current_node - 1, self._current_node, 0
         )
 
-        # construct the full similarity matrix
-        s_c = PycodeSimilarity(method="permute")
-        _, sim_matrix, sim_axis = s_c.run(self._override_src)
-        assert isinstance(sim_matrix, np.ndarray)
-        sim_axis_array = np.array(sim_axis)
-        sim_axis_names = np.array([c.child_name for c in self._node_list])
-        self.similarity_results = {
+    def _get_similarity_container(self) -> _similarity_container_types:
+        return self._similarity_class(
+            method=self.similarity_method,
+            n_workers=self.n_workers,
+            sparse=self.sparse_similarity,
+            cutoff=self.similarity_cutoff,
+            **self.similarity_container_kwargs,
+        )
+
+    @_timed_phase("similarity")
+    def _build_similarity(self) -> None:
+        # construct the full similarity matrix of every tracked function in a
+        # single pass, with one similarity container (so that each source is
+        # only parsed once) and one pool of worker processes
+        s_c = self._get_similarity_container()
+        if len(self._func_results) > 1 and s_c._use_workers():
+            with concurrent.futures.ProcessPoolExecutor(self.n_workers) as pool:
+                s_c.executor = pool
+                self._build_func_similarity(s_c)
+        else:
+            self._build_func_similarity(s_c)
+
+    def _build_func_similarity(self, s_c: _similarity_container_types) -> None:
+        # construct the full similarity matrix of each tracked function
+        for results in self._func_results.values():
+            sim_results, sim_sets = self._similarity_of(s_c, results["override_src"])
+            results["similarity_results"] = sim_results
+            results["similarity_sets"] = sim_sets
+
+    def _similarity_of(
+        self, s_c: _similarity_container_types, override_src: OrderedDict[int, str]
+    ) -> tuple[dict[str, Any], dict[int, set[int]]]:
+        # the similarity results and sets of the sources of a function. Only
+        # the first source of each group of identical sources is compared, and
+        # the matrix of the groups is expanded to every source.
+        groups, unique_src = self._unique_sources(override_src)
+        sim_results = s_c.run(unique_src)
+        assert isinstance(sim_results, tuple)
+        _, sim_matrix, _ = sim_results
+        if len(unique_src) < groups.size:
+            # every entry of the matrix of the groups, repeated for each pair
+            # of sources in the two groups (a csr_matrix can be indexed too)
+            sim_matrix = sim_matrix[groups][:, groups]
+        sim_axis_array = np.array(list(override_src.keys()), dtype=int)
+        sim_axis_names = self._node_list.node_names()
+
+        # find all the matrix entries above the cutoff in a single pass
+        rows, cols, values = _above_cutoff(sim_matrix, self.similarity_cutoff)
+        if self.sparse_similarity:
+            sparse = _get_scipy_sparse()
+            sim_matrix = sparse.csr_matrix(
+                (values.astype(self.similarity_dtype), (rows, cols)),
+                shape=sim_matrix.shape,
+            )
+        else:
+            sim_matrix = sim_matrix.astype(self.similarity_dtype, copy=False)
+
+        similarity_results = {
             "matrix": sim_matrix,
             "axis": sim_axis_array,
             "axis_names": sim_axis_names,
         }
 
-        cutoff_sim = self.similarity_cutoff
-        similarity_sets = {}  # a dict that points to other similar nodes
-        M = sim_matrix
-        for irow in range(M.shape[0]):
-            rowvals = M[irow, :]
-            indxs = np.where(rowvals >= cutoff_sim)[0]
-            indxs = indxs[indxs != irow]  # these are matrix indeces
-            node_ids = sim_axis_array[indxs]
-            if len(node_ids) > 0:
-                this_child = sim_axis_array[irow]
-                similarity_sets[this_child] = set(node_ids.tolist())
-        self.similarity_sets = similarity_sets
-
+        # a dict that points to other similar nodes
+        off_diagonal = rows != cols
+        rows, cols = rows[off_diagonal], cols[off_diagonal]
+        row_ids, row_starts = np.unique(rows, return_index=True)
+        similar_node_ids = np.split(sim_axis_array[cols], row_starts[1:])
+        similarity_sets = {
+            int(sim_axis_array[irow]): set(node_ids.tolist())
+            for irow, node_ids in zip(row_ids, similar_node_ids)
+        }
+        return similarity_results, similarity_sets
+
+    @_timed_phase("similarity")
+    def _add_similarity_rows(self, new_ids: list[int], funcname: str | None) -> None:
+        # extend the similarity matrix and sets of a function with the rows
+        # and columns of new overrides, which are at the end of override_src
+        results = self._func_results[funcname]
+        similarity_results = results["similarity_results"]
+        similarity_sets = results["similarity_sets"]
+        override_src = results["override_src"]
+        sim_axis_array = np.array(list(override_src.keys()), dtype=int)
+        N = sim_axis_array.size
+        n_old = N - len(new_ids)
+
+        # the rows of the groups of identical sources of the new overrides,
+        # expanded to a row of each new override and a column of each source
+        groups, unique_src = self._unique_sources(override_src)
+        unique_ids = list(unique_src.keys())
+        new_groups = np.unique(groups[n_old:])
+        group_rows = self._get_similarity_container().similarity_rows(
+            unique_src, [unique_ids[group] for group in new_groups.tolist()]
+        )
+        new_rows = group_rows[np.searchsorted(new_groups, groups[n_old:])][:, groups]
+
+        # the (row, column, value) of the new entries above the cutoff, in
+        # both the new rows and the new columns
+        rows, cols, values = _above_cutoff(new_rows, self.similarity_cutoff)
+        rows = rows + n_old
+        old_cols = cols < n_old
+        rows, cols = (
+            np.concatenate([rows, cols[old_cols]]),
+            np.concatenate([cols, rows[old_cols]]),
+        )
+        values = np.concatenate([values, values[old_cols]])
+
+        sim_matrix = similarity_results["matrix"]
+        if self.sparse_similarity:
+            old = sim_matrix.tocoo()
+            sim_matrix = _get_scipy_sparse().csr_matrix(
+                (
+                    np.concatenate([old.data, values.astype(self.similarity_dtype)]),
+                    (
+                        np.concatenate([old.row, rows]),
+                        np.concatenate([old.col, cols]),
+                    ),
+                ),
+                shape=(N, N),
+            )
+        else:
+            new_matrix = np.empty((N, N), dtype=self.similarity_dtype)
+            new_matrix[:n_old, :n_old] = sim_matrix
+            new_matrix[n_old:, :] = new_rows
+            new_matrix[:n_old, n_old:] = new_rows[:, :n_old].T
+            sim_matrix = new_matrix
+
+        similarity_results["matrix"] = sim_matrix
+        similarity_results["axis"] = sim_axis_array
+        similarity_results["axis_names"] = self._node_list.node_names()
+
+        for irow, icol in zip(rows.tolist(), cols.tolist()):
+            if irow != icol:
+                node_id = int(sim_axis_array[irow])
+                similar_id = int(sim_axis_array[icol])
+                similarity_sets.setdefault(node_id, set()).add(similar_id)
+
+    @_timed_phase("graph")
     def _build_graph(
         self, *args, include_similarity: bool = True, **kwargs
-    ) -> pydot.Dot:
+    ) -> "pydot.Dot":
         """
         build a digraph from the current node list
 
@@ -260,40 +1054,116 @@ class ClassGraphTree:
             any additional keyword arguments are passed to graphviz.Digraph
         """
 
+        import pydot
+
         gtype = "digraph"
         if "graph_type" in kwargs:
             gtype = kwargs.pop("graph_type")
 
         dot = pydot.Dot("test_graph", *args, graph_type=gtype, **kwargs)
+        for src, dst, attributes in self._dot_elements(include_similarity):
+            if dst is None:
+                dot.add_node(pydot.Node(src, **attributes))
+            else:
+                dot.add_edge(pydot.Edge(src, dst, **attributes))
+        return dot
 
+    def _dot_elements(
+        self, include_similarity: bool = True
+    ) -> Iterator[tuple[str, Optional[str], dict[str, Any]]]:
+        # the (node id, None, attributes) of every node and the (node id,
+        # other node id, attributes) of every edge of the DOT graph, with
+        # each node followed by its edges
+        similarity_sets = self.similarity_sets if include_similarity else {}
         iset = 0
-        Nsets = len(self.similarity_sets)
-        for node in self._node_list:
-            new_node = pydot.Node(
-                node.child_id, label=node.child_name, color=node.color
-            )
-            dot.add_node(new_node)
-            if node.parent:
-                dot.add_edge(pydot.Edge(node.child_id, node.parent_id))
+        Nsets = len(similarity_sets)
+        no_attributes: dict[str, Any] = {}
+        for node_id, name, color, parent_ids in self._node_list.rows():
+            child_id = str(node_id)
+            yield child_id, None, {"label": name, "color": color}
+            for parent_id in parent_ids:
+                yield child_id, str(parent_id), no_attributes
             if include_similarity:
-                if int(node.child_id) in self.similarity_sets:
+                if node_id in similarity_sets:
                     R = (iset + 1.0) / Nsets * 0.5 + 0.5
                     G = 0.5
                     B = 0.5
-                    hexcolor = rgb2hex((R, G, B))
+                    similarity_attributes = {"color": _rgb_to_hex((R, G, B))}
                     iset += 1
-                    for similar_node_id in self.similarity_sets[int(node.child_id)]:
-                        new_edge = pydot.Edge(
-                            node.child_id, str(similar_node_id), color=hexcolor
-                        )
-                        dot.add_edge(new_edge)
+                    for similar_node_id in similarity_sets[node_id]:
+                        yield child_id, str(similar_node_id), similarity_attributes
 
-        return dot
+    @_timed_phase("graph")
+    def write_dot(
+        self,
+        output: str | TextIO,
+        include_similarity: bool = True,
+        graph_type: str = "digraph",
+        **kwargs,
+    ) -> None:
+        """
+        write the GraphViz DOT source of the class hierarchy
+
+        The nodes and edges are the same as those of graph(), but are written
+        line by line without building the pydot graph, which is much faster
+        and uses much less memory for large hierarchies. The output can be
+        rendered with graphviz, e.g. $ dot -Tsvg graph.dot -o graph.svg
+
+        Parameters
+        ----------
+        output: str or file
+            a filename or an open text file (e.g., sys.stdout) to write to
+        include_similarity: bool
+            include edges for similar code (default True)
+        graph_type: str
+            (optional) "digraph" (the default) or "graph"
+        kwargs:
+            any additional keyword arguments are written as graph attributes,
+            e.g. ratio="fill"
+        """
+        if graph_type not in ("digraph", "graph"):
+            raise ValueError(
+                f"unexpected value, {graph_type=}, must be one of 'digraph' or 'graph'"
+            )
+        if isinstance(output, str):
+            with open(output, "w") as fi:
+                self._write_dot(fi, include_similarity, graph_type, kwargs)
+        else:
+            self._write_dot(output, include_similarity, graph_type, kwargs)
+
+    def _write_dot(
+        self,
+        output: TextIO,
+        include_similarity: bool,
+        graph_type: str,
+        graph_attributes: dict[str, Any],
+    ) -> None:
+        # write the lines of the DOT source in blocks
+        edge_op = " -> " if graph_type == "digraph" else " -- "
+        lines = [f"{graph_type} test_graph {{\n"]
+        for key, value in graph_attributes.items():
+            lines.append(f"{key}={_dot_quote(value)};\n")
+        for src, dst, attributes in self._dot_elements(include_similarity):
+            if dst is None:
+                line = f'"{src}"'
+            else:
+                line = f'"{src}"{edge_op}"{dst}"'
+            if attributes:
+                attribute_list = ", ".join(
+                    f"{key}={_dot_quote(value)}" for key, value in attributes.items()
+                )
+                line += f" [{attribute_list}]"
+            lines.append(line + ";\n")
+            if len(lines) >= 10000:
+                output.writelines(lines)
+                lines.clear()
+        lines.append("}\n")
+        output.writelines(lines)
 
     _graph = None
 
     # @property
-    def graph(self, *args, include_similarity: bool = True, **kwargs) -> pydot.Dot:
+    def graph(self, *args, include_similarity: bool = True, **kwargs) -> "pydot.Dot":
         """a GraphViz dot graph of the class hierarchy using pydot"""
         # if self._graph is None:
         self._graph = self._build_graph(
@@ -306,15 +1176,17 @@ class ClassGraphTree:
 
     def show_graph(self, *args, env: str = "notebook", format: str = "png", **kwargs):
         """display a static GraphViz graph"""
-        return _show_graph(self.graph(*args, **kwargs), env=env, format=format)
+        dot_graph = self.graph(*args, **kwargs)
+        with self.stats.phase("render"):
+            return _show_graph(dot_graph, env=env, format=format)
 
     def plot_similarity(
         self,
         above_cutoff: Optional[bool] = False,
-        ax: Optional[Axes] = None,
+        ax: Optional["Axes"] = None,
         colorbar: Optional[bool] = True,
         **kwargs,
-    ) -> tuple[dict[int, str], Axes]:
+    ) -> tuple[dict[int, str], "Axes"]:
         """
         add the similarity plot to a matplotlib axis (or create a new one)
 
@@ -339,13 +1211,16 @@ class ClassGraphTree:
 
 
         """
+        import matplotlib.pyplot as plt
+
         if ax is None:
             _, ax = plt.subplots(1)
 
+        M = self.similarity_results["matrix"]
+        if not isinstance(M, np.ndarray):
+            M = M.toarray()
         if above_cutoff:
-            M = self.similarity_results["matrix"] > self.similarity_cutoff
-        else:
-            M = self.similarity_results["matrix"]
+            M = M > self.similarity_cutoff
 
         if "cmap" not in kwargs:
             if above_cutoff:
@@ -359,12 +1234,11 @@ class ClassGraphTree:
         if colorbar:
             plt.colorbar(im, ax=ax)
 
-        sim_labels = [
-            self._node_list[cid - 1].child_name for cid in self._override_src.keys()
-        ]
+        sim_labels = [self._node_map[cid] for cid in self._override_src.keys()]
         sim_labels_dict = {lid: label for lid, label in enumerate(sim_labels)}
         return sim_labels_dict, ax
 
+    @_timed_phase("interactive_graph")
     def build_interactive_graph(
         self,
         include_similarity: bool = True,
@@ -373,7 +1247,7 @@ class ClassGraphTree:
         similarity_edge_style: dict[str, Any] | None = None,
         override_node_color: str | tuple[float, ...] | None = None,
         **kwargs,
-    ) -> Network:
+    ) -> "Network":
         """
         build an interactive Network graph from the current node list
 
@@ -402,13 +1276,213 @@ class ClassGraphTree:
         Network
             the pyvis.Network representation of the class hierarchy.
         """
+        from pyvis.network import Network
+
+        bgcolor = _validate_color(kwargs.pop("bgcolor", None), (1.0, 1.0, 1.0))
+        font_color = _validate_color(kwargs.pop("font_color", None), (0.0, 0.0, 0.0))
+        vis_node, vis_edges, _ = self._vis_elements(
+            include_similarity,
+            node_style,
+            edge_style,
+            similarity_edge_style,
+            override_node_color,
+            font_color,
+            directed=kwargs.get("directed", False),
+        )
+
+        # return the interactive pyvis Network graph. The nodes and edges are
+        # added directly: Network.add_node and add_edge check for existing
+        # nodes and edges with a linear search, which is quadratic overall.
+        network_wrapper = Network(
+            notebook=True, bgcolor=bgcolor, font_color=font_color, **kwargs
+        )
+        for row in self._node_list.rows():
+            node = vis_node(*row)
+            network_wrapper.nodes.append(node)
+            network_wrapper.node_ids.append(node["id"])
+            network_wrapper.node_map[node["id"]] = node
+        for node_id, _, _, parent_ids in self._node_list.rows():
+            network_wrapper.edges.extend(vis_edges(node_id, parent_ids))
+        return network_wrapper
+
+    @_timed_phase("interactive_graph")
+    def write_interactive_graph(
+        self,
+        output: str | TextIO,
+        include_similarity: bool = True,
+        node_style: dict[str, Any] | None = None,
+        edge_style: dict[str, Any] | None = None,
+        similarity_edge_style: dict[str, Any] | None = None,
+        override_node_color: str | tuple[float, ...] | None = None,
+        output_format: Optional[str] = None,
+        height: str = "600px",
+        width: str = "100%",
+        bgcolor: str | tuple[float, ...] | None = None,
+        font_color: str | tuple[float, ...] | None = None,
+        heading: str = "",
+        layout: Optional[bool] = None,
+        options: dict[str, Any] | None = None,
+        cdn_resources: str = "in_line",
+        lod_levels: Optional[int] = None,
+        chunk_dir: Optional[str] = None,
+    ) -> None:
+        """
+        write the interactive graph as a self-contained HTML page or as the
+        vis.js nodes, edges and options in a JSON file
+
+        The nodes, edges and styles are the same as those of
+        build_interactive_graph, but are written one at a time without
+        building the pyvis Network, which is much faster for large
+        hierarchies.
+
+        With lod_levels, the graph starts with the first lod_levels levels of
+        the hierarchy (following the first parent of each class), and the
+        deeper classes below each class of the last level are collapsed into
+        a single "N descendants" node. Clicking a collapsed node replaces it
+        with the next lod_levels levels of its subtree, which are stored as a
+        separate JSON chunk and are only parsed (or downloaded) when
+        expanded, so the initial size of the graph does not depend on the
+        size of the hierarchy. Edges to classes in collapsed subtrees are
+        shown once both of their nodes are.
+
+        Parameters
+        ----------
+        output: str or file
+            a filename or an open text file to write to
+        include_similarity: bool
+            include edges for similar code (default True)
+        node_style: dict
+            vis.js node options applied to **all** nodes, as in
+            build_interactive_graph
+        edge_style: dict
+            vis.js edge options applied to **all** edges, as in
+            build_interactive_graph
+        similarity_edge_style: dict
+            vis.js edge options for the similarity links, as in
+            build_interactive_graph
+        override_node_color: str or tuple
+            the color for nodes that over-ride the function being tracked
+        output_format: str
+            (optional) "html" or "json". Default is the file extension of
+            output if it is a filename, otherwise "html".
+        height: str
+            (optional) the height of the graph. Default "600px".
+        width: str
+            (optional) the width of the graph. Default "100%".
+        bgcolor: str or tuple
+            (optional) the background color. Default white.
+        font_color: str or tuple
+            (optional) the color of the node labels. Default black.
+        heading: str
+            (optional) a heading for the HTML page
+        layout: bool
+            (optional) use a hierarchical layout, as in pyvis.Network
+        options: dict
+            (optional) vis.js options, merged into the default options of a
+            pyvis.Network, e.g. {"physics": {"enabled": False}}
+        cdn_resources: str
+            (optional) "in_line" (the default) to include vis-network in the
+            HTML page, or "remote" to load it from a CDN
+        lod_levels: int
+            (optional) the number of levels to show initially and per
+            expanded subtree. Default None shows the whole graph.
+        chunk_dir: str
+            (optional) a directory to write the JSON chunk of each collapsed
+            subtree to ("<node id>.json"), which the HTML page downloads when
+            the subtree is expanded. The page must then be served over http,
+            relative to the chunks. Default None includes the chunks in the
+            HTML page (or in the "chunks" of the JSON output). Only used with
+            lod_levels.
+        """
+        if lod_levels is not None and lod_levels < 1:
+            raise ValueError(f"lod_levels must be at least 1, got {lod_levels}")
+        if output_format is None:
+            output_format = "html"
+            if isinstance(output, str) and output.endswith(".json"):
+                output_format = "json"
+        bgcolor = _validate_color(bgcolor, (1.0, 1.0, 1.0))
+        font_color = _validate_color(font_color, (0.0, 0.0, 0.0))
+        vis_node, vis_edges, vis_collapsed = self._vis_elements(
+            include_similarity,
+            node_style,
+            edge_style,
+            similarity_edge_style,
+            override_node_color,
+            font_color,
+        )
+        table = self._node_list
+        chunks: Optional[Iterator[_Chunk]] = None
+        if lod_levels is None:
+            nodes: Iterator[dict[str, Any]] = (vis_node(*row) for row in table.rows())
+            edges: Iterator[dict[str, Any]] = (
+                edge
+                for node_id, _, _, parent_ids in table.rows()
+                for edge in vis_edges(node_id, parent_ids)
+            )
+        else:
+            nodes, edges, chunks = _lod_chunks(
+                table,
+                lod_levels,
+                self._ancestry_index().subtree_size,
+                vis_node,
+                vis_edges,
+                vis_collapsed,
+            )
+        vis_options = _default_options(layout)
+        if options is not None:
+            _merge_options(vis_options, options)
+        visjs_kwargs: dict[str, Any] = {
+            "output_format": output_format,
+            "height": height,
+            "width": width,
+            "bgcolor": bgcolor,
+            "heading": heading,
+            "cdn_resources": cdn_resources,
+            "chunks": chunks,
+        }
+        if chunks is not None and chunk_dir is not None:
+            os.makedirs(chunk_dir, exist_ok=True)
+            chunk_url = chunk_dir
+            if isinstance(output, str):
+                output_dir = os.path.dirname(os.path.abspath(output))
+                chunk_url = os.path.relpath(chunk_dir, output_dir)
+            visjs_kwargs["chunk_dir"] = chunk_dir
+            visjs_kwargs["chunk_url"] = chunk_url.replace(os.sep, "/") + "/"
+        if isinstance(output, str):
+            with open(output, "w") as fi:
+                _write_visjs(fi, nodes, edges, vis_options, **visjs_kwargs)
+        else:
+            _write_visjs(output, nodes, edges, vis_options, **visjs_kwargs)
 
-        if node_style is None:
-            node_style = {}
-        if edge_style is None:
-            edge_style = {}
-        if similarity_edge_style is None:
-            similarity_edge_style = {}
+    def _vis_elements(
+        self,
+        include_similarity: bool,
+        node_style: dict[str, Any] | None,
+        edge_style: dict[str, Any] | None,
+        similarity_edge_style: dict[str, Any] | None,
+        override_node_color: str | tuple[float, ...] | None,
+        font_color: str,
+        directed: bool = False,
+    ) -> tuple[
+        Callable[[int, str, str, list[int]], dict[str, Any]],
+        Callable[[int, list[int]], Iterator[dict[str, Any]]],
+        Callable[[int, int], tuple[dict[str, Any], dict[str, Any]]],
+    ]:
+        # functions that return the vis.js node of a row of the node table,
+        # the edges of a node and the collapsed node (and its edge) of the
+        # descendants of a node, for the interactive graph. The nodes and
+        # edges are those that pyvis.Network.from_nx builds from an undirected
+        # networkx graph: each similar pair is a single edge (from the first node of
+        # the pair), similarity edges between a child and its parent are
+        # replaced by the parent edge and the "weight" of an edge (default 1)
+        # replaces its "width" unless it also has a "value". Unlike from_nx,
+        # parent edges always go from the parent to the child. The style
+        # dictionaries are not modified.
+        node_style = {} if node_style is None else dict(node_style)
+        edge_style = {} if edge_style is None else dict(edge_style)
+        similarity_edge_style = (
+            {} if similarity_edge_style is None else dict(similarity_edge_style)
+        )
 
         sim_node_physics = similarity_edge_style.pop("physics", False)
         edge_physics = edge_style.pop("physics", True)
@@ -420,61 +1494,95 @@ class ClassGraphTree:
         )
         override_color = _validate_color(override_node_color, (0.5, 0.5, 1.0))
 
-        bgcolor = _validate_color(kwargs.pop("bgcolor", None), (1.0, 1.0, 1.0))
-        font_color = _validate_color(kwargs.pop("font_color", None), (0.0, 0.0, 0.0))
-
-        grph = nx.Graph(directed=True)
-
-        iset = 0
-        for node in self._node_list:
-            if node.color == "#000000":
-                clr_val = node_color
-            else:
-                # this node is over-ridden, use over-ride color
-                clr_val = override_color
-
-            node_style["color"] = clr_val
-
-            if node.parent:
-                parent_info = f"({node.parent.__name__})"
+        node_label = node_style.pop("label", None)
+        node_style["size"] = int(node_style.get("size", 10))
+        node_style.setdefault("shape", "dot")
+        node_style["font"] = {"color": font_color}
+        # the style of a group only applies to nodes without a color
+        use_node_color = "group" not in node_style
+        node_style.pop("color", None)
+
+        edge_style = {
+            "color": edge_color,
+            "physics": edge_physics,
+            "arrows": {"from": {"enabled": True}},
+            **edge_style,
+        }
+        similarity_edge_style = {
+            "color": sim_edge_color,
+            "physics": sim_node_physics,
+            **similarity_edge_style,
+        }
+        for style in (edge_style, similarity_edge_style):
+            if "value" not in style or "width" not in style:
+                style["width"] = style.pop("weight", 1)
+        if directed:
+            similarity_edge_style.setdefault("arrows", "to")
+
+        nodes_table = self._node_list
+        similarity_sets = self.similarity_sets if include_similarity else {}
+
+        def vis_node(
+            node_id: int, name: str, color: str, parent_ids: list[int]
+        ) -> dict[str, Any]:
+            child_id = str(node_id)
+            if parent_ids:
+                parent_names = [nodes_table.name(pid) for pid in parent_ids]
+                title = f"{name}({', '.join(parent_names)})"
             else:
-                parent_info = ""
-            grph.add_node(
-                node.child_id,
-                title=f"{node.child_name}{parent_info}",
-                **node_style,
-            )
-
-            if include_similarity:
-                if int(node.child_id) in self.similarity_sets:
-                    iset += 1
-                    for similar_node_id in self.similarity_sets[int(node.child_id)]:
-                        grph.add_edge(
-                            node.child_id,
-                            str(similar_node_id),
-                            color=sim_edge_color,
-                            physics=sim_node_physics,
-                            **similarity_edge_style,
-                        )
-
-            arrowsop = {"from": {"enabled": True}}
-
-            if node.parent:
-                grph.add_edge(
-                    node.child_id,
-                    node.parent_id,
-                    color=edge_color,
-                    physics=edge_physics,
-                    arrows=arrowsop,
-                    **edge_style,
-                )
-
-        # return the interactive pyvis Network graph
-        network_wrapper = Network(
-            notebook=True, bgcolor=bgcolor, font_color=font_color, **kwargs
-        )
-        network_wrapper.from_nx(grph)
-        return network_wrapper
+                title = name
+            node = {"title": title, **node_style}
+            if use_node_color:
+                # nodes that override funcname use the override color
+                node["color"] = node_color if color == "#000000" else override_color
+            node["id"] = child_id
+            node["label"] = node_label or child_id
+            return node
+
+        def vis_edges(node_id: int, parent_ids: list[int]) -> Iterator[dict[str, Any]]:
+            child_id = str(node_id)
+            for similar_id in sorted(similarity_sets.get(node_id, ())):
+                if similar_id < node_id and node_id in similarity_sets.get(
+                    similar_id, ()
+                ):
+                    continue  # added from the other node of the pair
+                if similar_id in parent_ids or node_id in nodes_table.parents(
+                    similar_id
+                ):
+                    continue  # the parent edge
+                yield {
+                    **similarity_edge_style,
+                    "from": child_id,
+                    "to": str(similar_id),
+                }
+            for parent_id in parent_ids:
+                yield {**edge_style, "from": str(parent_id), "to": child_id}
+
+        def vis_collapsed(
+            node_id: int, n_descendants: int
+        ) -> tuple[dict[str, Any], dict[str, Any]]:
+            # the ids of collapsed nodes (and of their edges) are the node id
+            # prefixed by "+"
+            collapsed_id = f"+{node_id}"
+            plural = "" if n_descendants == 1 else "s"
+            node = {
+                "id": collapsed_id,
+                "label": f"{n_descendants} descendant{plural}",
+                "title": f"{nodes_table.name(node_id)}: click to expand",
+                "shape": "box",
+                "color": node_color,
+                "font": {"color": font_color},
+            }
+            edge = {
+                **edge_style,
+                "id": collapsed_id,
+                "from": str(node_id),
+                "to": collapsed_id,
+                "dashes": True,
+            }
+            return node, edge
+
+        return vis_node, vis_edges, vis_collapsed
 
     def get_source_code(self, node: int | str) -> str:
         """
@@ -491,22 +1599,109 @@ class ClassGraphTree:
         str
         a string containing the source code for the node.
         """
-        node_id: int
+        node_id = self._resolve_node_id(node)
+
+        if node_id in self._override_src:
+            return self._override_src[node_id]
+        else:
+            raise ValueError(f"node {node} does not override the chosen function.")
 
+    def _resolve_node_id(self, node: int | str) -> int:
+        # the node id of a node id or class name
         if not isinstance(node, int) and not isinstance(node, str):
             raise TypeError("Unexpected type for node")
 
         if isinstance(node, int) and node in self._node_map:
-            node_id = node
+            return node
         elif isinstance(node, str) and node in self._node_map_r:
-            node_id = self._node_map_r[node]
-        else:
-            raise ValueError(f"Could not find node for {node}")
+            return self._node_map_r[node]
+        raise ValueError(f"Could not find node for {node}")
 
-        if node_id in self._override_src:
-            return self._override_src[node_id]
-        else:
-            raise ValueError(f"node {node} does not override the chosen function.")
+    def _ancestry_index(self) -> _AncestryIndex:
+        # the ancestry index of the current nodes
+        if self._ancestry is None:
+            self._ancestry = _AncestryIndex(self._node_list, self._override_src)
+        return self._ancestry
+
+    def ancestors(self, node: int | str) -> list[int]:
+        """
+        the node ids of all the ancestors of a node, through every parent
+
+        Parameters
+        ----------
+        node: Union[int, str]
+            the node id or class name of the node
+
+        Returns
+        -------
+        list[int]
+            the sorted node ids of the ancestors
+        """
+        node_id = self._resolve_node_id(node)
+        return [index + 1 for index in self._ancestry_index().ancestors(node_id - 1)]
+
+    def descendants(self, node: int | str) -> list[int]:
+        """
+        the node ids of all the descendants of a node, through every parent
+
+        Parameters
+        ----------
+        node: Union[int, str]
+            the node id or class name of the node
+
+        Returns
+        -------
+        list[int]
+            the sorted node ids of the descendants
+        """
+        node_id = self._resolve_node_id(node)
+        descendant_ids: list[int] = (
+            self._ancestry_index().descendants(node_id - 1) + 1
+        ).tolist()
+        return descendant_ids
+
+    def is_descendant(self, node: int | str, ancestor: int | str) -> bool:
+        """
+        check if a node is a descendant of another node
+
+        Parameters
+        ----------
+        node: Union[int, str]
+            the node id or class name of the node
+        ancestor: Union[int, str]
+            the node id or class name of the possible ancestor
+
+        Returns
+        -------
+        bool
+            True if ancestor is a (strict) ancestor of node through any of
+            its parents
+        """
+        node_id = self._resolve_node_id(node)
+        ancestor_id = self._resolve_node_id(ancestor)
+        return self._ancestry_index().is_descendant(node_id - 1, ancestor_id - 1)
+
+    def defining_node(self, node: int | str) -> Optional[int]:
+        """
+        the node that defines the implementation of funcname that a node
+        uses, following the first parent of each node
+
+        Parameters
+        ----------
+        node: Union[int, str]
+            the node id or class name of the node
+
+        Returns
+        -------
+        Optional[int]
+            the node id of the node itself if it overrides funcname, else of
+            its nearest ancestor that does. None if no ancestor does.
+        """
+        if not self._tracking_function:
+            raise RuntimeError("this functionality requires function tracking.")
+        node_id = self._resolve_node_id(node)
+        defining_id = int(self._ancestry_index().defining_node[node_id - 1])
+        return defining_id or None
 
     def get_multiple_source_code(
         self, node_1: int | str, *args
@@ -532,7 +1727,9 @@ class ClassGraphTree:
             src_dict[src_key] = self.get_source_code(src_key)
         return src_dict
 
-    def display_code_comparison(self, include_overrides_only: bool = True):
+    def display_code_comparison(
+        self, include_overrides_only: bool = True, funcname: Optional[str] = None
+    ):
         """
         show the code comparison widget
 
@@ -541,8 +1738,13 @@ class ClassGraphTree:
         include_overrides_only: bool
             if True (default), only displays the classes that override the function
             being compared.
+        funcname: str
+            (optional) the tracked function to compare, selected with
+            select_funcname. Default is the selected function.
         """
 
+        if funcname is not None:
+            self.select_funcname(funcname)
         # add a check that we are running from a notebook?
         if self.funcname is not None:
             from inheritance_explorer._widget_support import display_code_compare
@@ -550,7 +1752,234 @@ class ClassGraphTree:
             display_code_compare(self, include_overrides_only=include_overrides_only)
 
 
+def _lod_partition(table: _NodeTable, levels: int) -> npt.NDArray[np.int64]:
+    # the level-of-detail chunks of a node table, following the first parent
+    # of each node: the id of the root of the chunk of each node (0 for the
+    # first levels, otherwise the node of the previous chunk above it)
+    parent_id = table.parent_id.astype(np.int64)
+    chunk_root = np.zeros(len(table), dtype=np.int64)
+    for level, indices in enumerate(table.indices_by_depth()):
+        if level < levels:
+            continue
+        parents = parent_id[indices]
+        if level % levels == 0:
+            chunk_root[indices] = parents
+        else:
+            chunk_root[indices] = chunk_root[parents - 1]
+    return chunk_root
+
+
+def _lod_chunks(
+    table: _NodeTable,
+    levels: int,
+    subtree_size: npt.NDArray[np.int64],
+    vis_node: Callable[[int, str, str, list[int]], dict[str, Any]],
+    vis_edges: Callable[[int, list[int]], Iterator[dict[str, Any]]],
+    vis_collapsed: Callable[[int, int], tuple[dict[str, Any], dict[str, Any]]],
+) -> tuple[Iterator[dict[str, Any]], Iterator[dict[str, Any]], Iterator[_Chunk]]:
+    # the vis.js nodes and edges of the first levels of a level-of-detail
+    # graph, and the (root id, nodes, edges) of every collapsed subtree. Each
+    # chunk ends with the collapsed nodes of the subtrees below it.
+    chunk_root = _lod_partition(table, levels)
+    n_descendants = [0] + (subtree_size - 1).tolist()
+    # the node ids of each chunk, the first levels (root 0) first
+    order = np.argsort(chunk_root, kind="stable")
+    roots, starts = np.unique(chunk_root[order], return_index=True)
+    chunk_ids = np.split(order + 1, starts[1:])
+    collapsed = np.zeros(len(table) + 1, dtype=bool)
+    collapsed[roots] = True
+
+    def _chunk(
+        ids: npt.NDArray[np.int64],
+    ) -> tuple[Iterator[dict[str, Any]], Iterator[dict[str, Any]]]:
+        node_ids = ids.tolist()
+        collapsed_ids = [i for i in node_ids if collapsed[i]]
+        nodes = itertools.chain(
+            (vis_node(*table.row(i)) for i in node_ids),
+            (vis_collapsed(i, n_descendants[i])[0] for i in collapsed_ids),
+        )
+        edges = itertools.chain(
+            (edge for i in node_ids for edge in vis_edges(i, table.parents(i))),
+            (vis_collapsed(i, n_descendants[i])[1] for i in collapsed_ids),
+        )
+        return nodes, edges
+
+    nodes, edges = _chunk(chunk_ids[0])
+    chunks = (
+        (root, *_chunk(ids)) for root, ids in zip(roots[1:].tolist(), chunk_ids[1:])
+    )
+    return nodes, edges, chunks
+
+
+# the value of _mro_attribute for classes without the attribute
+_missing = object()
+
+
+def _mro_attribute(cls: Any, name: str) -> Any:
+    # the attribute name of the first class in the MRO of cls that defines
+    # it, as stored in its __dict__, without calling any descriptors
+    for klass in cls.__mro__:
+        if name in vars(klass):
+            return vars(klass)[name]
+    return _missing
+
+
+def _resolve_function(attribute: Any) -> Any:
+    # the underlying function of a class attribute: the function of a
+    # staticmethod or classmethod, the getter of a property and the function
+    # wrapped by decorators that use functools.wraps
+    if isinstance(attribute, (staticmethod, classmethod)):
+        attribute = attribute.__func__
+    elif isinstance(attribute, property):
+        attribute = attribute.fget
+    if not hasattr(attribute, "__wrapped__"):
+        return attribute
+    try:
+        return inspect.unwrap(attribute)
+    except ValueError:  # a cycle of __wrapped__ attributes
+        return attribute
+
+
+def _empty_func_results() -> dict[str, Any]:
+    # the results of a tracked function: the ids of the nodes that override
+    # it, the source and source location of each override, and the similarity
+    # results and sets (None until they are computed)
+    return {
+        "override_ids": [],
+        "override_src": collections.OrderedDict(),
+        "override_src_files": {},
+        "similarity_results": None,
+        "similarity_sets": None,
+    }
+
+
+def _pack_func_results(
+    arrays: dict[str, Any], prefix: str, results: dict[str, Any]
+) -> Optional[str]:
+    # add the snapshot arrays of the results of a tracked function, with
+    # names starting with prefix, returning how the similarity matrix is
+    # stored ("dense", "sparse" or None)
+    arrays[f"{prefix}override_ids"] = np.array(results["override_ids"], dtype=np.int32)
+    src_ids = list(results["override_src"])
+    arrays[f"{prefix}src_ids"] = np.array(src_ids, dtype=np.int32)
+    arrays[f"{prefix}src"], arrays[f"{prefix}src_offsets"] = _pack_strings(
+        list(results["override_src"].values())
+    )
+    arrays[f"{prefix}files"], arrays[f"{prefix}files_offsets"] = _pack_strings(
+        [results["override_src_files"][node_id] for node_id in src_ids]
+    )
+
+    similarity_results = results["similarity_results"]
+    if similarity_results is None:
+        return None
+    matrix = similarity_results["matrix"]
+    arrays[f"{prefix}similarity_axis"] = similarity_results["axis"]
+    if isinstance(matrix, np.ndarray):
+        similarity = "dense"
+        arrays[f"{prefix}similarity_matrix"] = matrix
+    else:
+        similarity = "sparse"
+        arrays[f"{prefix}similarity_data"] = matrix.data
+        arrays[f"{prefix}similarity_indices"] = matrix.indices
+        arrays[f"{prefix}similarity_indptr"] = matrix.indptr
+        arrays[f"{prefix}similarity_shape"] = np.array(matrix.shape, dtype=np.int64)
+    similarity_sets = results["similarity_sets"]
+    arrays[f"{prefix}similar_node_ids"] = np.array(
+        list(similarity_sets), dtype=np.int32
+    )
+    arrays[f"{prefix}similar_offsets"] = np.cumsum(
+        [0] + [len(ids) for ids in similarity_sets.values()], dtype=np.int64
+    )
+    arrays[f"{prefix}similar_ids"] = np.array(
+        [i for ids in similarity_sets.values() for i in sorted(ids)], dtype=np.int32
+    )
+    return similarity
+
+
+def _unpack_func_results(
+    arrays: dict[str, Any], prefix: str, similarity: Optional[str]
+) -> dict[str, Any]:
+    # the results of a tracked function from the arrays of _pack_func_results,
+    # without the axis_names of the similarity results
+    results = _empty_func_results()
+    results["override_ids"] = arrays[f"{prefix}override_ids"].tolist()
+    src_ids = arrays[f"{prefix}src_ids"].tolist()
+    results["override_src"] = collections.OrderedDict(
+        zip(
+            src_ids,
+            _unpack_strings(arrays[f"{prefix}src"], arrays[f"{prefix}src_offsets"]),
+        )
+    )
+    results["override_src_files"] = dict(
+        zip(
+            src_ids,
+            _unpack_strings(arrays[f"{prefix}files"], arrays[f"{prefix}files_offsets"]),
+        )
+    )
+    if similarity is None:
+        return results
+
+    if similarity == "dense":
+        matrix = arrays[f"{prefix}similarity_matrix"]
+    else:
+        matrix = _get_scipy_sparse().csr_matrix(
+            (
+                arrays[f"{prefix}similarity_data"],
+                arrays[f"{prefix}similarity_indices"],
+                arrays[f"{prefix}similarity_indptr"],
+            ),
+            shape=tuple(arrays[f"{prefix}similarity_shape"].tolist()),
+            copy=False,
+        )
+    results["similarity_results"] = {
+        "matrix": matrix,
+        "axis": arrays[f"{prefix}similarity_axis"],
+    }
+    similar_bounds = arrays[f"{prefix}similar_offsets"].tolist()
+    similar_ids = arrays[f"{prefix}similar_ids"].tolist()
+    results["similarity_sets"] = {
+        node_id: set(similar_ids[start:end])
+        for node_id, start, end in zip(
+            arrays[f"{prefix}similar_node_ids"].tolist(),
+            similar_bounds[:-1],
+            similar_bounds[1:],
+        )
+    }
+    return results
+
+
+def _above_cutoff(
+    matrix: Any, cutoff: float
+) -> tuple[npt.NDArray[Any], npt.NDArray[Any], npt.NDArray[Any]]:
+    # the (row, column, value) of every entry >= cutoff of a dense or sparse
+    # matrix, sorted by row
+    if isinstance(matrix, np.ndarray):
+        # flatnonzero + divmod is much faster than a 2d nonzero
+        flat_indices = np.flatnonzero(matrix >= cutoff)
+        rows, cols = np.divmod(flat_indices, matrix.shape[1])
+        return rows, cols, matrix.ravel()[flat_indices]
+    coo = matrix.tocoo()
+    keep = coo.data >= cutoff
+    rows, cols, values = coo.row[keep], coo.col[keep], coo.data[keep]
+    order = np.lexsort((cols, rows))
+    return rows[order], cols[order], values[order]
+
+
+def _dot_quote(value: Any) -> str:
+    # a value as a quoted DOT string
+    value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{value}"'
+
+
+def _rgb_to_hex(rgb: tuple[float, float, float]) -> str:
+    # matplotlib.colors.rgb2hex for rgb values in [0, 1], without importing
+    # matplotlib
+    return "#" + "".join(f"{round(val * 255):02x}" for val in rgb)
+
+
 def _validate_color(clr, default_rgb_tuple: tuple[float, float, float]) -> str:
+    from matplotlib.colors import rgb2hex
+
     if clr is None:
         return str(rgb2hex(default_rgb_tuple))
     elif isinstance(clr, tuple):
@@ -561,7 +1990,7 @@ def _validate_color(clr, default_rgb_tuple: tuple[float, float, float]) -> str:
     raise TypeError(msg)
 
 
-def _show_graph(dot_graph: pydot.Dot, format: str = "svg", env: str = "notebook"):
+def _show_graph(dot_graph: "pydot.Dot", format: str = "svg", env: str = "notebook"):
     # return a GraphViz dot graph in a jupyter-friendly format.
     create_func = getattr(dot_graph, f"create_{format}")
     graph = create_func()
@@ -1,6 +1,13 @@
 import abc
+import ast
 import collections
-from typing import Any, Optional, OrderedDict
+import concurrent.futures
+import difflib
+import hashlib
+import os
+import re
+import zlib
+from typing import Any, Callable, Iterable, Iterator, Optional, OrderedDict
 
 import numpy as np
 import numpy.typing as npt
@@ -27,19 +34,202 @@ _sdict_type = OrderedDict[int, str]
 
 _nested_source_dict = dict[int, OrderedDict[int, ResultsContainer]]
 
+# the similarity matrix is a numpy array or a scipy.sparse.csr_matrix
 _sim_results_tuple = tuple[
     _nested_source_dict,
-    npt.NDArray[Any],
+    npt.NDArray[Any] | Any,
     tuple[int, ...],
 ]
 
 
+def _get_scipy_sparse() -> Any:
+    try:
+        from scipy import sparse
+    except ImportError as err:
+        msg = "sparse similarity matrices require scipy, install it with pip install scipy"
+        raise ImportError(msg) from err
+    return sparse
+
+
 _single_result = OrderedDict[int, ResultsContainer]
 
 
+class _FuncDigest:
+    # the normalized AST dump of a single function, in the form expected by
+    # pycode_similar.UnifiedDiff
+    __slots__ = ("func_ast_lines", "digest")
+
+    def __init__(self, func_ast_lines: list[str]):
+        self.func_ast_lines = func_ast_lines
+        # a stable digest, so that it is the same in every worker process
+        self.digest = zlib.crc32("".join(func_ast_lines).encode())
+
+
+class SourceFingerprint:
+    """
+    The parsed and normalized representation of a single source string.
+
+    Parsing and normalization follow pycode_similar.detect exactly, so that
+    comparisons between fingerprints reproduce its similarity values, but
+    each source only needs to be processed once no matter how many times it
+    is compared.
+
+    Parameters
+    ----------
+    source: str
+        the source code to fingerprint
+    """
+
+    def __init__(self, source: str):
+        root_node = ast.parse(source)
+        collector = pycode_similar.FuncNodeCollector(keep_prints=False)
+        collector.visit(root_node)
+        code_lines = source.splitlines(True)
+        # all FuncInfo objects must exist before dumping, as each one strips
+        # the name from its node (which affects the dumps of enclosing funcs)
+        func_info = [
+            pycode_similar.FuncInfo(n, code_lines)
+            for n in collector.get_function_nodes()
+        ]
+        self.functions = [_FuncDigest(fi.func_ast_lines) for fi in func_info]
+
+    def compare(self, candidate: "SourceFingerprint") -> tuple[int, int, float]:
+        """
+        compare against a candidate fingerprint, using this one as reference
+
+        Parameters
+        ----------
+        candidate: SourceFingerprint
+            the fingerprint to compare to
+
+        Returns
+        -------
+        (count, total, similarity_fraction)
+            the values for the best-matching function, as in
+            pycode_similar.detect
+        """
+        if len(self.functions) == 0:
+            raise pycode_similar.NoFuncException(0)
+
+        best: tuple[int, int, float] | None = None
+        for fi1 in self.functions:
+            min_diff_value = int((1 << 31) - 1)
+            matched = False
+            for fi2 in candidate.functions:
+                if (
+                    fi1.digest == fi2.digest
+                    and fi1.func_ast_lines == fi2.func_ast_lines
+                ):
+                    dv = 0
+                else:
+                    dv = pycode_similar.UnifiedDiff.diff(fi1, fi2)
+                if dv < min_diff_value:
+                    min_diff_value = dv
+                    matched = True
+                if dv == 0:
+                    break
+
+            total = len(fi1.func_ast_lines)
+            count = total - min_diff_value if matched else 0
+            fraction = 0 if total == 0 else count / float(total)
+            # detect() sorts by fraction (stable, descending) and the first
+            # entry is used, so only replace on a strictly larger fraction
+            if best is None or fraction > best[2]:
+                best = (count, total, fraction)
+
+        assert best is not None
+        return best
+
+    def compare_symmetric(self, other: "SourceFingerprint") -> tuple[int, int, float]:
+        """
+        a symmetric comparison between two fingerprints
+
+        Each pair of functions is scored by the fraction of normalized AST
+        lines that they share, 2 * matched / (len_1 + len_2), and the best
+        scoring pair is used. The result does not depend on the order of the
+        two fingerprints.
+
+        Parameters
+        ----------
+        other: SourceFingerprint
+            the fingerprint to compare to
+
+        Returns
+        -------
+        (count, total, similarity_fraction)
+            count is twice the number of matched lines and total is the
+            combined number of lines of the best-matching pair of functions.
+            As with compare, a fingerprint without functions has a similarity
+            of 0 to any other.
+        """
+        if len(self.functions) == 0 and len(other.functions) == 0:
+            raise pycode_similar.NoFuncException(0)
+        if len(self.functions) == 0 or len(other.functions) == 0:
+            functions = self.functions or other.functions
+            return 0, len(functions[0].func_ast_lines), 0.0
+
+        best: tuple[float, int, int] | None = None
+        for fi1 in self.functions:
+            for fi2 in other.functions:
+                lines_1, lines_2 = fi1.func_ast_lines, fi2.func_ast_lines
+                total = len(lines_1) + len(lines_2)
+                if fi1.digest == fi2.digest and lines_1 == lines_2:
+                    count = total
+                else:
+                    # match in a fixed order, so that the score is symmetric.
+                    # autojunk is disabled, as it depends on the order and on
+                    # the length of the second sequence.
+                    if lines_2 < lines_1:
+                        lines_1, lines_2 = lines_2, lines_1
+                    matcher = difflib.SequenceMatcher(
+                        None, lines_1, lines_2, autojunk=False
+                    )
+                    count = 2 * sum(m.size for m in matcher.get_matching_blocks())
+                fraction = 0 if total == 0 else count / float(total)
+                # ties are broken by count and total, independent of order
+                if best is None or (fraction, count, total) > best:
+                    best = (fraction, count, total)
+
+        assert best is not None
+        return best[1], best[2], best[0]
+
+    def self_similarity(self) -> tuple[int, int, float]:
+        """
+        the result of compare_symmetric with itself, without comparing
+
+        Every function matches itself with a similarity of 1, so the best
+        pair is the longest function paired with itself.
+        """
+        if len(self.functions) == 0:
+            raise pycode_similar.NoFuncException(0)
+        total = 2 * max(len(func.func_ast_lines) for func in self.functions)
+        return total, total, 1.0
+
+
+def _source_digest(source: str) -> str:
+    # a digest of the AST of a source without its docstrings, so that sources
+    # that only differ in whitespace, comments or docstrings share a digest.
+    # SourceFingerprint removes the same (and more) details, so sources with
+    # the same digest have equal fingerprints and identical similarities.
+    try:
+        root_node = ast.parse(source)
+    except SyntaxError:
+        return "source:" + hashlib.blake2b(source.encode(), digest_size=16).hexdigest()
+    for node in ast.walk(root_node):
+        if (
+            isinstance(
+                node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+            )
+            and ast.get_docstring(node, clean=False) is not None
+        ):
+            node.body = node.body[1:]
+    dump = ast.dump(root_node)
+    return "ast:" + hashlib.blake2b(dump.encode(), digest_size=16).hexdigest()
+
+
 class SimilarityContainer(abc.ABC):
 
-    _valid_methods: list[str] = ["permute", "reference"]
+    _valid_methods: list[str] = ["permute", "pairwise", "reference"]
 
     def __init__(self, method: str = "reference"):
         if method not in self._valid_methods:
@@ -55,12 +245,22 @@ class SimilarityContainer(abc.ABC):
         """
         source_dict : dict
             dictionary mapping a node identifier to a source code string
+        reference :
+            the key of source_dict to compare against, only used (and
+            required) by the "reference" method.
+
+        The "permute" method compares every source against every other source
+        in both directions and averages the two (asymmetric) results. The
+        "pairwise" method compares each unordered pair of sources once using a
+        symmetric score.
         """
 
         source_dict_c = source_dict.copy()
         results: _single_result | _sim_results_tuple
         if self.method == "permute":
             results = self._permute_and_run(source_dict_c)
+        elif self.method == "pairwise":
+            results = self._pairwise_and_run(source_dict_c)
         else:
             if reference not in source_dict_c or reference is None:
                 raise ValueError(
@@ -73,6 +273,10 @@ class SimilarityContainer(abc.ABC):
     def _permute_and_run(self, source_dict: _sdict_type) -> _sim_results_tuple:
         pass
 
+    @abc.abstractmethod
+    def _pairwise_and_run(self, source_dict: _sdict_type) -> _sim_results_tuple:
+        pass
+
     @abc.abstractmethod
     def _compare_single_set(
         self, source_dict: _sdict_type, reference: Any
@@ -80,45 +284,582 @@ class SimilarityContainer(abc.ABC):
         pass
 
 
+# the fingerprints used by a worker process, set once by _init_worker
+_worker_fingerprints: list["SourceFingerprint"] = []
+
+
+def _init_worker(fingerprints: list["SourceFingerprint"]):
+    global _worker_fingerprints
+    _worker_fingerprints = fingerprints
+
+
+def _compare_worker_rows(
+    rows: list[int], pairwise: bool = False
+) -> list[list[tuple[int, int, float]]]:
+    # compare the rows in a worker process initialized with _init_worker
+    return _compare_rows(_worker_fingerprints, rows, pairwise)
+
+
+def _compare_rows(
+    fingerprints: list[SourceFingerprint], rows: list[int], pairwise: bool
+) -> list[list[tuple[int, int, float]]]:
+    # compare the fingerprints at the given row indices against all of the
+    # fingerprints (or against those after the row for pairwise comparisons)
+    if pairwise:
+        return [
+            [
+                fingerprints[irow].compare_symmetric(fp)
+                for fp in fingerprints[irow + 1 :]
+            ]
+            for irow in rows
+        ]
+    return [[fingerprints[irow].compare(fp) for fp in fingerprints] for irow in rows]
+
+
+def _compare_worker_pairs(
+    pairs: list[tuple[int, int]], pairwise: bool = False
+) -> list[tuple[tuple[int, int, float], tuple[int, int, float]]]:
+    # compare the pairs in a worker process initialized with _init_worker
+    return _compare_pairs(_worker_fingerprints, pairs, pairwise)
+
+
+def _compare_pairs(
+    fingerprints: list[SourceFingerprint], pairs: list[tuple[int, int]], pairwise: bool
+) -> list[tuple[tuple[int, int, float], tuple[int, int, float]]]:
+    # compare the fingerprints of each (i, j) pair in both directions
+    results = []
+    for i, j in pairs:
+        if pairwise:
+            r_ij = r_ji = fingerprints[i].compare_symmetric(fingerprints[j])
+        else:
+            r_ij = fingerprints[i].compare(fingerprints[j])
+            r_ji = fingerprints[j].compare(fingerprints[i])
+        results.append((r_ij, r_ji))
+    return results
+
+
 class PycodeSimilarity(SimilarityContainer):
+    """
+    Similarity container using pycode_similar
+
+    Parameters
+    ----------
+    method: str
+        the comparison method, "reference", "permute" or "pairwise" (default
+        "reference")
+    n_workers: int
+        (optional) the number of worker processes used to build the "permute"
+        or "pairwise" similarity matrix. If None or 1 (the default), the
+        matrix is computed serially.
+    executor: concurrent.futures.Executor
+        (optional) an existing executor to submit the row blocks of the
+        "permute" or "pairwise" similarity matrix to.
+    sparse: bool
+        (optional) if True, the "permute" and "pairwise" similarity matrix is
+        returned as a scipy.sparse.csr_matrix (requires scipy), built row by
+        row without a dense intermediate matrix. Default False.
+    cutoff: float
+        (optional) the smallest similarity stored when sparse is True. Default
+        is 0.0, which stores every non-zero similarity.
+    fingerprints: dict
+        (optional) a dict of parsed sources, keyed by the source string, to
+        use and add to. Share one between containers to parse each source
+        only once, e.g. for many trees of the same package.
+    """
+
+    def __init__(
+        self,
+        method: str = "reference",
+        n_workers: Optional[int] = None,
+        executor: Optional[concurrent.futures.Executor] = None,
+        sparse: bool = False,
+        cutoff: float = 0.0,
+        fingerprints: Optional[dict[str, SourceFingerprint]] = None,
+    ):
+        super().__init__(method=method)
+        self.n_workers = n_workers
+        self.executor = executor
+        self.sparse = sparse
+        self.cutoff = cutoff
+        # parsed sources, keyed by the source string
+        if fingerprints is None:
+            fingerprints = {}
+        self._fingerprints = fingerprints
+
+    def _get_fingerprint(self, src: str) -> SourceFingerprint:
+        if src not in self._fingerprints:
+            self._fingerprints[src] = SourceFingerprint(src)
+        return self._fingerprints[src]
+
     def _compare_single_set(
         self,
         source_dict: _sdict_type,
         reference: int,
     ) -> _single_result:
 
-        src = source_dict[reference]  # extract the reference
+        ref_fp = self._get_fingerprint(source_dict[reference])
         # this will result in a self-comparison, but that is OK and makes some
         # things easier in _permute_and_run
-        src_list = [
-            src,
-        ] + [v for v in source_dict.values()]
-        similarity = pycode_similar.detect(src_list)
-
-        results: _single_result = collections.OrderedDict()
-        for class_id, sim in zip(source_dict.keys(), similarity):
-            results[class_id] = ResultsContainer(
-                count=sim[1][0].plagiarism_count,
-                total=sim[1][0].total_count,
-                similarity_fraction=sim[1][0].plagiarism_percent,
-                base_class=reference,
-                this_class=class_id,
-            )
-        return results
+        row = [ref_fp.compare(self._get_fingerprint(s)) for s in source_dict.values()]
+        return _build_results(row, tuple(source_dict.keys()), reference)
+
+    def _compare_all_rows(
+        self, sources: list[str], pairwise: bool = False
+    ) -> list[list[tuple[int, int, float]]]:
+        # compare every source against every other, returns (count, total,
+        # similarity_fraction) for each reference (row) and candidate (column).
+        # For pairwise comparisons, row i only contains the columns j > i.
+        N = len(sources)
+        # each source is only parsed once, here, and the fingerprints are sent
+        # to any workers
+        fingerprints = [self._get_fingerprint(src) for src in sources]
+        if not self._use_workers():
+            return _compare_rows(fingerprints, list(range(N)), pairwise)
+
+        # interleave rows across blocks so that each block has a similar cost
+        blocks = self._interleaved_blocks(list(range(N)))
+        block_results = self._map_blocks(
+            _compare_rows, _compare_worker_rows, fingerprints, blocks, pairwise
+        )
+
+        all_rows: list[list[tuple[int, int, float]]] = [[] for _ in range(N)]
+        for rows, block_result in zip(blocks, block_results):
+            for irow, row in zip(rows, block_result):
+                all_rows[irow] = row
+        return all_rows
+
+    def _use_workers(self) -> bool:
+        return self.executor is not None or (
+            self.n_workers is not None and self.n_workers > 1
+        )
+
+    def _interleaved_blocks(self, tasks: list[Any]) -> list[list[Any]]:
+        # split the tasks into one block per worker
+        n_blocks = self.n_workers or os.cpu_count() or 1
+        n_blocks = max(min(n_blocks, len(tasks)), 1)
+        return [tasks[iblock::n_blocks] for iblock in range(n_blocks)]
+
+    def _map_blocks(
+        self,
+        func: Callable[..., Any],
+        worker_func: Callable[..., Any],
+        fingerprints: list[SourceFingerprint],
+        blocks: list[list[Any]],
+        pairwise: bool,
+    ) -> list[Any]:
+        # run func(fingerprints, block, pairwise) on the supplied executor, or
+        # worker_func(block, pairwise) on a new pool whose workers each receive
+        # the fingerprints once.
+        if self.executor is not None:
+            futures = [
+                self.executor.submit(func, fingerprints, block, pairwise)
+                for block in blocks
+            ]
+            return [f.result() for f in futures]
+        with concurrent.futures.ProcessPoolExecutor(
+            self.n_workers, initializer=_init_worker, initargs=(fingerprints,)
+        ) as pool:
+            return list(pool.map(worker_func, blocks, [pairwise] * len(blocks)))
 
     def _permute_and_run(
         self, source_dict: OrderedDict[int, str]
     ) -> _sim_results_tuple:
         N = len(source_dict)
-        similarity_matrix = np.ones((N, N))
         results_by_ref: _nested_source_dict = {}
         sim_axis = tuple([i for i in source_dict.keys()])
-        for iref, ref in enumerate(source_dict.keys()):
-            results = self._compare_single_set(source_dict.copy(), ref)
-            sim_array = np.array([r.similarity_fraction for r in results.values()])
-            similarity_matrix[iref, :] = sim_array
-            results_by_ref[ref] = results
+        all_rows = self._compare_all_rows(list(source_dict.values()))
+        for iref, ref in enumerate(sim_axis):
+            results_by_ref[ref] = _build_results(all_rows[iref], sim_axis, ref)
+
+        if self.sparse:
+            # correct for asymmetry one row (and column) at a time
+            def _symmetric_rows() -> Iterator[tuple[int, npt.NDArray[np.float64]]]:
+                for iref in range(N):
+                    row = np.array([r[2] for r in all_rows[iref]])
+                    col = np.array([all_rows[icol][iref][2] for icol in range(N)])
+                    yield iref, (row + col) / 2.0
 
+            similarity_matrix = self._threshold_rows(N, _symmetric_rows())
+            return results_by_ref, similarity_matrix, sim_axis
+
+        similarity_matrix = np.array(
+            [[r[2] for r in row] for row in all_rows], dtype=float
+        ).reshape((N, N))
         # correct for asymmetry
         similarity_matrix = (similarity_matrix.T + similarity_matrix) / 2.0
         return results_by_ref, similarity_matrix, sim_axis
+
+    def _pairwise_and_run(
+        self, source_dict: OrderedDict[int, str]
+    ) -> _sim_results_tuple:
+        N = len(source_dict)
+        sim_axis = tuple([i for i in source_dict.keys()])
+        sources = list(source_dict.values())
+        upper_rows = self._compare_all_rows(sources, pairwise=True)
+
+        # fill in the full rows: the upper triangle is mirrored and the
+        # diagonal is set without comparing
+        all_rows: list[list[tuple[int, int, float]]] = []
+        for iref in range(N):
+            row = [all_rows[icol][iref] for icol in range(iref)]
+            row.append(self._get_fingerprint(sources[iref]).self_similarity())
+            row.extend(upper_rows[iref])
+            all_rows.append(row)
+
+        results_by_ref: _nested_source_dict = {}
+        for iref, ref in enumerate(sim_axis):
+            results_by_ref[ref] = _build_results(all_rows[iref], sim_axis, ref)
+
+        if self.sparse:
+            similarity_matrix = self._threshold_rows(
+                N,
+                ((i, np.array([r[2] for r in row])) for i, row in enumerate(all_rows)),
+            )
+        else:
+            similarity_matrix = np.array(
+                [[r[2] for r in row] for row in all_rows], dtype=float
+            ).reshape((N, N))
+        return results_by_ref, similarity_matrix, sim_axis
+
+    def _threshold_rows(
+        self, N: int, rows: Iterable[tuple[int, npt.NDArray[np.float64]]]
+    ) -> Any:
+        # build a (N, N) csr_matrix from the (row index, row values) of each
+        # row, only keeping the non-zero values >= cutoff
+        row_ids, col_ids, values = [], [], []
+        for irow, row_values in rows:
+            keep = np.flatnonzero((row_values >= self.cutoff) & (row_values > 0))
+            row_ids.append(np.full(keep.size, irow))
+            col_ids.append(keep)
+            values.append(row_values[keep])
+        if N == 0:
+            return _get_scipy_sparse().csr_matrix((0, 0))
+        return _get_scipy_sparse().csr_matrix(
+            (
+                np.concatenate(values),
+                (np.concatenate(row_ids), np.concatenate(col_ids)),
+            ),
+            shape=(N, N),
+        )
+
+    def similarity_rows(
+        self, source_dict: _sdict_type, rows: list[int]
+    ) -> npt.NDArray[np.float64]:
+        """
+        the rows of the "permute" or "pairwise" similarity matrix for some of
+        the sources, without comparing the other sources to each other.
+
+        Parameters
+        ----------
+        source_dict: dict
+            the dictionary of all of the sources
+        rows: list[int]
+            the keys of source_dict to compute the rows for
+
+        Returns
+        -------
+        np.ndarray
+            the (len(rows), len(source_dict)) array of similarities, equal to
+            the corresponding rows of the matrix from run(source_dict).
+        """
+        if self.method not in ("permute", "pairwise"):
+            raise ValueError(
+                f"unexpected value, {self.method=}, must be 'permute' or 'pairwise'"
+            )
+        pairwise = self.method == "pairwise"
+        keys = list(source_dict.keys())
+        index = {key: i for i, key in enumerate(keys)}
+        row_index = {index[key]: irow for irow, key in enumerate(rows)}
+        sources = list(source_dict.values())
+        fps = [self._get_fingerprint(src) for src in sources]
+
+        similarity = np.zeros((len(rows), len(keys)))
+        for i, irow in row_index.items():
+            if pairwise:
+                similarity[irow, i] = fps[i].self_similarity()[2]
+            else:
+                similarity[irow, i] = fps[i].compare(fps[i])[2]
+
+        pairs = self._row_pairs(sources, list(row_index.keys()))
+        if self._use_workers() and len(pairs) > 0:
+            blocks = self._interleaved_blocks(pairs)
+            block_results = self._map_blocks(
+                _compare_pairs, _compare_worker_pairs, fps, blocks, pairwise
+            )
+            pairs = [pair for block in blocks for pair in block]
+            pair_results = [result for block in block_results for result in block]
+        else:
+            pair_results = _compare_pairs(fps, pairs, pairwise)
+
+        for (i, j), (r_ij, r_ji) in zip(pairs, pair_results):
+            value = r_ij[2] if pairwise else (r_ij[2] + r_ji[2]) / 2.0
+            similarity[row_index[i], j] = value
+            if j in row_index:
+                similarity[row_index[j], i] = value
+        return similarity
+
+    def _row_pairs(self, sources: list[str], rows: list[int]) -> list[tuple[int, int]]:
+        # the (i, j) pairs to compare for the rows of similarity_rows, each
+        # unordered pair only once
+        row_set = set(rows)
+        return [
+            (i, j)
+            for i in rows
+            for j in range(len(sources))
+            if j != i and (j not in row_set or j > i)
+        ]
+
+
+def _build_results(
+    row: list[tuple[int, int, float]], class_ids: tuple[int, ...], reference: int
+) -> _single_result:
+    results: _single_result = collections.OrderedDict()
+    for class_id, (count, total, fraction) in zip(class_ids, row):
+        results[class_id] = ResultsContainer(
+            count=count,
+            total=total,
+            similarity_fraction=fraction,
+            base_class=reference,
+            this_class=class_id,
+        )
+    return results
+
+
+class MinHashSimilarity(PycodeSimilarity):
+    """
+    Similarity container that only compares likely-similar sources
+
+    MinHash signatures of the normalized AST token shingles of each source are
+    banded into locality-sensitive hashing (LSH) buckets and only the pairs of
+    sources that share a bucket are compared, as in PycodeSimilarity. Pairs
+    that are not compared have a similarity of 0, and are not stored when
+    sparse is True.
+
+    Parameters
+    ----------
+    method: str
+        the comparison method, "reference", "permute" or "pairwise" (default
+        "reference"). The "reference" method compares every source to the
+        reference, without filtering.
+    n_workers: int
+        (optional) the number of worker processes that the candidate pairs are
+        compared on, see PycodeSimilarity.
+    executor: concurrent.futures.Executor
+        (optional) an existing executor to submit blocks of candidate pairs
+        to, see PycodeSimilarity.
+    sparse: bool
+        (optional) if True, the similarity matrix is returned as a
+        scipy.sparse.csr_matrix (requires scipy). Default False.
+    cutoff: float
+        (optional) the smallest similarity stored when sparse is True. Default
+        is 0.0, which stores every compared pair.
+    fingerprints: dict
+        (optional) a shared dict of parsed sources, see PycodeSimilarity.
+    num_perm: int
+        (optional) the number of hash permutations in each MinHash signature.
+        Default is 128.
+    n_bands: int
+        (optional) the number of LSH bands, must evenly divide num_perm.
+        More bands give more candidate pairs and a higher recall. Default is
+        32, which favors speed: on the synthetic sources of
+        benchmarks/bench_minhash_recall.py it compares about 20% of the pairs
+        and finds about 83% of the pairs above a 0.75 similarity. A
+        shingle_size of 4 raises this to 95% while comparing about 47% of the
+        pairs, and 64 bands find every pair but compare almost all of them.
+    shingle_size: int
+        (optional) the number of consecutive AST tokens in each shingle.
+        Default is 8.
+    seed: int
+        (optional) the seed for the hash permutations. Default is 0.
+    """
+
+    # the smallest prime larger than 2**32, so that (a * hash + b) fits in
+    # a uint64 for 32 bit hashes.
+    _prime = np.uint64(4294967311)
+    # the signature value of sources with no shingles, larger than any hash
+    _empty = np.iinfo(np.uint64).max
+
+    def __init__(
+        self,
+        method: str = "reference",
+        n_workers: Optional[int] = None,
+        executor: Optional[concurrent.futures.Executor] = None,
+        sparse: bool = False,
+        cutoff: float = 0.0,
+        fingerprints: Optional[dict[str, SourceFingerprint]] = None,
+        num_perm: int = 128,
+        n_bands: int = 32,
+        shingle_size: int = 8,
+        seed: int = 0,
+    ):
+        super().__init__(
+            method=method,
+            n_workers=n_workers,
+            executor=executor,
+            sparse=sparse,
+            cutoff=cutoff,
+            fingerprints=fingerprints,
+        )
+        if num_perm % n_bands != 0:
+            raise ValueError(f"{n_bands=} must evenly divide {num_perm=}")
+        self.num_perm = num_perm
+        self.n_bands = n_bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        max_val = np.iinfo(np.uint32).max
+        self._perm_a = rng.integers(1, max_val, size=num_perm, dtype=np.uint64)
+        self._perm_b = rng.integers(0, max_val, size=num_perm, dtype=np.uint64)
+
+    def _shingle_hashes(self, src: str) -> npt.NDArray[np.uint64]:
+        # 32 bit hashes of the shingles of the normalized AST tokens
+        fp = self._get_fingerprint(src)
+        tokens: list[str] = []
+        for func in fp.functions:
+            tokens.extend(re.findall(r"\w+", "".join(func.func_ast_lines)))
+        if len(tokens) == 0:
+            return np.empty((0,), dtype=np.uint64)
+        n_shingles = max(len(tokens) - self.shingle_size + 1, 1)
+        shingles = {
+            " ".join(tokens[i : i + self.shingle_size]) for i in range(n_shingles)
+        }
+        return np.array([zlib.crc32(sh.encode()) for sh in shingles], dtype=np.uint64)
+
+    def signatures(self, sources: list[str]) -> npt.NDArray[np.uint64]:
+        """
+        MinHash signatures
+
+        Parameters
+        ----------
+        sources: list[str]
+            the source strings
+
+        Returns
+        -------
+        np.ndarray
+            the (len(sources), num_perm) array of signatures. Sources without
+            any functions have an empty signature, with every value set to
+            the maximum uint64.
+        """
+        sigs = np.full((len(sources), self.num_perm), self._empty, dtype=np.uint64)
+        for isrc, src in enumerate(sources):
+            hv = self._shingle_hashes(src)
+            if hv.size == 0:
+                continue
+            perms = (np.outer(hv, self._perm_a) + self._perm_b) % self._prime
+            sigs[isrc, :] = perms.min(axis=0)
+        return sigs
+
+    def candidate_pairs(self, sources: list[str]) -> npt.NDArray[np.int64]:
+        """
+        the pairs of sources that share at least one LSH bucket
+
+        Parameters
+        ----------
+        sources: list[str]
+            the source strings
+
+        Returns
+        -------
+        np.ndarray
+            a (M, 2) array of the unique index pairs (i, j), with i < j. Sources
+            without any functions are never candidates.
+        """
+        sigs = self.signatures(sources)
+        # only band the non-empty signatures, mapping back to the source index
+        has_shingles = np.flatnonzero(sigs[:, 0] != self._empty)
+        sigs = sigs[has_shingles]
+        rows_per_band = self.num_perm // self.n_bands
+        pairs = [np.empty((0, 2), dtype=np.int64)]
+        for iband in range(self.n_bands):
+            band = sigs[:, iband * rows_per_band : (iband + 1) * rows_per_band]
+            _, bucket = np.unique(band, axis=0, return_inverse=True)
+            bucket = bucket.ravel()
+            order = np.argsort(bucket, kind="stable")
+            split_at = np.flatnonzero(np.diff(bucket[order])) + 1
+            for members in np.split(order, split_at):
+                if len(members) > 1:
+                    i, j = np.triu_indices(len(members), k=1)
+                    pairs.append(np.column_stack([members[i], members[j]]))
+        all_pairs = np.sort(has_shingles[np.concatenate(pairs)], axis=1)
+        return np.unique(all_pairs, axis=0)
+
+    def _row_pairs(self, sources: list[str], rows: list[int]) -> list[tuple[int, int]]:
+        # only the candidate pairs that include one of the rows
+        row_set = set(rows)
+        return [
+            (i, j) if i in row_set else (j, i)
+            for i, j in self.candidate_pairs(sources).tolist()
+            if i in row_set or j in row_set
+        ]
+
+    def _permute_and_run(
+        self, source_dict: OrderedDict[int, str]
+    ) -> _sim_results_tuple:
+        return self._run_candidates(source_dict, pairwise=False)
+
+    def _pairwise_and_run(
+        self, source_dict: OrderedDict[int, str]
+    ) -> _sim_results_tuple:
+        return self._run_candidates(source_dict, pairwise=True)
+
+    def _run_candidates(
+        self, source_dict: OrderedDict[int, str], pairwise: bool
+    ) -> _sim_results_tuple:
+        N = len(source_dict)
+        sim_axis = tuple([i for i in source_dict.keys()])
+        fps = [self._get_fingerprint(src) for src in source_dict.values()]
+        # (row, column, value) of the compared entries of the matrix
+        rows: list[int] = []
+        cols: list[int] = []
+        values: list[float] = []
+
+        results_by_ref: _nested_source_dict = {}
+        for iref, ref in enumerate(sim_axis):
+            if pairwise:
+                self_result = fps[iref].self_similarity()
+            else:
+                self_result = fps[iref].compare(fps[iref])
+            results_by_ref[ref] = _build_results([self_result], (ref,), ref)
+            rows.append(iref)
+            cols.append(iref)
+            values.append(self_result[2])
+
+        pairs = [
+            (i, j) for i, j in self.candidate_pairs(list(source_dict.values())).tolist()
+        ]
+        if self._use_workers() and len(pairs) > 0:
+            blocks = self._interleaved_blocks(pairs)
+            block_results = self._map_blocks(
+                _compare_pairs, _compare_worker_pairs, fps, blocks, pairwise
+            )
+            pairs = [pair for block in blocks for pair in block]
+            pair_results = [result for block in block_results for result in block]
+        else:
+            pair_results = _compare_pairs(fps, pairs, pairwise)
+
+        for (i, j), (r_ij, r_ji) in zip(pairs, pair_results):
+            if pairwise:
+                value = r_ij[2]
+            else:
+                value = (r_ij[2] + r_ji[2]) / 2.0
+            rows.extend((i, j))
+            cols.extend((j, i))
+            values.extend((value, value))
+            ref_i, ref_j = sim_axis[i], sim_axis[j]
+            results_by_ref[ref_i].update(_build_results([r_ij], (ref_j,), ref_i))
+            results_by_ref[ref_j].update(_build_results([r_ji], (ref_i,), ref_j))
+
+        if self.sparse:
+            values_array = np.array(values)
+            keep = values_array >= self.cutoff
+            similarity_matrix = _get_scipy_sparse().csr_matrix(
+                (
+                    values_array[keep],
+                    (np.array(rows, dtype=int)[keep], np.array(cols, dtype=int)[keep]),
+                ),
+                shape=(N, N),
+            )
+        else:
+            similarity_matrix = np.zeros((N, N))
+            similarity_matrix[rows, cols] = values
+        return results_by_ref, similarity_matrix, sim_axis
@@ -0,0 +1,472 @@
+"""Import-free class hierarchies built from the ASTs of source files."""
+
+import ast
+import builtins
+import concurrent.futures
+import os
+import textwrap
+import tokenize
+from typing import Iterable, Iterator, Optional
+
+
+class _ClassRecord:
+    # a class definition in a source file
+    __slots__ = ("qualname", "lineno", "bases", "methods")
+
+    def __init__(
+        self,
+        qualname: str,
+        lineno: int,
+        bases: list[str],
+        methods: dict[str, tuple[int, str]],
+    ):
+        self.qualname = qualname  # the qualified name within the module
+        self.lineno = lineno
+        self.bases = bases  # fully qualified, but not resolved, base names
+        self.methods = methods  # name: (first line, source)
+
+
+class _ModuleRecord:
+    # the classes and imported names of a single source file
+    __slots__ = ("module", "filename", "symbols", "star_imports", "classes", "error")
+
+    def __init__(self, module: str, filename: str):
+        self.module = module
+        self.filename = filename
+        # the qualified name of every module-level name that is bound by an
+        # import or class definition
+        self.symbols: dict[str, str] = {}
+        self.star_imports: list[str] = []
+        self.classes: list[_ClassRecord] = []
+        self.error: Optional[str] = None
+
+
+def _dotted_name(node: ast.expr) -> Optional[str]:
+    # "a.b.C" for a Name or a chain of Attributes, None for anything else
+    # (e.g., calls or subscripts)
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def _import_from_module(module: str, is_package: bool, node: ast.ImportFrom) -> str:
+    # the absolute name of the module of a (possibly relative) from-import
+    if node.level == 0:
+        return node.module or ""
+    package = module.split(".") if is_package else module.split(".")[:-1]
+    if node.level > 1:
+        package = package[: -(node.level - 1)]
+    if node.module:
+        package = package + [node.module]
+    return ".".join(package)
+
+
+class _ModuleScanner:
+    # fills a _ModuleRecord from the statements of a module, following the
+    # module-level names as they are bound in order
+    def __init__(self, record: _ModuleRecord, is_package: bool, lines: list[str]):
+        self.record = record
+        self.is_package = is_package
+        self.lines = lines
+
+    def scan(self, body: list[ast.stmt]) -> None:
+        for node in body:
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.asname is None:
+                        top = alias.name.split(".")[0]
+                        self.record.symbols[top] = top
+                    else:
+                        self.record.symbols[alias.asname] = alias.name
+            elif isinstance(node, ast.ImportFrom):
+                module = _import_from_module(self.record.module, self.is_package, node)
+                for alias in node.names:
+                    if alias.name == "*":
+                        self.record.star_imports.append(module)
+                    else:
+                        name = alias.asname or alias.name
+                        self.record.symbols[name] = f"{module}.{alias.name}"
+            elif isinstance(node, ast.ClassDef):
+                self._add_class(node, "")
+                self.record.symbols[node.name] = f"{self.record.module}.{node.name}"
+            elif isinstance(node, (ast.If, ast.Try, ast.With)):
+                # conditional imports and definitions, e.g. try/except
+                # ImportError blocks
+                for block in ("body", "orelse", "finalbody"):
+                    self.scan(getattr(node, block, []))
+                for handler in getattr(node, "handlers", []):
+                    self.scan(handler.body)
+
+    def _resolve_base(self, node: ast.expr) -> Optional[str]:
+        dotted = _dotted_name(node)
+        if dotted is None:
+            return None
+        first, _, rest = dotted.partition(".")
+        if first in self.record.symbols:
+            target = self.record.symbols[first]
+        elif first in vars(builtins) and not self.record.star_imports:
+            target = f"builtins.{first}"
+        else:
+            # resolved later, through the star imports of the module
+            target = f"{self.record.module}.{first}"
+        return f"{target}.{rest}" if rest else target
+
+    def _source(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> tuple[int, str]:
+        # the first line (including decorators) and dedented source of a
+        # function, as from inspect.getsourcelines
+        first = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        last = node.end_lineno or node.lineno
+        return first, textwrap.dedent("".join(self.lines[first - 1 : last]))
+
+    def _add_class(self, node: ast.ClassDef, prefix: str) -> None:
+        qualname = f"{prefix}{node.name}"
+        bases = [self._resolve_base(base) for base in node.bases]
+        methods = {}
+        for item in node.body:
+            if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                methods[item.name] = self._source(item)
+            elif isinstance(item, ast.ClassDef):
+                self._add_class(item, f"{qualname}.")
+        lineno = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        record = _ClassRecord(
+            qualname, lineno, [b for b in bases if b is not None], methods
+        )
+        self.record.classes.append(record)
+
+
+def _scan_file(filename: str, module: str, is_package: bool) -> _ModuleRecord:
+    # parse a single source file, without importing it
+    record = _ModuleRecord(module, os.path.abspath(filename))
+    try:
+        with tokenize.open(filename) as fi:
+            source = fi.read()
+        tree = ast.parse(source, filename)
+    except (SyntaxError, UnicodeDecodeError, OSError) as err:
+        record.error = f"{type(err).__name__}: {err}"
+        return record
+    _ModuleScanner(record, is_package, source.splitlines(keepends=True)).scan(tree.body)
+    return record
+
+
+def _find_source_files(path: str) -> list[tuple[str, str, bool]]:
+    # the (filename, module name, is package) of every .py file under path,
+    # sorted by module name. If path is a package (has an __init__.py), module
+    # names start with its name, otherwise path is treated as a directory on
+    # sys.path.
+    path = os.path.abspath(path)
+    if os.path.isfile(path):
+        name = os.path.splitext(os.path.basename(path))[0]
+        return [(path, name, False)]
+    prefix: list[str] = []
+    if os.path.isfile(os.path.join(path, "__init__.py")):
+        prefix = [os.path.basename(path)]
+
+    files = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames[:] = sorted(
+            d
+            for d in dirnames
+            if d.isidentifier() and not d.startswith(".") and d != "__pycache__"
+        )
+        rel_parts = os.path.relpath(dirpath, path).split(os.sep)
+        package = prefix + [p for p in rel_parts if p != "."]
+        for fname in sorted(filenames):
+            stem, ext = os.path.splitext(fname)
+            if ext != ".py" or not (stem.isidentifier() or stem == "__init__"):
+                continue
+            if stem == "__init__":
+                module, is_package = ".".join(package), True
+            else:
+                module, is_package = ".".join(package + [stem]), False
+            if module:
+                files.append((os.path.join(dirpath, fname), module, is_package))
+    return sorted(files, key=lambda f: f[1])
+
+
+class StaticClass:
+    """
+    A class found by scan_package, without importing its module
+
+    StaticClass provides the attributes of a class that ClassGraphTree
+    needs (__name__, __bases__ and __subclasses__()), so that it can be used
+    as the baseclass of a ClassGraphTree. Classes that are subclassed in the
+    scanned files but are defined elsewhere (e.g., in another package) are
+    included without a filename or methods.
+
+    Attributes
+    ----------
+    qualname: str
+        the fully qualified name, e.g. "package.module.Class"
+    module: str
+        the module name
+    filename: str | None
+        the absolute path of the source file, None for classes that are
+        defined outside of the scanned files
+    lineno: int | None
+        the first line of the class definition
+    methods: dict[str, tuple[int, str]]
+        the first line and source of each function defined in the class body
+    """
+
+    def __init__(
+        self,
+        index: "StaticIndex",
+        qualname: str,
+        module: str,
+        filename: Optional[str] = None,
+        lineno: Optional[int] = None,
+        methods: Optional[dict[str, tuple[int, str]]] = None,
+        bases: Optional[list[str]] = None,
+    ):
+        self._index = index
+        self.qualname = qualname
+        self.__name__ = qualname.rsplit(".", 1)[-1]
+        self.module = module
+        self.filename = filename
+        self.lineno = lineno
+        if methods is None:
+            methods = {}
+        self.methods = methods
+        self._base_names = [] if bases is None else bases
+        self._mro: Optional[list["StaticClass"]] = None
+
+    def __repr__(self) -> str:
+        return f"<StaticClass '{self.qualname}'>"
+
+    @property
+    def __bases__(self) -> tuple["StaticClass", ...]:
+        return tuple(self._index.get_class(name) for name in self._base_names)
+
+    def __subclasses__(self) -> list["StaticClass"]:
+        return self._index._subclasses(self.qualname)
+
+    def mro(self) -> list["StaticClass"]:
+        """
+        the method resolution order, from the C3 linearization of the bases.
+        Classes defined outside of the scanned files have no bases.
+        """
+        if self._mro is None:
+            bases = list(self.__bases__)
+            sequences = [base.mro() for base in bases] + [bases]
+            mro = [self]
+            while True:
+                sequences = [seq for seq in sequences if seq]
+                if not sequences:
+                    break
+                for seq in sequences:
+                    head = seq[0]
+                    if not any(head in other[1:] for other in sequences):
+                        break
+                else:
+                    # an inconsistent hierarchy, fall back to depth-first
+                    head = sequences[0][0]
+                mro.append(head)
+                sequences = [
+                    [cls for cls in seq if cls is not head] for seq in sequences
+                ]
+            self._mro = mro
+        return self._mro
+
+    def find_method(self, name: str) -> Optional[tuple["StaticClass", int, str]]:
+        """
+        the class that a method is inherited from, along with the first line
+        and source of the method. None if it is not defined in any of the
+        scanned classes of the method resolution order.
+        """
+        for cls in self.mro():
+            if name in cls.methods:
+                lineno, src = cls.methods[name]
+                return cls, lineno, src
+        return None
+
+
+class StaticIndex:
+    """
+    The classes of a set of scanned source files, see scan_package
+
+    Parameters
+    ----------
+    records: Iterable
+        the per-file records of the scanned files. Each record is merged into
+        the index as it is received, e.g. from the workers of a scan.
+    """
+
+    def __init__(self, records: Iterable[_ModuleRecord]):
+        self._modules: dict[str, _ModuleRecord] = {}
+        self.errors: dict[str, str] = {}
+        self._classes: dict[str, StaticClass] = {}
+        for record in records:
+            self._add_record(record)
+
+        # resolve the base names through imports, which needs every record,
+        # and map each base to its subclasses in the order that they were found
+        self._children: dict[str, list[str]] = {}
+        for qualname, static_cls in self._classes.items():
+            resolved = []
+            for base in static_cls._base_names:
+                base = self._resolve(base)
+                if base not in resolved:
+                    resolved.append(base)
+                    self._children.setdefault(base, []).append(qualname)
+            static_cls._base_names = resolved
+        self._external: dict[str, StaticClass] = {}
+
+    def _add_record(self, record: _ModuleRecord) -> None:
+        self._modules[record.module] = record
+        if record.error is not None:
+            self.errors[record.filename] = record.error
+        for cls in record.classes:
+            qualname = f"{record.module}.{cls.qualname}"
+            self._classes[qualname] = StaticClass(
+                self,
+                qualname,
+                record.module,
+                filename=record.filename,
+                lineno=cls.lineno,
+                methods=cls.methods,
+                bases=cls.bases,
+            )
+
+    @property
+    def modules(self) -> list[str]:
+        """the names of the scanned modules"""
+        return list(self._modules.keys())
+
+    @property
+    def classes(self) -> list[str]:
+        """the qualified names of the classes defined in the scanned modules"""
+        return list(self._classes.keys())
+
+    def _resolve(self, dotted: str, _seen: Optional[set[str]] = None) -> str:
+        # the qualified name of the class that a name refers to, following
+        # imports, re-exports and star imports. Names that are not defined in
+        # the scanned modules are returned unchanged.
+        if dotted in self._classes:
+            return dotted
+        if _seen is None:
+            _seen = set()
+        if dotted in _seen:
+            return dotted
+        _seen.add(dotted)
+
+        parts = dotted.split(".")
+        for i in range(len(parts) - 1, 0, -1):
+            module = ".".join(parts[:i])
+            if module not in self._modules:
+                continue
+            record = self._modules[module]
+            name, rest = parts[i], parts[i + 1 :]
+            if name in record.symbols:
+                target = record.symbols[name]
+                return self._resolve(".".join([target] + rest), _seen)
+            for star_module in record.star_imports:
+                target = self._resolve(".".join([star_module, name] + rest), _seen)
+                if target in self._classes:
+                    return target
+            if name in vars(builtins) and not rest:
+                return f"builtins.{name}"
+            break
+        return dotted
+
+    def get_class(self, name: str) -> StaticClass:
+        """
+        a class by name
+
+        Parameters
+        ----------
+        name: str
+            the fully qualified name, e.g. "package.module.Class". Names that
+            are imported into a module (e.g. "package.Class" for a class that
+            is imported in package/__init__.py) are followed to the class.
+            Classes defined outside of the scanned modules are only found if
+            one of the scanned classes subclasses them.
+
+        Returns
+        -------
+        StaticClass
+        """
+        qualname = self._resolve(name)
+        if qualname in self._classes:
+            return self._classes[qualname]
+        if qualname not in self._external:
+            if qualname not in self._children:
+                raise KeyError(f"{name} is not a class in the scanned modules")
+            module = qualname.rsplit(".", 1)[0] if "." in qualname else ""
+            self._external[qualname] = StaticClass(self, qualname, module)
+        return self._external[qualname]
+
+    def _subclasses(self, qualname: str) -> list[StaticClass]:
+        return [self._classes[child] for child in self._children.get(qualname, [])]
+
+
+def _scan_files(
+    source_files: list[tuple[str, str, bool]],
+    n_workers: Optional[int] = None,
+    executor: Optional[concurrent.futures.Executor] = None,
+) -> Iterator[_ModuleRecord]:
+    # the record of each source file, in order, parsing the files in parallel
+    # when n_workers > 1 or an executor is supplied
+    serial = executor is None and (n_workers is None or n_workers <= 1)
+    if serial or len(source_files) < 2:
+        for filename, module, is_package in source_files:
+            yield _scan_file(filename, module, is_package)
+        return
+
+    # a few chunks per worker: large enough to amortize the transfer of the
+    # records, small enough to balance files of different sizes
+    n_chunks = 4 * (n_workers or os.cpu_count() or 1)
+    chunksize = max(len(source_files) // n_chunks, 1)
+    args = list(zip(*source_files))
+    if executor is not None:
+        yield from executor.map(_scan_file, *args, chunksize=chunksize)
+        return
+    with concurrent.futures.ProcessPoolExecutor(n_workers) as pool:
+        yield from pool.map(_scan_file, *args, chunksize=chunksize)
+
+
+def scan_package(
+    path: str,
+    n_workers: Optional[int] = None,
+    executor: Optional[concurrent.futures.Executor] = None,
+) -> StaticIndex:
+    """
+    find the classes of a package from its source files, without importing it
+
+    Every .py file under path is parsed, and the base classes of each class
+    definition are resolved through the import statements of its module. Use
+    StaticIndex.get_class to select the baseclass of a ClassGraphTree:
+
+        index = scan_package("path/to/package")
+        cgt = ClassGraphTree(index.get_class("package.module.Base"), "method")
+
+    Only module-level imports and classes (including those in if/try blocks
+    and nested classes) are found. Bases that are not simple names, such as
+    calls, are skipped, and subclasses are ordered by module name and then
+    by definition rather than by creation as with a live hierarchy.
+
+    Parameters
+    ----------
+    path: str
+        a package directory (containing an __init__.py), a directory of
+        modules and packages (as on sys.path) or a single .py file
+    n_workers: int
+        (optional) the number of worker processes that parse the files. If
+        None or 1 (the default), the files are parsed serially. The records
+        of each file are merged into the index as they are returned, and the
+        index is the same for any number of workers.
+    executor: concurrent.futures.Executor
+        (optional) an existing executor to parse the files with.
+
+    Returns
+    -------
+    StaticIndex
+        the index of the classes. Files that can not be parsed are skipped
+        and listed in StaticIndex.errors.
+    """
+    source_files = _find_source_files(path)
+    return StaticIndex(_scan_files(source_files, n_workers, executor))
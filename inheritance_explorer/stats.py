@@ -0,0 +1,253 @@
+"""Per-phase timing and profiling of ClassGraphTree builds."""
+
+import contextlib
+import cProfile
+import functools
+import json
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Iterator, Optional, TypeVar, cast
+
+
+class PhaseStats:
+    """
+    The totals of a single phase
+
+    Attributes
+    ----------
+    calls: int
+        the number of times the phase was run
+    wall_time: float
+        the total wall time of the phase in seconds
+    peak_memory: int | None
+        the largest peak of memory traced by tracemalloc while the phase was
+        running, in bytes. None unless the BuildStats trace memory.
+    """
+
+    __slots__ = ("calls", "wall_time", "peak_memory")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.wall_time = 0.0
+        self.peak_memory: Optional[int] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "wall_time": self.wall_time,
+            "peak_memory": self.peak_memory,
+        }
+
+
+class _ActivePhase:
+    # a phase that is running in the current thread
+    __slots__ = ("name", "t0", "peak_memory")
+
+    def __init__(self, name: str, t0: float, peak_memory: int):
+        self.name = name
+        self.t0 = t0
+        self.peak_memory = peak_memory
+
+
+def _max_rss() -> Optional[int]:
+    # the peak resident set size of the process in bytes, None if unavailable
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return int(max_rss if sys.platform == "darwin" else max_rss * 1024)
+
+
+class BuildStats:
+    """
+    Wall time, call counts and memory of the phases of ClassGraphTree builds
+
+    A ClassGraphTree records its phases in its stats attribute:
+
+    "traversal": walking the class hierarchy (including "source")
+    "source": extracting the source of funcname overrides with inspect
+    "similarity": computing the similarity matrix
+    "graph": building the pydot graph or writing the DOT source (write_dot)
+    "interactive_graph": building the pyvis graph or writing the vis.js graph
+    (write_interactive_graph)
+    "render": rendering the graph with graphviz
+
+    Pass the same BuildStats to several trees to total their phases.
+
+    Parameters
+    ----------
+    profile: bool
+        (optional) if True, run cProfile while any phase is running in the
+        thread that created the BuildStats. Default False.
+    trace_memory: bool
+        (optional) if True, record the peak memory of each phase with
+        tracemalloc, which is started if needed (and slows python code
+        considerably). Only phases that run in the thread that created the
+        BuildStats are traced. Default False.
+    """
+
+    def __init__(self, profile: bool = False, trace_memory: bool = False):
+        self.phases: dict[str, PhaseStats] = {}
+        self.profiler: Optional[cProfile.Profile] = None
+        if profile:
+            self.profiler = cProfile.Profile()
+        self.trace_memory = trace_memory
+        self._thread = threading.get_ident()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._started_tracemalloc = False
+
+    def _stack(self) -> list[_ActivePhase]:
+        # the running phases of the current thread, innermost last
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        stack: list[_ActivePhase] = self._local.stack
+        return stack
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        record the wall time (and optionally the memory and profile) of a
+        phase. Phases may be nested, and the time of a nested phase is also
+        counted by the phases that contain it.
+
+        Parameters
+        ----------
+        name: str
+            the phase name
+        """
+        stack = self._stack()
+        instrument = threading.get_ident() == self._thread
+        outermost = len(stack) == 0
+        if instrument and outermost:
+            self._start_instruments()
+
+        peak_memory = 0
+        if instrument and self.trace_memory:
+            # record the peak of the enclosing phase so far, then start a new
+            # peak for this phase
+            peak_memory, enclosing_peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak_memory = max(stack[-1].peak_memory, enclosing_peak)
+            tracemalloc.reset_peak()
+        active = _ActivePhase(name, time.perf_counter(), peak_memory)
+        stack.append(active)
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - active.t0
+            stack.pop()
+            phase_peak = None
+            if instrument and self.trace_memory:
+                phase_peak = max(active.peak_memory, tracemalloc.get_traced_memory()[1])
+                if stack:
+                    stack[-1].peak_memory = max(stack[-1].peak_memory, phase_peak)
+            if instrument and outermost:
+                self._stop_instruments()
+
+            with self._lock:
+                phase_stats = self.phases.setdefault(name, PhaseStats())
+                phase_stats.calls += 1
+                phase_stats.wall_time += wall_time
+                if phase_peak is not None:
+                    phase_stats.peak_memory = max(
+                        phase_stats.peak_memory or 0, phase_peak
+                    )
+
+    def _start_instruments(self) -> None:
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def _stop_instruments(self) -> None:
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def profile_stats(self, n_functions: int = 25) -> list[dict[str, Any]]:
+        """
+        the functions with the largest cumulative time in the profile
+
+        Parameters
+        ----------
+        n_functions: int
+            (optional) the number of functions to return. Default is 25.
+
+        Returns
+        -------
+        list[dict]
+            the "function" ("file:line(name)"), "calls", "total_time" and
+            "cumulative_time" of each function, empty if not profiling.
+        """
+        if self.profiler is None:
+            return []
+        stats = pstats.Stats(self.profiler).stats  # type: ignore[attr-defined]
+        functions = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+        result = []
+        for (filename, lineno, name), timings in functions[:n_functions]:
+            _, ncalls, total_time, cumulative_time, _ = timings
+            result.append(
+                {
+                    "function": f"{filename}:{lineno}({name})",
+                    "calls": ncalls,
+                    "total_time": total_time,
+                    "cumulative_time": cumulative_time,
+                }
+            )
+        return result
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        the phases, the peak resident memory of the process ("max_rss", in
+        bytes) and, if profiling, the functions of profile_stats
+        """
+        with self._lock:
+            phases = {name: p.to_dict() for name, p in self.phases.items()}
+        result: dict[str, Any] = {"phases": phases, "max_rss": _max_rss()}
+        if self.profiler is not None:
+            result["profile"] = self.profile_stats()
+        return result
+
+    def to_json(self, filename: Optional[str] = None) -> str:
+        """
+        the stats as a JSON string, see to_dict
+
+        Parameters
+        ----------
+        filename: str
+            (optional) a file to also write the JSON to
+
+        Returns
+        -------
+        str
+        """
+        result = json.dumps(self.to_dict(), indent=2)
+        if filename is not None:
+            with open(filename, "w") as fi:
+                fi.write(result)
+        return result
+
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+def _timed_phase(name: str) -> Callable[[_F], _F]:
+    # decorate a method of an object with a stats attribute to record a phase
+    def decorator(method: _F) -> _F:
+        @functools.wraps(method)
+        def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            with self.stats.phase(name):
+                return method(self, *args, **kwargs)
+
+        return cast(_F, wrapper)
+
+    return decorator
@@ -0,0 +1,211 @@
+import importlib
+import os
+import sys
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from inheritance_explorer import cli
+from inheritance_explorer._testing import ClassForTesting, make_hierarchy
+from inheritance_explorer.cache import TreeCache
+from inheritance_explorer.inheritance_explorer import ClassGraphTree
+
+
+def _assert_same_tree(cgt: ClassGraphTree, cgt_cached: ClassGraphTree) -> None:
+    assert cgt_cached.basename == cgt.basename
+    assert cgt_cached.funcname == cgt.funcname
+    for node, cached_node in zip(cgt._node_list, cgt_cached._node_list):
+        assert cached_node.child is None
+        assert cached_node.child_name == node.child_name
+        assert cached_node.child_id == node.child_id
+        assert cached_node.parent_ids == node.parent_ids
+        assert cached_node.parent_name == node.parent_name
+        assert cached_node.color == node.color
+    assert len(cgt_cached._node_list) == len(cgt._node_list)
+    assert cgt_cached._node_map == cgt._node_map
+    assert cgt_cached._node_map_r == cgt._node_map_r
+    assert cgt_cached._override_src == cgt._override_src
+    assert cgt_cached._override_src_files == cgt._override_src_files
+    assert cgt_cached.similarity_sets == cgt.similarity_sets
+    for name in ("matrix", "axis", "axis_names"):
+        expected = cgt.similarity_results[name]
+        cached = cgt_cached.similarity_results[name]
+        if hasattr(expected, "toarray"):
+            # a scipy.sparse matrix
+            expected, cached = expected.toarray(), cached.toarray()
+        assert np.array_equal(cached, expected)
+    assert cgt_cached.graph().to_string() == cgt.graph().to_string()
+
+
+def test_cache_round_trip(tmp_path):
+    cache = TreeCache(str(tmp_path))
+    key = cache.key("inheritance_explorer._testing.ClassForTesting")
+    assert cache.load(key) is None
+
+    cgt = ClassGraphTree(ClassForTesting, "use_this_func", similarity_cutoff=0.5)
+    cache.store(key, cgt)
+    assert cache.size > 0
+    cgt_cached = cache.load(key)
+    assert isinstance(cgt_cached, ClassGraphTree)
+    assert cgt_cached.baseclass is None
+    _assert_same_tree(cgt, cgt_cached)
+    _ = cgt_cached.build_interactive_graph()
+
+    cache.clear()
+    assert cache.load(key) is None
+    assert cache.size == 0
+
+
+def test_cache_key():
+    key = TreeCache.key("a.B", funcname="f")
+    assert key == TreeCache.key("a.B", funcname="f")
+    assert key != TreeCache.key("a.B", funcname="g")
+    assert key != TreeCache.key("a.C", funcname="f")
+    assert key != TreeCache.key("a.B", funcname="f", import_list=["c"])
+
+
+def test_cache_invalidation(tmp_path, monkeypatch, request):
+    src_dir = tmp_path / "src"
+    src_dir.mkdir()
+    src_file = src_dir / "cached_mod.py"
+    src_file.write_text(
+        "class A:\n    def f(self):\n        pass\n\n"
+        "class B(A):\n    def f(self):\n        return 1\n"
+    )
+    monkeypatch.syspath_prepend(str(src_dir))
+    mod = importlib.import_module("cached_mod")
+    request.addfinalizer(lambda: sys.modules.pop("cached_mod", None))
+
+    cache = TreeCache(str(tmp_path / "cache"))
+    key = cache.key("cached_mod.A", funcname="f")
+    cache.store(key, ClassGraphTree(mod.A, funcname="f"))
+    assert cache.load(key) is not None
+
+    # a changed source file invalidates (and removes) the entry
+    stat = os.stat(src_file)
+    os.utime(src_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.load(key) is None
+    assert cache.size == 0
+
+
+def test_cache_eviction(tmp_path):
+    cache = TreeCache(str(tmp_path))
+    cgt = ClassGraphTree(ClassForTesting, "use_this_func")
+    cache.store("first", cgt)
+    entry_size = cache.size
+
+    # only room for a single entry: the least recently used is removed
+    cache.max_size = int(entry_size * 1.5)
+    cache.store("second", cgt)
+    assert cache.load("first") is None
+    assert cache.load("second") is not None
+
+
+def test_cli_cache(tmp_path, monkeypatch):
+    runner = CliRunner()
+    cache_dir = str(tmp_path / "cache")
+    outfile = str(tmp_path / "test.raw")
+    args = [
+        "inheritance_explorer._testing.ClassForTesting",
+        outfile,
+        "--funcname",
+        "use_this_func",
+        "--cache_dir",
+        cache_dir,
+    ]
+    result = runner.invoke(cli.map_class, args)
+    assert result.exit_code == 0
+    with open(outfile) as fi:
+        expected = fi.read()
+    assert TreeCache(cache_dir).size > 0
+
+    # the second run is a cache hit and does not rebuild the tree
+    os.remove(outfile)
+
+    def _build_tree(*args, **kwargs):
+        raise RuntimeError("rebuilt the tree")
+
+    monkeypatch.setattr(cli, "_build_tree", _build_tree)
+    result = runner.invoke(cli.map_class, args)
+    assert result.exit_code == 0
+    with open(outfile) as fi:
+        assert fi.read() == expected
+
+    # --no-cache always rebuilds
+    result = runner.invoke(cli.map_class, args + ["--no-cache"])
+    assert isinstance(result.exception, RuntimeError)
+
+
+@pytest.mark.parametrize("mmap", (True, False))
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"similarity_cutoff": 0.5},
+        {"similarity_cutoff": 0.5, "sparse_similarity": True},
+        {"similarity_dtype": "float32", "traversal": "tree"},
+    ],
+)
+def test_snapshot_round_trip(tmp_path, kwargs, mmap):
+    if kwargs.get("sparse_similarity"):
+        pytest.importorskip("scipy")
+    cgt = ClassGraphTree(ClassForTesting, "use_this_func", **kwargs)
+    filename = str(tmp_path / "tree.npz")
+    cgt.to_snapshot(filename)
+    cgt_loaded = ClassGraphTree.from_snapshot(filename, mmap=mmap)
+    assert cgt_loaded.baseclass is None
+    _assert_same_tree(cgt, cgt_loaded)
+    assert cgt_loaded.similarity_dtype == cgt.similarity_dtype
+    assert isinstance(cgt_loaded._node_list.parent_id.base, np.memmap) == mmap
+    _ = cgt_loaded.build_interactive_graph()
+
+
+def test_snapshot_dag(tmp_path):
+    base = make_hierarchy(300, depth=6, branching=3, diamond_rate=0.1)
+    cgt = ClassGraphTree(base, "method", max_recursion_level=6)
+    assert cgt._node_list.extra_parent_ids
+    filename = str(tmp_path / "tree.npz")
+    cgt.to_snapshot(filename)
+    cgt_loaded = ClassGraphTree.from_snapshot(filename)
+    _assert_same_tree(cgt, cgt_loaded)
+    assert np.array_equal(cgt_loaded._node_list.depth, cgt._node_list.depth)
+    assert isinstance(cgt_loaded.similarity_results["matrix"], np.memmap)
+
+    never = ClassGraphTree(base, "method", compute_similarity="never")
+    never.to_snapshot(filename)
+    never_loaded = ClassGraphTree.from_snapshot(filename)
+    assert never_loaded.similarity_sets == {}
+    with pytest.raises(RuntimeError, match="not available"):
+        _ = never_loaded.similarity_results
+
+    np.savez(filename, meta=np.frombuffer(b'{"format": 0}', dtype=np.uint8))
+    with pytest.raises(ValueError, match="not a snapshot"):
+        ClassGraphTree.from_snapshot(filename)
+
+
+def test_snapshot_funcnames(tmp_path):
+    class Base:
+        def first(self, a):
+            return a
+
+        def second(self, a):
+            return a + 1
+
+    class Child(Base):
+        def first(self, a):
+            return a * 2
+
+    class GrandChild(Child):
+        def second(self, a):
+            return a * 3
+
+    cgt = ClassGraphTree(Base, funcnames=["first", "second"], similarity_cutoff=0.0)
+    filename = str(tmp_path / "tree.npz")
+    cgt.to_snapshot(filename)
+    cgt_loaded = ClassGraphTree.from_snapshot(filename)
+    assert cgt_loaded.funcnames == cgt.funcnames
+    _assert_same_tree(cgt, cgt_loaded)
+    cgt.select_funcname("second")
+    cgt_loaded.select_funcname("second")
+    _assert_same_tree(cgt, cgt_loaded)
+    _assert_same_tree(cgt, ClassGraphTree._from_state(cgt._get_state()))
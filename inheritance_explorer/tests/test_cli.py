@@ -1,9 +1,18 @@
+import json
 import os
+from typing import Any
 
 import pytest
 from click.testing import CliRunner
 
-from inheritance_explorer.cli import map_class
+from inheritance_explorer import cli
+from inheritance_explorer.cli import map_batch, map_class
+
+
+@pytest.fixture(autouse=True)
+def _cache_dir(tmp_path, monkeypatch):
+    # keep cached results out of the user cache directory
+    monkeypatch.setenv("INHERITANCE_EXPLORER_CACHE_DIR", str(tmp_path / "cache"))
 
 
 @pytest.mark.parametrize(
@@ -35,8 +44,120 @@ def test_map_class_no_format(tmp_path):
     assert os.path.isfile(outfile)
 
 
+def test_map_class_dot(tmp_path):
+    # DOT output is written without graphviz
+    runner = CliRunner()
+    module_class = "inheritance_explorer._testing.ClassForTesting"
+    args = ["--funcname", "use_this_func", "--no-cache"]
+    outfile = str(tmp_path / "test.gv")
+    result = runner.invoke(map_class, [module_class, outfile] + args)
+    assert result.exit_code == 0
+    with open(outfile) as fi:
+        dot_source = fi.read()
+    assert dot_source.startswith("digraph test_graph {")
+    assert '[label="ClassForTesting4"' in dot_source
+
+    # or to stdout, with the profile on stderr
+    result = runner.invoke(map_class, [module_class, "-", "--profile"] + args)
+    assert result.exit_code == 0
+    assert result.stdout == dot_source
+    assert "traversal" in json.loads(result.stderr)["phases"]
+
+
 def test_map_class_bad():
     runner = CliRunner()
     arg_list = ["numpy.float64", "whatever.png", "--funcname", "notafunc"]
     result = runner.invoke(map_class, arg_list, catch_exceptions=True)
     assert isinstance(result.exception, AttributeError)
+
+
+_manifest_toml = """
+[defaults]
+funcname = "use_this_func"
+
+[[graphs]]
+module_class = "inheritance_explorer._testing.ClassForTesting"
+output_file = "first.raw"
+
+[[graphs]]
+module_class = "inheritance_explorer._testing.ClassForTesting"
+output_file = "second.dot"
+output_format = "raw"
+import_list = "collections, numpy"
+"""
+
+_manifest_json = {
+    "defaults": {"funcname": "use_this_func"},
+    "graphs": [
+        {
+            "module_class": "inheritance_explorer._testing.ClassForTesting",
+            "output_file": "first.raw",
+        },
+        {
+            "module_class": "inheritance_explorer._testing.ClassForTesting",
+            "output_file": "second.dot",
+            "output_format": "raw",
+            "import_list": ["collections", "numpy"],
+        },
+    ],
+}
+
+
+@pytest.mark.parametrize("manifest_format", ("toml", "json"))
+def test_map_batch(tmp_path, monkeypatch, manifest_format):
+    manifest = tmp_path / f"graphs.{manifest_format}"
+    if manifest_format == "toml":
+        manifest.write_text(_manifest_toml)
+    else:
+        manifest.write_text(json.dumps(_manifest_json))
+
+    built_kwargs = []
+    build_tree = cli._build_tree
+
+    def _build_tree(*args, **kwargs):
+        built_kwargs.append(kwargs)
+        return build_tree(*args, **kwargs)
+
+    monkeypatch.setattr(cli, "_build_tree", _build_tree)
+    runner = CliRunner()
+    result = runner.invoke(map_batch, [str(manifest), "--n_render", "2", "--no-cache"])
+    assert result.exit_code == 0
+    with open(tmp_path / "first.raw") as fi:
+        first = fi.read()
+    with open(tmp_path / "second.dot") as fi:
+        assert fi.read() == first
+
+    # the parsed sources are shared between the trees
+    fingerprints = [
+        kw["similarity_container_kwargs"]["fingerprints"] for kw in built_kwargs
+    ]
+    assert len(fingerprints) == 2
+    assert fingerprints[0] is fingerprints[1]
+    assert len(fingerprints[0]) > 0
+
+
+def test_map_batch_errors(tmp_path):
+    manifest = tmp_path / "graphs.json"
+    graphs: list[Any] = list(_manifest_json["graphs"]) + [
+        {"module_class": "numpy.float64", "output_file": "bad.raw"}
+    ]
+    manifest.write_text(
+        json.dumps({"defaults": {"funcname": "use_this_func"}, "graphs": graphs})
+    )
+    runner = CliRunner()
+    result = runner.invoke(map_batch, [str(manifest)])
+    assert result.exit_code == 1
+    assert "numpy.float64" in result.output
+    assert "1 of 3 graphs failed" in result.output
+    assert os.path.isfile(tmp_path / "first.raw")
+
+    manifest.write_text(
+        json.dumps({"graphs": [{"module_class": "a.B", "output": "x"}]})
+    )
+    result = runner.invoke(map_batch, [str(manifest)])
+    assert isinstance(result.exception, ValueError)
+
+    manifest = tmp_path / "graphs.yaml"
+    manifest.write_text("")
+    result = runner.invoke(map_batch, [str(manifest)])
+    assert isinstance(result.exception, ValueError)
@@ -0,0 +1,48 @@
+import json
+import subprocess
+import sys
+
+import numpy as np
+from matplotlib.colors import rgb2hex
+
+from inheritance_explorer.inheritance_explorer import _rgb_to_hex
+
+# generous, to allow for slow CI machines: the slow imports that this guards
+# against take about a second
+_import_budget = 0.5
+
+_import_script = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+dt = time.perf_counter() - t0
+slow = ("matplotlib", "pyvis", "networkx", "pydot", "IPython")
+print(json.dumps([dt, sorted(m for m in slow if m in sys.modules)]))
+"""
+
+
+def _time_import(module: str) -> tuple[float, list[str]]:
+    # import in a fresh interpreter, so that nothing is already imported
+    script = _import_script.format(module=module)
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, check=True, text=True
+    ).stdout
+    dt, loaded = json.loads(output)
+    return dt, loaded
+
+
+def test_import_time():
+    for module in ("inheritance_explorer", "inheritance_explorer.cli"):
+        # the best of a few runs, to reduce the noise of a busy machine
+        timings = []
+        for _ in range(3):
+            dt, loaded = _time_import(module)
+            assert loaded == []
+            timings.append(dt)
+        assert min(timings) < _import_budget
+
+
+def test_rgb_to_hex():
+    for rgb in np.random.default_rng(0).random((100, 3)):
+        rgb = tuple(float(v) for v in rgb)
+        assert _rgb_to_hex(rgb) == rgb2hex(rgb)
@@ -1,14 +1,19 @@
 import collections
+import functools
+import importlib
+import inspect
+import io
+import json
+import sys
+from typing import Any, Callable, Optional
 
+import numpy as np
 import pydot
 import pytest
 
-from inheritance_explorer._testing import ClassForTesting
-from inheritance_explorer.inheritance_explorer import (
-    ClassGraphTree,
-    _ChildNode,
-    _validate_color,
-)
+from inheritance_explorer._node_table import _ChildNode, _NodeTable
+from inheritance_explorer._testing import ClassForTesting, make_hierarchy
+from inheritance_explorer.inheritance_explorer import ClassGraphTree, _validate_color
 
 
 @pytest.fixture()
@@ -17,10 +22,37 @@ def cgt():
 
 
 def test_child():
-    child_class = _ChildNode
-    node = _ChildNode(child_class, 1)
+    table = _NodeTable(capacity=1)
+    assert table.append(_ChildNode, "_ChildNode") == 1
+    node = table[0]
+    assert isinstance(node, _ChildNode)
     assert isinstance(node.child_id, str)
     assert node.parent_id is None
+    assert node.parent_ids == []
+    assert node.child is _ChildNode
+
+    # the table grows as nodes are added, and names and colors are interned
+    for i in range(2, 10):
+        table.append(None, "Child", parent_id=1, depth=1, color="#ff0000")
+    table.add_parent(9, 5)
+    assert len(table) == 9
+    assert table.names == ["_ChildNode", "Child"]
+    assert table.colors == ["#000000", "#ff0000"]
+    assert table.name_index == {"_ChildNode": 1, "Child": 9}
+    assert table.parent_id.tolist() == [0] + [1] * 8
+    assert table.depth.tolist() == [0] + [1] * 8
+    node = table[-1]
+    assert node.parent_ids == ["1", "5"]
+    assert node.parent_name == "_ChildNode"
+    assert node.color == "#ff0000"
+    assert [n.child_id for n in table][7:] == ["8", "9"]
+    assert list(table.rows())[-1] == (9, "Child", "#ff0000", [1, 5])
+    assert [table.row(node_id) for node_id in range(1, 10)] == list(table.rows())
+
+    restored = _NodeTable._from_state(table._get_state())
+    assert list(restored.rows()) == list(table.rows())
+    assert restored.name_index == table.name_index
+    assert restored[0].child is None
 
 
 def test_class_graph(cgt):
@@ -43,6 +75,53 @@ def test_class_graph(cgt):
     _ = cgt.graph(ratio="fill", size="16,10!")
 
 
+def _dot_elements(dot: pydot.Dot) -> tuple[list[Any], list[Any]]:
+    # the nodes and edges of a pydot graph, with unquoted names and values
+    def _unquote(value: Any) -> str:
+        return str(value).strip('"')
+
+    def _attributes(element: Any) -> tuple[Any, ...]:
+        return tuple(
+            sorted((k, _unquote(v)) for k, v in element.get_attributes().items())
+        )
+
+    nodes = sorted(
+        (_unquote(node.get_name()), _attributes(node)) for node in dot.get_nodes()
+    )
+    edges = sorted(
+        (
+            _unquote(edge.get_source()),
+            _unquote(edge.get_destination()),
+            _attributes(edge),
+        )
+        for edge in dot.get_edges()
+    )
+    return nodes, edges
+
+
+@pytest.mark.parametrize("include_similarity", (True, False))
+@pytest.mark.parametrize("graph_type", ("digraph", "graph"))
+def test_write_dot(cgt, tmp_path, include_similarity, graph_type):
+    kwargs = {"graph_type": graph_type, "ratio": "fill", "size": "16,10!"}
+    dot_file = str(tmp_path / "graph.dot")
+    cgt.write_dot(dot_file, include_similarity=include_similarity, **kwargs)
+    graphs = pydot.graph_from_dot_file(dot_file)
+    assert graphs is not None
+    written = graphs[0]
+    expected = cgt.graph(include_similarity=include_similarity, **kwargs)
+    assert written.get_type() == graph_type
+    assert written.get_attributes() == {"ratio": '"fill"', "size": '"16,10!"'}
+    assert _dot_elements(written) == _dot_elements(expected)
+
+    buffer = io.StringIO()
+    cgt.write_dot(buffer, include_similarity=include_similarity, **kwargs)
+    with open(dot_file) as fi:
+        assert buffer.getvalue() == fi.read()
+
+    with pytest.raises(ValueError, match="unexpected value, graph_type"):
+        cgt.write_dot(buffer, graph_type="not_a_graph_type")
+
+
 def test_class_graph_no_function():
     cgt = ClassGraphTree(ClassForTesting)
     assert cgt._node_list[1].parent_id == "1"
@@ -135,6 +214,193 @@ def test_interactive_styles(cgt):
     )
 
 
+def _from_nx_network(
+    cgt: ClassGraphTree,
+    node_style: dict[str, Any],
+    edge_style: dict[str, Any],
+    sim_style: dict[str, Any],
+) -> Any:
+    # the interactive graph built through networkx and pyvis.Network.from_nx
+    import networkx as nx
+    from pyvis.network import Network
+
+    grey = _validate_color(None, (0.7, 0.7, 0.7))
+    override_color = _validate_color(None, (0.5, 0.5, 1.0))
+    sim_color = _validate_color(None, (0, 0.5, 1.0))
+    graph = nx.Graph()
+    for node in cgt._node_list:
+        color = grey if node.color == "#000000" else override_color
+        names = [cgt._node_map[int(pid)] for pid in node.parent_ids]
+        title = f"{node.child_name}({', '.join(names)})" if names else node.child_name
+        graph.add_node(node.child_id, title=title, **{"color": color, **node_style})
+    for node in cgt._node_list:
+        for similar_id in cgt.similarity_sets.get(node._child_id, ()):
+            graph.add_edge(
+                node.child_id,
+                str(similar_id),
+                color=sim_color,
+                physics=False,
+                **sim_style,
+            )
+        for parent_id in node.parent_ids:
+            graph.add_edge(
+                node.child_id,
+                parent_id,
+                color=grey,
+                physics=True,
+                arrows={"from": {"enabled": True}},
+                **edge_style,
+            )
+    network = Network(notebook=True, font_color="#000000")
+    network.from_nx(graph)
+    return network
+
+
+@pytest.mark.parametrize(
+    "node_style,edge_style,sim_style",
+    [({}, {}, {}), ({"size": 20.0}, {"weight": 5}, {"width": 3})],
+)
+def test_interactive_matches_from_nx(cgt, node_style, edge_style, sim_style):
+    network = cgt.build_interactive_graph(
+        node_style=node_style,
+        edge_style=edge_style,
+        similarity_edge_style=sim_style,
+    )
+    expected = _from_nx_network(cgt, node_style, edge_style, sim_style)
+    assert network.node_map == expected.node_map
+    assert network.node_ids == expected.node_ids
+
+    def _edges(edges: list[dict[str, Any]]) -> dict[Any, dict[str, Any]]:
+        return {
+            (edge["from"], edge["to"]): {
+                k: v for k, v in edge.items() if k not in ("from", "to")
+            }
+            for edge in edges
+        }
+
+    assert len(network.edges) == len(expected.edges)
+    assert _edges(network.edges) == _edges(expected.edges)
+
+
+def test_interactive_matches_from_nx_dag():
+    base = make_hierarchy(200, depth=4, branching=4, diamond_rate=0.2)
+    cgt = ClassGraphTree(base, "method", max_recursion_level=4)
+    assert cgt._node_list.extra_parent_ids
+    network = cgt.build_interactive_graph()
+    expected = _from_nx_network(cgt, {}, {}, {})
+    assert network.node_map == expected.node_map
+    assert len(network.edges) == len(expected.edges)
+    assert {frozenset((e["from"], e["to"])) for e in network.edges} == {
+        frozenset((e["from"], e["to"])) for e in expected.edges
+    }
+    # from_nx orders the endpoints of an edge by when networkx first saw them,
+    # so only the edges of build_interactive_graph always start at the parent
+    for edge in network.edges:
+        if "arrows" in edge:
+            assert edge["from"] in cgt._node_list[int(edge["to"]) - 1].parent_ids
+
+
+def test_write_interactive_graph(cgt, tmp_path):
+    network = cgt.build_interactive_graph()
+    json_file = str(tmp_path / "graph.json")
+    cgt.write_interactive_graph(json_file, options={"physics": {"enabled": False}})
+    with open(json_file) as fi:
+        graph = json.load(fi)
+    assert graph["nodes"] == network.nodes
+    assert graph["edges"] == network.edges
+    assert graph["options"]["physics"]["enabled"] is False
+    assert graph["options"]["edges"] == json.loads(network.options.to_json())["edges"]
+
+    html_file = str(tmp_path / "graph.html")
+    cgt.write_interactive_graph(html_file, heading="<ClassForTesting>")
+    with open(html_file) as fi:
+        page = fi.read()
+    assert "new vis.Network(" in page
+    assert "&lt;ClassForTesting&gt;" in page
+    assert "cdnjs" not in page
+
+    output = io.StringIO()
+    cgt.write_interactive_graph(output, cdn_resources="remote")
+    assert "cdnjs" in output.getvalue()
+
+    with pytest.raises(ValueError, match="unexpected value"):
+        cgt.write_interactive_graph(io.StringIO(), cdn_resources="local")
+    with pytest.raises(ValueError, match="unexpected value"):
+        cgt.write_interactive_graph(io.StringIO(), output_format="svg")
+
+
+@pytest.mark.parametrize("lod_levels", (1, 2, 10))
+def test_write_interactive_graph_lod(tmp_path, lod_levels):
+    base = make_hierarchy(300, depth=6, branching=3, diamond_rate=0.1)
+    cgt = ClassGraphTree(base, "method", max_recursion_level=6)
+    table = cgt._node_list
+    output = io.StringIO()
+    cgt.write_interactive_graph(output, output_format="json", lod_levels=lod_levels)
+    graph = json.loads(output.getvalue())
+
+    visible = [graph] + list(graph["chunks"].values())
+    node_ids = [node["id"] for chunk in visible for node in chunk["nodes"]]
+    collapsed = [node_id for node_id in node_ids if node_id.startswith("+")]
+    node_ids = [node_id for node_id in node_ids if not node_id.startswith("+")]
+    # every class is in a single chunk, and every chunk has a collapsed node
+    assert sorted(node_ids, key=int) == [str(i) for i in range(1, len(table) + 1)]
+    assert sorted(collapsed) == sorted(f"+{root}" for root in graph["chunks"])
+    first_levels = [node["id"] for node in graph["nodes"] if node["id"] in node_ids]
+    assert {table[int(i) - 1].depth for i in first_levels} == set(
+        range(min(lod_levels, table.depth.max() + 1))
+    )
+    for root, chunk in graph["chunks"].items():
+        descendants = [n for n in chunk["nodes"] if not n["id"].startswith("+")]
+        depths = {table[int(n["id"]) - 1].depth for n in descendants}
+        assert min(depths) == table[int(root) - 1].depth + 1
+        assert max(depths) - min(depths) < lod_levels
+
+    # the chunks include every edge of the full graph once
+    full = io.StringIO()
+    cgt.write_interactive_graph(full, output_format="json")
+    edges = [edge for chunk in visible for edge in chunk["edges"]]
+    assert sorted(
+        (e["from"], e["to"]) for e in edges if not e["to"].startswith("+")
+    ) == sorted((e["from"], e["to"]) for e in json.loads(full.getvalue())["edges"])
+
+    # the descendants of the collapsed nodes, following the first parents
+    n_descendants: collections.Counter[int] = collections.Counter()
+    for node in table:
+        parent_id = node._parent_id
+        while parent_id:
+            n_descendants[parent_id] += 1
+            parent_id = table[parent_id - 1]._parent_id
+    for node in graph["nodes"]:
+        if node["id"].startswith("+"):
+            expected = n_descendants[int(node["id"][1:])]
+            assert node["label"] == f"{expected} descendants"
+
+
+def test_write_interactive_graph_lod_files(cgt, tmp_path):
+    html_file = tmp_path / "graph.html"
+    chunk_dir = tmp_path / "chunks"
+    cgt.write_interactive_graph(str(html_file), lod_levels=1, chunk_dir=str(chunk_dir))
+    page = html_file.read_text()
+    assert 'var chunkUrl = "chunks/";' in page
+    assert 'type="application/json"' not in page
+    assert "var topEdges" in page
+    with open(chunk_dir / "1.json") as fi:
+        chunk = json.load(fi)
+    children = {node.child_id for node in cgt._node_list if node._parent_id == 1}
+    grandchildren = {node.parent_id for node in cgt._node_list if node.depth == 2}
+    assert {node["id"] for node in chunk["nodes"]} == children | {
+        f"+{node_id}" for node_id in grandchildren
+    }
+
+    output = io.StringIO()
+    cgt.write_interactive_graph(output, lod_levels=1)
+    assert '<script type="application/json" id="chunk-1">' in output.getvalue()
+    assert "var chunkUrl = null;" in output.getvalue()
+
+    with pytest.raises(ValueError, match="lod_levels"):
+        cgt.write_interactive_graph(io.StringIO(), lod_levels=0)
+
+
 @pytest.mark.parametrize("max_recursion_level", (0, 1))
 def test_recursion_level(max_recursion_level):
     cgt = ClassGraphTree(
@@ -216,3 +482,710 @@ def test_validate_color(input_clr, expected):
 def test_validate_color_invalid():
     with pytest.raises(TypeError, match="clr has unexpected type"):
         _validate_color(100, (1.0, 1.0, 1.0))
+
+
+def test_parallel_similarity(cgt):
+    cgt_par = ClassGraphTree(ClassForTesting, "use_this_func", n_workers=2)
+    expected = cgt.similarity_results["matrix"]
+    assert (cgt_par.similarity_results["matrix"] == expected).all()
+    assert cgt_par.similarity_sets == cgt.similarity_sets
+
+
+def test_pairwise_similarity():
+    cgt = ClassGraphTree(ClassForTesting, "use_this_func", similarity_method="pairwise")
+    M = cgt.similarity_results["matrix"]
+    assert (M == M.T).all()
+
+    with pytest.raises(ValueError, match="unexpected value, similarity_method"):
+        _ = ClassGraphTree(ClassForTesting, similarity_method="not_a_method")
+
+
+def test_lazy_similarity(cgt):
+    assert cgt._similarity_results is None
+    _ = cgt.graph(include_similarity=False)
+    assert cgt._similarity_results is None
+    _ = cgt.graph()
+    assert cgt._similarity_results is not None
+
+
+@pytest.mark.parametrize("compute_similarity", ("eager", "background"))
+def test_compute_similarity_options(cgt, compute_similarity):
+    cgt_2 = ClassGraphTree(
+        ClassForTesting, "use_this_func", compute_similarity=compute_similarity
+    )
+    if compute_similarity == "eager":
+        assert cgt_2._similarity_results is not None
+    expected = cgt.similarity_results["matrix"]
+    assert (cgt_2.similarity_results["matrix"] == expected).all()
+    assert cgt_2.similarity_sets == cgt.similarity_sets
+
+
+def test_compute_similarity_never():
+    cgt = ClassGraphTree(ClassForTesting, "use_this_func", compute_similarity="never")
+    assert cgt.similarity_sets == {}
+    assert isinstance(cgt.graph(), pydot.Dot)
+    with pytest.raises(RuntimeError, match="similarity results are not available"):
+        _ = cgt.similarity_results
+
+    with pytest.raises(ValueError, match="unexpected value, compute_similarity"):
+        _ = ClassGraphTree(ClassForTesting, compute_similarity="sometimes")
+
+
+@pytest.mark.parametrize("similarity_method", ("permute", "pairwise"))
+def test_similarity_without_funcname(similarity_method):
+    cgt = ClassGraphTree(ClassForTesting, similarity_method=similarity_method)
+    assert cgt.similarity_results["matrix"].shape == (0, 0)
+    assert cgt.similarity_sets == {}
+    assert isinstance(cgt.graph(), pydot.Dot)
+
+
+def test_minhash_similarity_container(cgt):
+    cgt_mh = ClassGraphTree(
+        ClassForTesting,
+        "use_this_func",
+        similarity_container_class="MinHashSimilarity",
+    )
+    M = cgt_mh.similarity_results["matrix"]
+    assert M.shape == cgt.similarity_results["matrix"].shape
+    _ = cgt_mh.check_source_similarity(similarity_container_class="MinHashSimilarity")
+
+    cgt_mh = ClassGraphTree(
+        ClassForTesting,
+        "use_this_func",
+        similarity_container_class="MinHashSimilarity",
+        similarity_container_kwargs={"n_bands": 64, "shingle_size": 4},
+    )
+    assert cgt_mh.similarity_results["matrix"].shape == M.shape
+
+    cgt_mh = ClassGraphTree(
+        ClassForTesting,
+        "use_this_func",
+        similarity_container_class="MinHashSimilarity",
+        similarity_container_kwargs={"n_bands": 10},
+    )
+    with pytest.raises(ValueError, match="must evenly divide"):
+        _ = cgt_mh.similarity_results
+
+    with pytest.raises(ValueError, match="unexpected value, similarity_container"):
+        _ = ClassGraphTree(ClassForTesting, similarity_container_class="not_a_thing")
+
+
+@pytest.mark.parametrize("similarity_dtype", ("float64", "float32"))
+def test_sparse_similarity(cgt, similarity_dtype):
+    cgt_sp = ClassGraphTree(
+        ClassForTesting,
+        "use_this_func",
+        similarity_cutoff=0.5,
+        sparse_similarity=True,
+        similarity_dtype=similarity_dtype,
+    )
+    cgt_dense = ClassGraphTree(ClassForTesting, "use_this_func", similarity_cutoff=0.5)
+    M = cgt_sp.similarity_results["matrix"]
+    assert not isinstance(M, np.ndarray)
+    assert M.dtype == similarity_dtype
+    M_dense = cgt_dense.similarity_results["matrix"]
+    assert M.nnz == (M_dense >= 0.5).sum()
+    assert cgt_sp.similarity_sets == cgt_dense.similarity_sets
+    assert len(cgt_sp.similarity_sets) > 0
+
+    _ = cgt_sp.plot_similarity()
+    _ = cgt_sp.plot_similarity(above_cutoff=True)
+    assert isinstance(cgt_sp.graph(), pydot.Dot)
+    _ = cgt_sp.build_interactive_graph()
+
+
+@pytest.mark.parametrize("similarity_dtype", ("int32", "not_a_dtype"))
+def test_similarity_dtype_validation(similarity_dtype):
+    with pytest.raises(ValueError, match="unexpected value, similarity_dtype"):
+        _ = ClassGraphTree(ClassForTesting, similarity_dtype=similarity_dtype)
+
+
+def test_similarity_sets(cgt):
+    # compare to a direct row-by-row thresholding of the matrix
+    M = cgt.similarity_results["matrix"]
+    axis = cgt.similarity_results["axis"]
+    expected = {}
+    for irow in range(M.shape[0]):
+        indxs = np.where(M[irow, :] >= cgt.similarity_cutoff)[0]
+        indxs = indxs[indxs != irow]
+        if len(indxs) > 0:
+            expected[axis[irow]] = set(axis[indxs].tolist())
+    assert cgt.similarity_sets == expected
+
+
+def _decorator(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+class _DecoratedForTesting:
+    @_decorator
+    def decorated(self):
+        pass
+
+    @classmethod
+    def a_classmethod(cls):
+        pass
+
+
+def test_source_location_cache(cgt):
+    for f in (
+        ClassForTesting.use_this_func,
+        _DecoratedForTesting.decorated,
+        _DecoratedForTesting.a_classmethod,
+    ):
+        expected = f"{inspect.getsourcefile(f)}:{inspect.getsourcelines(f)[1]}"
+        assert cgt._get_source_location(f) == expected
+        # second call is served from the cache
+        assert cgt._get_source_location(f) == expected
+
+    assert len(cgt._source_location_cache) >= 3
+
+
+@pytest.fixture()
+def import_tmp_module(tmp_path, monkeypatch):
+    # import modules written to tmp_path, removed from sys.modules afterwards
+    monkeypatch.syspath_prepend(str(tmp_path))
+    imported = []
+
+    def _import(name, src):
+        (tmp_path / f"{name}.py").write_text(src)
+        imported.append(name)
+        return importlib.import_module(name)
+
+    yield _import
+    for name in imported:
+        sys.modules.pop(name, None)
+
+
+def test_source_location_same_line_in_two_modules(import_tmp_module):
+    # identical functions on the same line of different files have code
+    # objects that compare equal, but are different overrides
+    method = "    def method(self):\n        return 1\n"
+    ra = import_tmp_module("ra", f"# module a\nclass Base:\n    # a\n{method}")
+    rb = import_tmp_module("rb", f"from ra import Base\n\nclass Child(Base):\n{method}")
+    assert ra.Base.method.__code__ == rb.Child.method.__code__
+
+    cgt_ab = ClassGraphTree(ra.Base, "method")
+    child = [n for n in cgt_ab._node_list if n.child_name == "Child"][0]
+    assert child.color == cgt_ab._override_color
+    assert child._child_id in cgt_ab._override_src
+    assert cgt_ab._override_src_files[child._child_id].endswith("rb.py:4")
+    assert cgt_ab._override_src_files[1].endswith("ra.py:4")
+
+
+class _DiamondBase:
+    def method(self):
+        pass
+
+
+class _DiamondLeft(_DiamondBase):
+    pass
+
+
+class _DiamondRight(_DiamondBase):
+    def method(self):
+        return 1
+
+
+class _DiamondBottom(_DiamondLeft, _DiamondRight):
+    pass
+
+
+class _DiamondBottomChild(_DiamondBottom):
+    pass
+
+
+def test_dag_traversal():
+    cgt = ClassGraphTree(_DiamondBase, "method")
+    names = [node.child_name for node in cgt._node_list]
+    assert len(names) == len(set(names)) == 5
+
+    bottom = cgt._node_list[cgt._node_map_r["_DiamondBottom"] - 1]
+    expected_parents = {cgt._node_map_r[c] for c in ("_DiamondLeft", "_DiamondRight")}
+    assert {int(pid) for pid in bottom.parent_ids} == expected_parents
+    assert bottom.parent_id == bottom.parent_ids[0]
+    depths = dict(zip(cgt._node_list.node_names(), cgt._node_list.depth.tolist()))
+    assert depths == {
+        "_DiamondBase": 0,
+        "_DiamondLeft": 1,
+        "_DiamondRight": 1,
+        "_DiamondBottom": 2,
+        "_DiamondBottomChild": 3,
+    }
+    # _DiamondBottom inherits method, it does not override it
+    assert bottom.color == cgt._default_color
+    assert cgt._node_map_r["_DiamondBottom"] not in cgt._override_src
+    assert cgt._node_map_r["_DiamondRight"] in cgt._override_src
+
+    dot = cgt.graph(include_similarity=False)
+    assert len(dot.get_edges()) == 5
+    _ = cgt.build_interactive_graph()
+
+    cgt_tree = ClassGraphTree(_DiamondBase, "method", traversal="tree")
+    assert len(cgt_tree._node_list) == 7
+    assert all(len(node.parent_ids) <= 1 for node in cgt_tree._node_list)
+
+    with pytest.raises(ValueError, match="unexpected value, traversal"):
+        _ = ClassGraphTree(_DiamondBase, traversal="not_a_traversal")
+
+
+def test_deep_hierarchy():
+    # a chain of classes deeper than the allowed recursion depth
+    depth = 300
+    classes = [type("DeepClass0", (), {})]
+    for i in range(1, depth):
+        classes.append(type(f"DeepClass{i}", (classes[-1],), {}))
+
+    recursion_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(len(inspect.stack(0)) + depth // 2)
+    try:
+        cgt = ClassGraphTree(classes[0], max_recursion_level=depth)
+    finally:
+        sys.setrecursionlimit(recursion_limit)
+    assert len(cgt._node_list) == depth
+
+
+_refresh_base_src = """
+class RBase:
+    def method(self, a):
+        return a
+
+
+class RChild(RBase):
+    def method(self, a):
+        b = a * 10
+        return b
+
+
+class RGrandChild(RChild):
+    pass
+"""
+
+_refresh_plugin_src = """
+from refresh_base import RBase, RChild, RGrandChild
+
+
+class RNew(RGrandChild):
+    def method(self, a):
+        b = a * 10
+        return b
+
+
+class RNewChild(RNew):
+    pass
+
+
+class RMixin(RBase):
+    def method(self, a):
+        c = a + 1
+        return c
+
+
+class RMulti(RNew, RMixin):
+    pass
+"""
+
+
+def _tree_by_name(cgt: ClassGraphTree) -> tuple[Any, ...]:
+    # the nodes, overrides and similarity of a tree keyed by class name
+    names = cgt._node_map
+    nodes = sorted(
+        (n.child_name, n.color, tuple(sorted(names[int(p)] for p in n.parent_ids)))
+        for n in cgt._node_list
+    )
+    override_src = {names[node_id]: src for node_id, src in cgt._override_src.items()}
+    similarity_sets = {
+        names[node_id]: {names[i] for i in similar}
+        for node_id, similar in cgt.similarity_sets.items()
+    }
+    if cgt.compute_similarity == "never":
+        return nodes, override_src, similarity_sets
+    matrix = cgt.similarity_results["matrix"]
+    if not isinstance(matrix, np.ndarray):
+        matrix = matrix.toarray()
+    axis = [names[node_id] for node_id in cgt.similarity_results["axis"]]
+    similarity = {
+        (axis[i], axis[j]): matrix[i, j]
+        for i in range(len(axis))
+        for j in range(len(axis))
+    }
+    return nodes, override_src, similarity_sets, similarity
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    (
+        {},
+        {"traversal": "tree"},
+        {"similarity_method": "pairwise"},
+        {"sparse_similarity": True, "similarity_cutoff": 0.5},
+        {"similarity_container_class": "MinHashSimilarity"},
+        {"compute_similarity": "never"},
+    ),
+)
+def test_refresh(import_tmp_module, kwargs):
+    base = import_tmp_module("refresh_base", _refresh_base_src)
+
+    cgt = ClassGraphTree(base.RBase, "method", **kwargs)
+    if kwargs.get("compute_similarity", "lazy") != "never":
+        M = cgt.similarity_results["matrix"]
+        assert M.shape == (2, 2)
+    similarity_sets = cgt.similarity_sets
+    assert cgt.refresh() == []
+
+    _ = import_tmp_module("refresh_plugin", _refresh_plugin_src)
+    new_ids = cgt.refresh()
+    assert new_ids == list(range(4, len(cgt._node_list) + 1))
+    assert {cgt._node_map[i] for i in new_ids} == {
+        "RNew",
+        "RNewChild",
+        "RMixin",
+        "RMulti",
+    }
+    assert cgt._node_map_r == {v: k for k, v in cgt._node_map.items()}
+    # the depth of a node follows its first parent
+    depth = cgt._node_list.depth
+    assert depth[0] == 0
+    assert np.array_equal(depth[1:], depth[cgt._node_list.parent_id[1:] - 1] + 1)
+    if kwargs.get("compute_similarity", "lazy") != "never":
+        # the sets are updated in place
+        assert cgt.similarity_sets is similarity_sets
+
+    cgt_fresh = ClassGraphTree(base.RBase, "method", **kwargs)
+    if kwargs.get("compute_similarity", "lazy") == "never":
+        assert cgt.similarity_sets == cgt_fresh.similarity_sets == {}
+        assert _tree_by_name(cgt)[:2] == _tree_by_name(cgt_fresh)[:2]
+        return
+    expected = _tree_by_name(cgt_fresh)
+    actual = _tree_by_name(cgt)
+    assert actual[:3] == expected[:3]
+    assert actual[3].keys() == expected[3].keys()
+    for key, value in expected[3].items():
+        assert actual[3][key] == pytest.approx(value)
+    assert len(cgt.similarity_sets) > 0
+    assert cgt.similarity_results["matrix"].dtype == cgt_fresh.similarity_dtype
+
+
+def test_refresh_lazy_and_cached(import_tmp_module):
+    base = import_tmp_module("refresh_base", _refresh_base_src)
+
+    # similarity that has not been computed yet includes the new classes
+    cgt = ClassGraphTree(base.RBase, "method")
+    _ = import_tmp_module("refresh_plugin", _refresh_plugin_src)
+    assert len(cgt.refresh()) == 4
+    assert cgt.similarity_results["matrix"].shape == (4, 4)
+
+    cgt_restored = ClassGraphTree._from_state(cgt._get_state())
+    with pytest.raises(RuntimeError, match="requires a tree built from live classes"):
+        _ = cgt_restored.refresh()
+
+
+def _first_parent_source(cgt: ClassGraphTree, node_id: int) -> Optional[int]:
+    # the original find_closest_source walk up the first parents
+    while node_id not in cgt._override_src:
+        node_id = int(cgt._node_list.parent_id[node_id - 1])
+        if node_id == 0:
+            return None
+    return node_id
+
+
+@pytest.mark.parametrize("diamond_rate", (0.0, 0.1))
+def test_ancestry(diamond_rate):
+    base = make_hierarchy(300, depth=6, branching=3, diamond_rate=diamond_rate)
+    cgt = ClassGraphTree(base, "method", max_recursion_level=6)
+    classes = cgt._node_list.classes
+    node_ids = range(1, len(classes) + 1)
+    for node_id in node_ids:
+        clss = classes[node_id - 1]
+        ancestors = [
+            i for i in node_ids if i != node_id and issubclass(clss, classes[i - 1])
+        ]
+        descendants = [
+            i for i in node_ids if i != node_id and issubclass(classes[i - 1], clss)
+        ]
+        assert cgt.ancestors(node_id) == ancestors
+        assert cgt.descendants(node_id) == descendants
+        assert cgt.defining_node(node_id) == _first_parent_source(cgt, node_id)
+    for node_id in node_ids[::7]:
+        for other_id in node_ids:
+            expected = other_id != node_id and issubclass(
+                classes[node_id - 1], classes[other_id - 1]
+            )
+            assert cgt.is_descendant(node_id, other_id) is expected
+
+    name = cgt._node_map[2]
+    assert cgt.ancestors(name) == [1]
+    assert cgt.is_descendant(name, cgt.basename)
+    assert not cgt.is_descendant(cgt.basename, name)
+    with pytest.raises(ValueError, match="Could not find node"):
+        cgt.descendants("NotAClass")
+
+
+def test_ancestry_refresh():
+    class Base:
+        def method(self):
+            return 1
+
+    class Child(Base):
+        pass
+
+    cgt = ClassGraphTree(Base, "method")
+    assert cgt.descendants("Base") == [2]
+    assert cgt.defining_node("Child") == 1
+
+    class GrandChild(Child):
+        def method(self):
+            return 2
+
+    new_ids = cgt.refresh()
+    assert cgt.descendants("Base") == [2] + new_ids
+    assert cgt.ancestors("GrandChild") == [1, 2]
+    assert cgt.defining_node("GrandChild") == new_ids[0]
+
+    cgt_no_func = ClassGraphTree(Base)
+    assert cgt_no_func.descendants("Base") == [2, 3]
+    with pytest.raises(RuntimeError, match="function tracking"):
+        cgt_no_func.defining_node("Child")
+
+
+class _FuncsBase:
+    def first(self, a):
+        return a
+
+    def second(self, a):
+        return a + 1
+
+
+class _FuncsFirst(_FuncsBase):
+    def first(self, a):
+        b = a * 2
+        return b
+
+
+class _FuncsSecond(_FuncsBase):
+    def second(self, a):
+        b = a * 2
+        return b + 1
+
+
+class _FuncsBoth(_FuncsFirst):
+    def first(self, a):
+        b = a * 2
+        return b + 2
+
+    def second(self, a):
+        b = a * 3
+        return b + 1
+
+
+def _dot_source(cgt: ClassGraphTree) -> str:
+    output = io.StringIO()
+    cgt.write_dot(output)
+    return output.getvalue()
+
+
+def test_funcnames():
+    funcnames = ["first", "second"]
+    cgt = ClassGraphTree(_FuncsBase, funcnames=funcnames, similarity_cutoff=0.0)
+    assert cgt.funcnames == funcnames
+    assert cgt.funcname == "first"
+    for funcname in funcnames:
+        cgt.select_funcname(funcname)
+        single = ClassGraphTree(_FuncsBase, funcname, similarity_cutoff=0.0)
+        assert cgt.funcname == funcname
+        assert cgt._override_src == single._override_src
+        assert cgt._override_src_files == single._override_src_files
+        assert cgt.similarity_sets == single.similarity_sets
+        assert np.array_equal(
+            cgt.similarity_results["matrix"], single.similarity_results["matrix"]
+        )
+        assert _dot_source(cgt) == _dot_source(single)
+        for node_id in cgt._node_map:
+            assert cgt.defining_node(node_id) == single.defining_node(node_id)
+
+    cgt_second = ClassGraphTree(_FuncsBase, "second", funcnames=funcnames)
+    assert cgt_second.funcname == "second"
+    with pytest.raises(ValueError, match="must be one of"):
+        ClassGraphTree(_FuncsBase, "third", funcnames=funcnames)
+    with pytest.raises(ValueError, match="must be one of"):
+        cgt.select_funcname("third")
+
+
+def test_funcnames_refresh():
+    class Base:
+        def first(self):
+            return 1
+
+        def second(self):
+            return 2
+
+    class Child(Base):
+        def second(self):
+            return 3
+
+    cgt = ClassGraphTree(Base, funcnames=["first", "second"], similarity_cutoff=0.0)
+    _ = cgt.similarity_sets
+
+    class GrandChild(Child):
+        def first(self):
+            return 4
+
+    new_ids = cgt.refresh()
+    assert list(cgt._override_src) == [1] + new_ids
+    assert cgt.similarity_results["axis"].tolist() == [1] + new_ids
+    cgt.select_funcname("second")
+    assert list(cgt._override_src) == [1, 2]
+    assert cgt.similarity_results["axis"].tolist() == [1, 2]
+    assert cgt._node_list[new_ids[0] - 1].color == cgt._default_color
+
+
+def _passthrough(func: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+class _ResolveBase:
+    def method(self):
+        return 1
+
+    @staticmethod
+    def static():
+        return 1
+
+    @classmethod
+    def klass(cls):
+        return 1
+
+    @property
+    def prop(self):
+        return 1
+
+    builtin = len
+
+
+class _ResolveSame(_ResolveBase):
+    # the same functions as the parent, wrapped again or copied
+    method = _passthrough(_ResolveBase.method)
+    static = staticmethod(_ResolveBase.static)
+    prop = property(vars(_ResolveBase)["prop"].fget)
+    builtin = len
+
+
+class _ResolveNew(_ResolveSame):
+    @_passthrough
+    def method(self):
+        return 2
+
+    @staticmethod
+    def static():
+        return 2
+
+    @classmethod
+    def klass(cls):
+        return 2
+
+    @property
+    def prop(self):
+        return 2
+
+    builtin = abs
+
+
+_ResolveDynamic = type(
+    "_ResolveDynamic", (_ResolveBase,), {"method": eval("lambda self: 3")}
+)
+
+
+@pytest.mark.parametrize("funcname", ("method", "static", "klass", "prop", "builtin"))
+def test_override_detection(funcname):
+    cgt = ClassGraphTree(_ResolveBase, funcname)
+    names = {name: node_id for node_id, name in cgt._node_map.items()}
+    overrides = {
+        name
+        for name, node_id in names.items()
+        if cgt._node_list[node_id - 1].color == cgt._override_color
+    }
+    expected = {"_ResolveBase", "_ResolveNew"}
+    if funcname == "method":
+        expected.add("_ResolveDynamic")
+    assert overrides == expected
+    if funcname == "builtin":
+        # C functions have no source
+        assert cgt._override_src == {}
+    else:
+        assert set(cgt._override_src) == {names["_ResolveBase"], names["_ResolveNew"]}
+        assert "return 2" in cgt.get_source_code("_ResolveNew")
+
+
+class _SharedBase:
+    def method(self, a):
+        return a
+
+
+class _SharedFirst(_SharedBase):
+    def method(self, a):
+        b = a * 10
+        return b
+
+
+class _SharedSecond(_SharedBase):
+    def method(self, a):
+        """the same implementation, with a docstring"""
+        # and a comment
+        b = a * 10  # a trailing comment
+
+        return b
+
+
+class _SharedThird(_SharedFirst):
+    def method(self, a):
+        b = a * 10
+        return b + 1
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    (
+        {},
+        {"similarity_method": "pairwise"},
+        {"sparse_similarity": True, "similarity_cutoff": 0.5},
+        {"similarity_container_class": "MinHashSimilarity"},
+    ),
+)
+def test_identical_overrides(kwargs):
+    if kwargs.get("sparse_similarity"):
+        pytest.importorskip("scipy")
+    cgt = ClassGraphTree(_SharedBase, "method", **kwargs)
+    names = {name: node_id for node_id, name in cgt._node_map.items()}
+    assert cgt.identical_overrides() == [
+        sorted([names["_SharedFirst"], names["_SharedSecond"]])
+    ]
+    with pytest.raises(ValueError, match="must be one of"):
+        cgt.identical_overrides("other")
+
+    # the matrix expanded from the unique sources is the full matrix
+    base = make_hierarchy(200, depth=5, diamond_rate=0.1)
+    cgt = ClassGraphTree(base, "method", **kwargs)
+    groups = cgt.identical_overrides()
+    assert len(groups) > 0
+    assert [len(group) for group in groups] == sorted(
+        (len(group) for group in groups), reverse=True
+    )
+    for group in groups:
+        assert len({cgt._override_src[node_id] for node_id in group}) == 1
+
+    M = cgt.similarity_results["matrix"]
+    sim_results = cgt._get_similarity_container().run(cgt._override_src)
+    assert isinstance(sim_results, tuple)
+    _, expected, axis = sim_results
+    assert cgt.similarity_results["axis"].tolist() == list(axis)
+    if not isinstance(expected, np.ndarray):
+        M, expected = M.toarray(), expected.toarray()
+    assert np.array_equal(M, expected.astype(cgt.similarity_dtype))
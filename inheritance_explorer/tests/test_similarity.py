@@ -73,3 +73,223 @@ def test_pycode_similarity_permuted(sample_source_dict):
 def test_errors():
     with pytest.raises(ValueError, match="Provided method not recognized"):
         _ = PycodeSimilarity(method="badmethod")
+
+
+def test_fingerprint_matches_detect(sample_source_dict):
+    import pycode_similar
+
+    from inheritance_explorer.similarity import SourceFingerprint
+
+    s_dict, _ = sample_source_dict
+    srcs = list(s_dict.values())
+    srcs.append(
+        "def test_func(a, b):\n"
+        "    def inner(x):\n"
+        "        return x * 2\n"
+        "    return inner(a) + b\n"
+        "def other(a):\n"
+        "    '''docstring'''\n"
+        "    return a\n"
+    )
+    for ref in srcs:
+        expected = pycode_similar.detect([ref] + srcs)
+        ref_fp = SourceFingerprint(ref)
+        for src, sim in zip(srcs, expected):
+            count, total, fraction = ref_fp.compare(SourceFingerprint(src))
+            assert count == sim[1][0].plagiarism_count
+            assert total == sim[1][0].total_count
+            assert fraction == sim[1][0].plagiarism_percent
+
+
+@pytest.mark.parametrize("n_workers", (1, 2, 10))
+def test_pycode_similarity_parallel(sample_source_dict, n_workers):
+    s_dict, _ = sample_source_dict
+    _, expected, expected_axis = PycodeSimilarity(method="permute").run(s_dict)
+
+    p = PycodeSimilarity(method="permute", n_workers=n_workers)
+    results, sim_matrix, sim_axis = p.run(s_dict)
+    assert sim_axis == expected_axis
+    assert np.array_equal(sim_matrix, expected)
+    assert isinstance(results, dict)
+    assert list(results.keys()) == list(s_dict.keys())
+    for ref, ref_results in results.items():
+        assert list(ref_results.keys()) == list(s_dict.keys())
+        assert all(r.base_class == ref for r in ref_results.values())
+
+
+def test_pycode_similarity_executor(sample_source_dict):
+    from concurrent.futures import ThreadPoolExecutor
+
+    s_dict, _ = sample_source_dict
+    _, expected, _ = PycodeSimilarity(method="permute").run(s_dict)
+
+    with ThreadPoolExecutor(2) as executor:
+        p = PycodeSimilarity(method="permute", executor=executor)
+        _, sim_matrix, _ = p.run(s_dict)
+    assert np.array_equal(sim_matrix, expected)
+
+
+@pytest.mark.parametrize("n_workers", (None, 2))
+def test_pycode_similarity_pairwise(sample_source_dict, n_workers):
+    s_dict, s_bool = sample_source_dict
+    p = PycodeSimilarity(method="pairwise", n_workers=n_workers)
+    results, sim_matrix, sim_axis = p.run(s_dict)
+
+    assert isinstance(sim_matrix, np.ndarray)
+    assert sim_matrix.shape == s_bool.shape
+    assert np.array_equal(sim_matrix, sim_matrix.T)
+    assert np.all(np.diag(sim_matrix) == 1.0)
+    assert np.all((sim_matrix == 1.0) == s_bool)
+    assert sim_axis == tuple(s_dict.keys())
+
+    assert isinstance(results, dict)
+    for ref, ref_results in results.items():
+        iref = sim_axis.index(ref)
+        for icand, (cand, r) in enumerate(ref_results.items()):
+            assert r.base_class == ref
+            assert r.this_class == cand
+            assert r.similarity_fraction == sim_matrix[iref, icand]
+            assert r.count == results[cand][ref].count
+
+
+@pytest.mark.parametrize("method", ("permute", "pairwise"))
+def test_minhash_similarity(sample_source_dict, method):
+    from inheritance_explorer.similarity import MinHashSimilarity
+
+    s_dict, s_bool = sample_source_dict
+    _, expected, _ = PycodeSimilarity(method=method).run(s_dict)
+    assert isinstance(expected, np.ndarray)
+
+    m = MinHashSimilarity(method=method)
+    results, sim_matrix, sim_axis = m.run(s_dict)
+    assert isinstance(sim_matrix, np.ndarray)
+    assert sim_axis == tuple(s_dict.keys())
+    assert np.array_equal(sim_matrix, sim_matrix.T)
+
+    # identical sources always share buckets, and any compared pair matches
+    # the exhaustive result
+    assert np.all(sim_matrix[s_bool] == expected[s_bool])
+    compared = sim_matrix > 0
+    assert np.all(sim_matrix[compared] == expected[compared])
+
+    pairs = m.candidate_pairs(list(s_dict.values()))
+    assert pairs.shape[1] == 2
+    assert np.all(pairs[:, 0] < pairs[:, 1])
+    assert isinstance(results, dict)
+    for i, j in pairs.tolist():
+        assert sim_axis[j] in results[sim_axis[i]]
+
+
+def test_minhash_edge_cases():
+    from inheritance_explorer.similarity import MinHashSimilarity
+
+    with pytest.raises(ValueError, match="must evenly divide"):
+        _ = MinHashSimilarity(num_perm=128, n_bands=10)
+
+    m = MinHashSimilarity(method="permute")
+    assert m.candidate_pairs([]).shape == (0, 2)
+    _, sim_matrix, _ = m.run(OrderedDict([(1, "def f(a):\n    return a")]))
+    assert isinstance(sim_matrix, np.ndarray)
+    assert sim_matrix.shape == (1, 1)
+
+    # sources without functions have empty signatures and are never candidates
+    no_funcs = ["x = 1", "y = 2", "def f(a):\n    return a", "def g(b):\n    return b"]
+    sigs = m.signatures(no_funcs)
+    assert np.all(sigs[:2] == m._empty)
+    assert np.all(sigs[2:] < m._empty)
+    assert m.candidate_pairs(no_funcs).tolist() == [[2, 3]]
+
+
+@pytest.mark.parametrize("method", ("permute", "pairwise"))
+def test_minhash_parallel(sample_source_dict, method):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from inheritance_explorer.similarity import MinHashSimilarity
+
+    s_dict, _ = sample_source_dict
+    serial_results, serial, _ = MinHashSimilarity(method=method).run(s_dict)
+    assert isinstance(serial, np.ndarray)
+
+    results, sim_matrix, _ = MinHashSimilarity(method=method, n_workers=2).run(s_dict)
+    assert isinstance(sim_matrix, np.ndarray)
+    assert np.array_equal(sim_matrix, serial)
+    assert isinstance(results, dict)
+    assert isinstance(serial_results, dict)
+    assert {ref: set(r) for ref, r in results.items()} == {
+        ref: set(r) for ref, r in serial_results.items()
+    }
+
+    with ThreadPoolExecutor(2) as executor:
+        m = MinHashSimilarity(method=method, executor=executor)
+        _, sim_matrix, _ = m.run(s_dict)
+    assert isinstance(sim_matrix, np.ndarray)
+    assert np.array_equal(sim_matrix, serial)
+
+
+@pytest.mark.parametrize("method", ("permute", "pairwise"))
+def test_sparse_matrix(sample_source_dict, method):
+    from inheritance_explorer.similarity import MinHashSimilarity
+
+    s_dict, _ = sample_source_dict
+    _, expected, _ = PycodeSimilarity(method=method).run(s_dict)
+    assert isinstance(expected, np.ndarray)
+    for sim_class in (PycodeSimilarity, MinHashSimilarity):
+        results = sim_class(method=method, sparse=True).run(s_dict)
+        assert isinstance(results, tuple)
+        sim_matrix = results[1]
+        assert not isinstance(sim_matrix, np.ndarray)
+        dense = sim_matrix.toarray()
+        stored = dense > 0
+        assert np.all(dense[stored] == expected[stored])
+
+        # only the entries >= cutoff are stored
+        results = sim_class(method=method, sparse=True, cutoff=0.5).run(s_dict)
+        assert isinstance(results, tuple)
+        sim_matrix = results[1]
+        assert not isinstance(sim_matrix, np.ndarray)
+        assert np.all(sim_matrix.data >= 0.5)
+        dense = sim_matrix.toarray()
+        stored = dense > 0
+        assert np.all(dense[stored] == expected[stored])
+        if sim_class is PycodeSimilarity:
+            assert sim_matrix.nnz == (expected >= 0.5).sum()
+
+
+def test_compare_symmetric():
+    from inheritance_explorer.similarity import SourceFingerprint
+
+    # functions with more than 200 AST lines, for which difflib's autojunk
+    # (and matching greedily in one direction) makes the order matter
+    statements = [
+        "a = a * {v}",
+        "b = b + a",
+        "c = foo(a, b)",
+        "if a > b:\n        a = b",
+        "x.y = a",
+        "d = [a for a in b]",
+        "a += 1",
+    ]
+    rng = np.random.default_rng(1)
+
+    def _long_source(n_lines: int) -> str:
+        body = ""
+        for _ in range(n_lines):
+            stmt = statements[rng.integers(len(statements))]
+            body += "    " + stmt.format(v=rng.integers(4)) + "\n"
+        return "def func(a, b, c):\n" + body + "    return a\n"
+
+    fps = [SourceFingerprint(_long_source(n)) for n in (130, 150, 160, 200)]
+    assert max(len(fp.functions[0].func_ast_lines) for fp in fps) > 200
+    fps.append(
+        SourceFingerprint("def f(a):\n    return a\ndef g(a):\n    return a + 1\n")
+    )
+    for fp_1 in fps:
+        assert fp_1.compare_symmetric(fp_1) == fp_1.self_similarity()
+        for fp_2 in fps:
+            assert fp_1.compare_symmetric(fp_2) == fp_2.compare_symmetric(fp_1)
+
+    no_funcs = SourceFingerprint("a = 1\n")
+    count, total, fraction = fps[0].compare_symmetric(no_funcs)
+    assert fraction == 0 and count == 0
+    assert no_funcs.compare_symmetric(fps[0]) == (count, total, fraction)
+    assert fps[0].compare(no_funcs)[2] == 0
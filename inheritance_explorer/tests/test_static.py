@@ -0,0 +1,213 @@
+import concurrent.futures
+import importlib
+import sys
+import textwrap
+from typing import Any
+
+import numpy as np
+import pytest
+
+from inheritance_explorer.inheritance_explorer import ClassGraphTree
+from inheritance_explorer.static import StaticClass, scan_package
+
+_package_files = {
+    "__init__.py": """
+        from .core import Base
+    """,
+    "core.py": """
+        import functools
+
+
+        def _decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                return func(*args, **kwargs)
+
+            return wrapper
+
+
+        class Base:
+            def method(self, a):
+                return a
+
+            @_decorator
+            def decorated(self, a):
+                return a
+
+
+        class Mixin:
+            def method(self, a):
+                b = a + 1
+                return b
+    """,
+    "sub/__init__.py": "",
+    "sub/impl.py": """
+        import staticpkg.core
+        from .. import Base
+        from ..core import Base as AliasedBase, Mixin
+
+        try:
+            from ..core import Mixin as OtherMixin
+        except ImportError:
+            OtherMixin = None
+
+
+        class Override(Base):
+            def method(self, a):
+                b = a * 10
+                return b
+
+            @staticpkg.core._decorator
+            def decorated(self, a):
+                return a + 1
+
+            class Nested(Base):
+                pass
+
+
+        class Inherits(AliasedBase):
+            pass
+
+
+        class Attribute(staticpkg.core.Base):
+            pass
+
+
+        class Multiple(Inherits, Mixin):
+            pass
+
+
+        class MultipleOverride(Override, OtherMixin):
+            def method(self, a):
+                return a - 1
+    """,
+    "star.py": """
+        from staticpkg.sub.impl import *
+
+
+        class FromStar(Override):
+            pass
+
+
+        class Error(Exception):
+            pass
+    """,
+}
+
+
+@pytest.fixture()
+def static_package(tmp_path):
+    pkg_dir = tmp_path / "staticpkg"
+    for filename, src in _package_files.items():
+        (pkg_dir / filename).parent.mkdir(parents=True, exist_ok=True)
+        (pkg_dir / filename).write_text(textwrap.dedent(src))
+    sys.path.insert(0, str(tmp_path))
+    yield pkg_dir
+    sys.path.remove(str(tmp_path))
+    for module in list(sys.modules):
+        if module.startswith("staticpkg"):
+            del sys.modules[module]
+
+
+def _tree_by_name(cgt: ClassGraphTree) -> tuple[Any, ...]:
+    names = cgt._node_map
+    nodes = sorted(
+        (n.child_name, n.color, tuple(sorted(names[int(p)] for p in n.parent_ids)))
+        for n in cgt._node_list
+    )
+    override_src = {names[i]: src for i, src in cgt._override_src.items()}
+    return nodes, override_src
+
+
+@pytest.mark.parametrize("funcname", ("method", "decorated"))
+@pytest.mark.parametrize("traversal", ("dag", "tree"))
+def test_static_matches_live(static_package, funcname, traversal):
+    index = scan_package(str(static_package))
+    assert index.errors == {}
+    assert "staticpkg.sub.impl.Override.Nested" in index.classes
+    base = index.get_class("staticpkg.Base")
+    assert isinstance(base, StaticClass)
+    assert base.qualname == "staticpkg.core.Base"
+    cgt_static = ClassGraphTree(base, funcname, traversal=traversal)
+
+    for module in ("staticpkg", "staticpkg.sub.impl", "staticpkg.star"):
+        importlib.import_module(module)
+    live_base = sys.modules["staticpkg.core"].Base
+    cgt_live = ClassGraphTree(live_base, funcname, traversal=traversal)
+
+    assert _tree_by_name(cgt_static) == _tree_by_name(cgt_live)
+    names = cgt_live._node_map
+    live_locations = {names[i]: loc for i, loc in cgt_live._override_src_files.items()}
+    names = cgt_static._node_map
+    for node_id, location in cgt_static._override_src_files.items():
+        assert location == live_locations[names[node_id]]
+
+    M_static = cgt_static.similarity_results["matrix"]
+    M_live = cgt_live.similarity_results["matrix"]
+    assert np.allclose(np.sort(M_static.ravel()), np.sort(M_live.ravel()))
+    assert isinstance(cgt_static.graph(), type(cgt_live.graph()))
+
+
+def test_static_index(static_package, tmp_path):
+    index = scan_package(str(static_package))
+    override = index.get_class("staticpkg.sub.impl.Override")
+    assert override.lineno == 12
+    assert set(override.methods) == {"method", "decorated"}
+    # decorated functions start at the first decorator line, as in inspect
+    assert override.methods["decorated"][0] == 17
+    assert override.methods["decorated"][1].startswith("@staticpkg.core._decorator")
+
+    multiple = index.get_class("staticpkg.sub.impl.Multiple")
+    assert [c.__name__ for c in multiple.__bases__] == ["Inherits", "Mixin"]
+    assert [c.__name__ for c in multiple.mro()] == [
+        "Multiple",
+        "Inherits",
+        "Base",
+        "Mixin",
+    ]
+    found = multiple.find_method("method")
+    assert found is not None
+    assert found[0].qualname == "staticpkg.core.Base"
+    assert multiple.find_method("not_a_method") is None
+
+    from_star = index.get_class("staticpkg.star.FromStar")
+    assert from_star.__bases__ == (override,)
+
+    # classes outside of the scanned files are only available as bases
+    error = index.get_class("builtins.Exception")
+    assert error.filename is None
+    assert [c.__name__ for c in error.__subclasses__()] == ["Error"]
+    with pytest.raises(KeyError, match="not a class in the scanned modules"):
+        _ = index.get_class("staticpkg.NotAClass")
+
+    # unparseable files are skipped
+    (static_package / "broken.py").write_text("class Broken(:\n")
+    index = scan_package(str(static_package))
+    assert list(index.errors) == [str(static_package / "broken.py")]
+    assert "staticpkg.broken.Broken" not in index.classes
+
+    # scanning a directory on the path or a single file
+    assert set(scan_package(str(tmp_path)).classes) == set(index.classes)
+    single = scan_package(str(static_package / "core.py"))
+    assert single.classes == ["core.Base", "core.Mixin"]
+
+
+@pytest.mark.parametrize("workers", ("n_workers", "executor"))
+def test_parallel_scan(static_package, workers):
+    (static_package / "broken.py").write_text("class Broken(:\n")
+    index = scan_package(str(static_package))
+    if workers == "executor":
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            parallel = scan_package(str(static_package), executor=executor)
+    else:
+        parallel = scan_package(str(static_package), n_workers=2)
+
+    assert parallel.modules == index.modules
+    assert parallel.classes == index.classes
+    assert parallel.errors == index.errors
+    for name in index.classes:
+        cls, parallel_cls = index.get_class(name), parallel.get_class(name)
+        assert parallel_cls.methods == cls.methods
+        assert [c.qualname for c in parallel_cls.__bases__] == [
+            c.qualname for c in cls.__bases__
+        ]
@@ -0,0 +1,102 @@
+import json
+import tracemalloc
+
+from click.testing import CliRunner
+
+from inheritance_explorer import cli
+from inheritance_explorer._testing import ClassForTesting
+from inheritance_explorer.inheritance_explorer import ClassGraphTree
+from inheritance_explorer.stats import BuildStats
+
+
+def test_tree_phases():
+    cgt = ClassGraphTree(ClassForTesting, "use_this_func")
+    phases = cgt.stats.phases
+    assert set(phases) == {"traversal", "source"}
+    assert phases["traversal"].calls == 1
+    assert phases["source"].calls == len(cgt._override_src)
+    assert phases["traversal"].wall_time >= phases["source"].wall_time > 0
+    assert phases["traversal"].peak_memory is None
+
+    _ = cgt.graph()
+    assert phases["similarity"].calls == 1
+    assert phases["graph"].calls == 1
+    _ = cgt.build_interactive_graph()
+    assert phases["interactive_graph"].calls == 1
+    assert phases["similarity"].calls == 1
+
+    # similarity computed in a background thread is recorded too
+    cgt = ClassGraphTree(
+        ClassForTesting, "use_this_func", compute_similarity="background"
+    )
+    _ = cgt.similarity_results
+    assert cgt.stats.phases["similarity"].calls == 1
+
+
+def test_shared_stats():
+    stats = BuildStats()
+    for _ in range(2):
+        cgt = ClassGraphTree(ClassForTesting, "use_this_func", stats=stats)
+        assert cgt.stats is stats
+    assert stats.phases["traversal"].calls == 2
+
+
+def test_trace_memory():
+    stats = BuildStats(trace_memory=True)
+    with stats.phase("outer"):
+        with stats.phase("inner"):
+            data = bytearray(2**20)
+        del data
+        with stats.phase("small"):
+            pass
+    inner, outer, small = (
+        stats.phases[p].peak_memory for p in ("inner", "outer", "small")
+    )
+    assert inner is not None and outer is not None and small is not None
+    assert inner >= 2**20
+    assert outer >= inner
+    assert small < inner
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile():
+    stats = BuildStats(profile=True)
+    _ = ClassGraphTree(ClassForTesting, "use_this_func", stats=stats)
+    functions = stats.profile_stats(n_functions=5)
+    assert len(functions) == 5
+    assert any("_build" in f["function"] for f in functions)
+    result = json.loads(stats.to_json())
+    assert set(result) == {"phases", "max_rss", "profile"}
+    assert result["phases"]["traversal"]["calls"] == 1
+
+    assert BuildStats().profile_stats() == []
+    assert "profile" not in BuildStats().to_dict()
+
+
+def test_cli_profile(tmp_path):
+    runner = CliRunner()
+    outfile = str(tmp_path / "test.raw")
+    profile = str(tmp_path / "profile.json")
+    args = [
+        "inheritance_explorer._testing.ClassForTesting",
+        outfile,
+        "--funcname",
+        "use_this_func",
+        "--cache_dir",
+        str(tmp_path / "cache"),
+    ]
+    result = runner.invoke(cli.map_class, args + ["--profile", profile])
+    assert result.exit_code == 0
+    with open(profile) as fi:
+        phases = json.load(fi)["phases"]
+    assert {"cache", "traversal", "similarity", "graph"} <= set(phases)
+    # DOT output is written by write_dot (the "graph" phase), without graphviz
+    assert "render" not in phases
+
+    # a cache hit, printed with the slowest functions
+    result = runner.invoke(cli.map_class, args + ["--profile_functions", "--profile"])
+    assert result.exit_code == 0
+    output = json.loads(result.output)
+    assert "traversal" not in output["phases"]
+    assert {"cache", "graph"} <= set(output["phases"])
+    assert len(output["profile"]) > 0
@@ -0,0 +1,62 @@
+import inspect
+import linecache
+
+import pytest
+
+from inheritance_explorer._testing import make_hierarchy, make_sources
+from inheritance_explorer.inheritance_explorer import ClassGraphTree
+
+
+def test_make_sources():
+    sources = make_sources(50, n_families=5)
+    assert list(sources.keys()) == list(range(1, 51))
+    assert all(src.startswith("def func(self, a, b):") for src in sources.values())
+    assert make_sources(50, n_families=5) == sources
+    assert make_sources(50, n_families=5, seed=1) != sources
+
+
+def _all_classes(base: type) -> list[type]:
+    # every subclass, after all of its bases
+    classes: dict[type, None] = {}
+    stack = [base]
+    while stack:
+        cls = stack.pop()
+        ready = cls is base or all(b in classes for b in cls.__bases__)
+        if cls not in classes and ready:
+            classes[cls] = None
+            stack.extend(cls.__subclasses__())
+    return list(classes)
+
+
+@pytest.mark.parametrize("diamond_rate", (0.0, 0.2))
+def test_make_hierarchy(diamond_rate):
+    base = make_hierarchy(
+        500, depth=4, branching=3, diamond_rate=diamond_rate, funcname="f"
+    )
+    classes = _all_classes(base)
+    assert len(classes) == 500
+    n_diamonds = sum(len(cls.__bases__) > 1 for cls in classes)
+    assert (n_diamonds > 0) == (diamond_rate > 0)
+    # the longest path to the base class
+    levels = {base: 0}
+    for cls in classes[1:]:
+        levels[cls] = 1 + max(levels[b] for b in cls.__bases__)
+    assert max(levels.values()) == 4
+
+    # the source of the functions is available through inspect, even after
+    # the linecache is checked
+    linecache.checkcache()
+    overrides = [cls for cls in classes if "f" in cls.__dict__]
+    assert 0.2 < len(overrides) / len(classes) < 0.4
+    src = inspect.getsource(overrides[-1].__dict__["f"])
+    assert src.startswith("    def f(self, a, b):")
+
+    cgt = ClassGraphTree(base, "f", max_recursion_level=10)
+    assert len(cgt._node_list) == len(classes)
+    assert len(cgt._override_src) == len(overrides)
+
+    # the same classes for the same seed
+    other = make_hierarchy(
+        500, depth=4, branching=3, diamond_rate=diamond_rate, funcname="f"
+    )
+    assert [c.__name__ for c in _all_classes(other)] == [c.__name__ for c in classes]